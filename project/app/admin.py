@@ -2,8 +2,14 @@ from flask import Blueprint, render_template, request, jsonify, flash, redirect,
 from flask import stream_with_context
 from flask_login import login_required, current_user
 from werkzeug.security import generate_password_hash
-from .db import query_all, execute_update, query_one
-from .crawler import fetch_items_for_keyword, save_items_for_keyword
+from .db import query_all, execute_update, execute_many, query_one, transaction
+from .crawler import index_new_records, refresh_records
+from .models import invalidate_user
+from .rules import invalidate as invalidate_rules
+from .contentstore import save_detail, load_detail
+from .settings import get_settings, save_settings
+from . import httpclient, hostguard, covers, decoding, scheduler, jobs, neardup, extract
+from .warehouse import record_count, page_records, page_records_offset, export_stream, invalidate_counts
 import requests
 import json
 import urllib.parse
@@ -60,12 +66,14 @@ def update_user(user_id):
     if password:
         pwd_hash = generate_password_hash(password)
         execute_update("update users set password_hash = ? where id = ?", [pwd_hash, user_id])
+    invalidate_user(user_id)
     flash('更新成功', 'success')
     return redirect(url_for('admin.user_list'))
 
 @bp.route('/users/delete/<int:user_id>', methods=['POST'])
 def delete_user(user_id):
     execute_update("delete from users where id = ?", [user_id])
+    invalidate_user(user_id)
     flash('删除成功', 'success')
     return redirect(url_for('admin.user_list'))
 
@@ -96,71 +104,27 @@ def delete_role(role_id):
         flash('角色正在使用，无法删除', 'error')
         return redirect(url_for('admin.role_list'))
     execute_update("delete from roles where id = ?", [role_id])
+    invalidate_user()
     flash('删除成功', 'success')
     return redirect(url_for('admin.role_list'))
 
 @bp.route('/settings')
 def settings():
-    settings_list = query_all("select * from settings")
-    settings_dict = {item['key']: item['value'] for item in settings_list}
-    return render_template('admin/settings.html', settings=settings_dict)
+    return render_template('admin/settings.html', settings=get_settings().values)
 
 @bp.route('/settings/update', methods=['POST'])
 def update_settings():
-    app_name = request.form.get('app_name')
-    app_logo = request.form.get('app_logo')
-    http_proxy = request.form.get('http_proxy')
-    https_proxy = request.form.get('https_proxy')
-    user_agent = request.form.get('user_agent')
-    referer = request.form.get('referer')
-    sec_ch_ua = request.form.get('sec_ch_ua')
-    sec_ch_ua_platform = request.form.get('sec_ch_ua_platform')
-    sec_ch_ua_mobile = request.form.get('sec_ch_ua_mobile')
-    if app_name:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['app_name', app_name]
-        )
-    if app_logo:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['app_logo', app_logo]
-        )
-    if http_proxy is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['http_proxy', http_proxy]
-        )
-    if https_proxy is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['https_proxy', https_proxy]
-        )
-    if user_agent is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['user_agent', user_agent]
-        )
-    if referer is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['referer', referer]
-        )
-    if sec_ch_ua is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['sec_ch_ua', sec_ch_ua]
-        )
-    if sec_ch_ua_platform is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['sec_ch_ua_platform', sec_ch_ua_platform]
-        )
-    if sec_ch_ua_mobile is not None:
-        execute_update(
-            "insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value",
-            ['sec_ch_ua_mobile', sec_ch_ua_mobile]
-        )
+    values = {}
+    # 名称与 Logo 为空时保留原值，其余字段允许清空
+    for key in ('app_name', 'app_logo'):
+        val = request.form.get(key)
+        if val:
+            values[key] = val
+    for key in ('http_proxy', 'https_proxy', 'user_agent', 'referer', 'sec_ch_ua', 'sec_ch_ua_platform', 'sec_ch_ua_mobile', 'parser_backend'):
+        val = request.form.get(key)
+        if val is not None:
+            values[key] = val
+    save_settings(values)
     flash('设置已更新', 'success')
     return redirect(url_for('admin.settings'))
 
@@ -188,6 +152,7 @@ def add_source():
     if enabled not in (0,1):
         enabled = 1
     execute_update("insert into sources(keyword, interval_minutes, enabled, crawler_name) values(?, ?, ?, ?)", [keyword, interval, enabled, crawler_name])
+    scheduler.reload()
     return jsonify({'code': 0, 'msg': '添加成功'})
 
 @bp.route('/sources/toggle/<int:source_id>', methods=['POST'])
@@ -197,11 +162,13 @@ def toggle_source(source_id):
         return jsonify({'code': 1, 'msg': '未找到'})
     new_val = 0 if row['enabled'] == 1 else 1
     execute_update("update sources set enabled = ? where id = ?", [new_val, source_id])
+    scheduler.reload()
     return jsonify({'code': 0, 'msg': '已更新'})
 
 @bp.route('/sources/delete/<int:source_id>', methods=['POST'])
 def delete_source(source_id):
     execute_update("delete from sources where id = ?", [source_id])
+    scheduler.reload()
     return jsonify({'code': 0, 'msg': '删除成功'})
 
 @bp.route('/sources/update/<int:source_id>', methods=['POST'])
@@ -220,36 +187,39 @@ def update_source(source_id):
         return jsonify({'code': 1, 'msg': '无更新内容'})
     params.append(source_id)
     execute_update(f"update sources set {', '.join(sets)} where id = ?", params)
+    scheduler.reload()
     return jsonify({'code': 0, 'msg': '已更新'})
 
 @bp.route('/sources/run/<int:source_id>', methods=['POST'])
 def run_source(source_id):
-    src = query_one("select * from sources where id = ?", [source_id])
+    src = query_one("select id from sources where id = ?", [source_id])
     if not src:
         return jsonify({'code': 1, 'msg': '未找到'})
-    from .crawler import run_crawler
-    cname = (src.get('crawler_name') or '').strip()
-    items = []
-    if cname:
-        items = run_crawler(cname, src['keyword'], 10)
-    else:
-        items = fetch_items_for_keyword(src['keyword'])
-    save_items_for_keyword(src['keyword'], items)
-    execute_update("update sources set last_run = current_timestamp where id = ?", [source_id])
-    return jsonify({'code': 0, 'msg': '采集完成', 'count': len(items)})
+    # 采集在任务执行器中进行，不占用请求线程；已在采集时返回现有任务
+    job, created = jobs.submit_source(source_id)
+    return jsonify({'code': 0, 'msg': '已开始采集' if created else '该数据源正在采集', 'job': job})
+
+@bp.route('/sources/schedule')
+def source_schedule():
+    # 调度状态：运行中的来源、即将运行的来源与调度延迟
+    return jsonify({'code': 0, 'data': scheduler.status()})
 
 @bp.route('/crawl/manage')
 def crawl_manage():
-    execute_update("create table if not exists crawlers(\n        id integer primary key autoincrement,\n        name text unique not null,\n        module text,\n        callable text,\n        config text,\n        domain text,\n        enabled integer default 1,\n        created_at datetime default current_timestamp\n     )")
-    try:
-        cols = [c['name'] for c in query_all("PRAGMA table_info(crawlers)")]
-        if 'domain' not in cols:
-            execute_update("alter table crawlers add column domain text")
-    except Exception:
-        pass
     crawlers = query_all("select * from crawlers where enabled = 1 order by id asc")
     return render_template('admin/crawl_manage.html', crawlers=crawlers)
 
+@bp.route('/crawl/hosts')
+def crawl_hosts():
+    # 各采集主机的限速与熔断状态
+    return jsonify({'code': 0, 'hosts': hostguard.snapshot()})
+
+@bp.route('/crawl/hosts/reset', methods=['POST'])
+def crawl_hosts_reset():
+    host = (request.form.get('host') or '').strip().lower() or None
+    hostguard.reset(host)
+    return jsonify({'code': 0, 'msg': '已重置'})
+
 @bp.route('/data_board')
 def data_board():
     return render_template('admin/data_board.html')
@@ -369,13 +339,6 @@ def data_board_analyze():
 
 @bp.route('/crawlers')
 def crawlers():
-    execute_update("create table if not exists crawlers(\n        id integer primary key autoincrement,\n        name text unique not null,\n        module text,\n        callable text,\n        config text,\n        domain text,\n        enabled integer default 1,\n        created_at datetime default current_timestamp\n     )")
-    try:
-        cols = [c['name'] for c in query_all("PRAGMA table_info(crawlers)")]
-        if 'domain' not in cols:
-            execute_update("alter table crawlers add column domain text")
-    except Exception:
-        pass
     q = request.args.get('q', '').strip()
     rows = []
     if q:
@@ -470,57 +433,15 @@ def crawlers_auto_rule():
                     hdrs[k] = val2
                     i = j
     try:
-        settings = {s['key']: s['value'] for s in query_all("select * from settings")}
-        proxies = {}
-        if settings.get('http_proxy'):
-            proxies['http'] = settings['http_proxy']
-        if settings.get('https_proxy'):
-            proxies['https'] = settings['https_proxy']
-        ua = settings.get('user_agent') or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
-        headers = {'user-agent': ua, 'accept-language': 'zh-CN,zh;q=0.9'}
+        headers = {'accept-language': 'zh-CN,zh;q=0.9'}
         for k, v in hdrs.items():
             headers[str(k)] = str(v)
-        r = requests.get(test_url, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-        raw = r.content
-        enc = r.encoding or r.apparent_encoding or 'utf-8'
-        html = None
-        for candidate in [enc, 'utf-8', 'gbk', 'gb2312', 'big5']:
-            try:
-                html = raw.decode(candidate, errors='ignore')
-                break
-            except Exception:
-                continue
-        if html is None:
-            html = raw.decode('utf-8', errors='ignore')
-        title_xpath = ''
-        content_xpath = ''
-        try:
-            from lxml import html as lhtml
-            import lxml.html
-            doc = lhtml.fromstring(html)
-            # title detect
-            tn2 = doc.xpath('//h1')
-            if tn2:
-                title_xpath = '//h1'
-            # content detect candidates
-            candidates = [
-                "//article",
-                "//div[@id='content']",
-                "//div[contains(@class,'content')]",
-                "//div[contains(@class,'article')]",
-                "//div[contains(@class,'news')]",
-                "//div[contains(@class,'main')]"
-            ]
-            for xp in candidates:
-                cn2 = doc.xpath(xp)
-                if not cn2:
-                    continue
-                txt2 = '\n'.join([c if isinstance(c, str) else (getattr(c, 'text_content', lambda: '')() or '').strip() for c in cn2 if c is not None])
-                if len(txt2) >= 200:
-                    content_xpath = xp
-                    break
-        except Exception:
-            pass
+        r = httpclient.get(test_url, headers=headers, profile=None)
+        html = decoding.text_of(r)
+        # 按正文密度识别标题与正文容器，生成对应的 XPath
+        auto = extract.extract(html, test_url, xpaths=True)
+        title_xpath = auto['title_xpath']
+        content_xpath = auto['content_xpath']
         # only upsert into crawlers for management visibility; do NOT write into crawl_rules
         req_hdrs_json = json.dumps(hdrs, ensure_ascii=False) if hdrs else json.dumps({}, ensure_ascii=False)
         # derive friendly name from domain (2nd-level), excluding common subdomains
@@ -537,7 +458,8 @@ def crawlers_auto_rule():
             "insert into crawlers(name, module, callable, config, domain, enabled) values(?, '', '', ?, ?, 1) on conflict(name) do update set config=excluded.config, domain=excluded.domain, enabled=excluded.enabled",
             [friendly or site, req_hdrs_json, site]
         )
-        return jsonify({'code': 0, 'msg': '爬虫已更新', 'crawler': {'name': friendly or site, 'domain': site}})
+        return jsonify({'code': 0, 'msg': '爬虫已更新', 'crawler': {'name': friendly or site, 'domain': site},
+                        'title_xpath': title_xpath, 'content_xpath': content_xpath})
     except Exception as e:
         return jsonify({'code': 1, 'msg': str(e)})
 
@@ -546,25 +468,65 @@ def warehouse():
     q = request.args.get('q', '').strip()
     page = request.args.get('page', type=int) or 1
     page_size = request.args.get('page_size', type=int) or 10
+    after = request.args.get('after', type=int)
+    before = request.args.get('before', type=int)
+    # unique=1：近似重复的记录每簇只显示一条
+    unique = request.args.get('unique') == '1'
     if page < 1:
         page = 1
     if page_size < 1:
         page_size = 1
     if page_size > 200:
         page_size = 200
-    params = []
-    where = ''
-    if q:
-        where = " where title like ? or summary like ? or keyword like ?"
-        params = [f"%{q}%", f"%{q}%", f"%{q}%"]
-    total_row = query_one(f"select count(*) as cnt from crawl_records{where}", params)
-    total = (total_row and total_row.get('cnt')) or 0
+    total = record_count(q, unique)
     pages = max(1, (total + page_size - 1) // page_size)
     if page > pages:
         page = pages
-    offset = (page - 1) * page_size
-    rows = query_all(f"select id, keyword, title, summary, cover, url, source, created_at from crawl_records{where} order by id asc limit ? offset ?", params + [page_size, offset])
-    return render_template('admin/warehouse.html', rows=rows, q=q, page=page, page_size=page_size, total=total, pages=pages)
+    if after or before:
+        rows = page_records(q, page_size, after=after, before=before, unique=unique)
+    else:
+        rows = page_records_offset(q, page, page_size, unique=unique)
+    first_id = rows[0]['id'] if rows else 0
+    last_id = rows[-1]['id'] if rows else 0
+    sizes = neardup.cluster_sizes(r['cluster_id'] for r in rows) if unique else {}
+    for r in rows:
+        r['similar'] = max(0, sizes.get(r['cluster_id'], 1) - 1)
+    return render_template('admin/warehouse.html', rows=rows, q=q, page=page, page_size=page_size, total=total, pages=pages, first_id=first_id, last_id=last_id, unique=unique)
+
+@bp.get('/warehouse/export')
+def warehouse_export():
+    q = request.args.get('q', '').strip()
+    fmt = (request.args.get('format') or 'csv').lower()
+    if fmt not in ('csv', 'jsonl'):
+        return jsonify({'code': 1, 'msg': '仅支持 csv 或 jsonl'})
+    with_details = request.args.get('details') == '1'
+    gz = request.args.get('gzip') == '1'
+    # 与列表页相同的筛选：unique=1 时每个近似重复簇只导出一条
+    unique = request.args.get('unique') == '1'
+    filename = time.strftime('warehouse-%Y%m%d%H%M%S') + '.' + fmt + ('.gz' if gz else '')
+    mimetype = 'application/gzip' if gz else ('text/csv' if fmt == 'csv' else 'application/x-ndjson')
+    resp = Response(stream_with_context(export_stream(fmt, q, with_details, gz, unique)), mimetype=mimetype)
+    resp.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
+
+@bp.post('/warehouse/covers/backfill')
+def warehouse_covers_backfill():
+    # 后台为缺封面的记录解析 og:image
+    limit = request.form.get('limit', type=int) or 500
+    n = covers.backfill(min(limit, 5000))
+    return jsonify({'code': 0, 'msg': '已加入后台补全', 'count': n})
+
+@bp.post('/warehouse/dedup/backfill')
+def warehouse_dedup_backfill():
+    # 后台为历史记录计算近似重复指纹并归簇
+    return jsonify({'code': 0, 'msg': '已开始计算', 'job': jobs.submit('dedup_backfill')})
+
+@bp.get('/warehouse/cluster/<int:cluster_id>')
+def warehouse_cluster(cluster_id: int):
+    # 同一近似重复簇内的全部记录
+    rows = query_all("select id, title, source, url, created_at from crawl_records where cluster_id = ? order by id", [cluster_id])
+    return jsonify({'code': 0, 'rows': rows})
 
 @bp.post('/warehouse/update/<int:rid>')
 def warehouse_update(rid: int):
@@ -574,13 +536,18 @@ def warehouse_update(rid: int):
     url = request.form.get('url')
     source = request.form.get('source')
     keyword = request.form.get('keyword')
-    execute_update("update crawl_records set title=?, summary=?, cover=?, url=?, source=?, keyword=? where id=?", [title or '', summary or '', cover or '', url or '', source or '', keyword or '', rid])
+    with transaction():
+        execute_update("update crawl_records set title=?, summary=?, cover=?, url=?, source=?, keyword=? where id=?", [title or '', summary or '', cover or '', url or '', source or '', keyword or '', rid])
+        refresh_records([rid])
+        # 标题或摘要变化时重算近似重复指纹
+        index_new_records([rid])
     return jsonify({'code': 0, 'msg': '已更新'})
 
 @bp.post('/warehouse/delete/<int:rid>')
 def warehouse_delete(rid: int):
     execute_update("delete from crawl_details where record_id = ?", [rid])
     execute_update("delete from crawl_records where id = ?", [rid])
+    invalidate_counts()
     return jsonify({'code': 0, 'msg': '已删除'})
 
 @bp.post('/warehouse/batch_delete')
@@ -589,14 +556,11 @@ def warehouse_batch_delete():
     ids = data.get('ids') or []
     if not isinstance(ids, list) or not ids:
         return jsonify({'code': 1, 'msg': '缺少ID列表'})
-    cnt = 0
-    for rid in ids:
-        try:
-            execute_update("delete from crawl_details where record_id = ?", [rid])
-            execute_update("delete from crawl_records where id = ?", [rid])
-            cnt += 1
-        except Exception:
-            pass
+    params = [[rid] for rid in ids]
+    with transaction():
+        execute_many("delete from crawl_details where record_id = ?", params)
+        cnt = execute_many("delete from crawl_records where id = ?", params)
+    invalidate_counts()
     return jsonify({'code': 0, 'msg': '已批量删除', 'count': cnt})
 
 @bp.post('/warehouse/batch_collect')
@@ -605,43 +569,20 @@ def warehouse_batch_collect():
     ids = data.get('ids') or []
     if not isinstance(ids, list) or not ids:
         return jsonify({'code': 1, 'msg': '缺少ID列表'})
-    import requests as _req
-    cnt = 0
-    for rid in ids:
-        try:
-            rec = query_one("select url, source from crawl_records where id = ?", [rid])
-            if not rec or not rec.get('url'):
-                continue
-            payload = {'url': rec.get('url'), 'source': rec.get('source') or ''}
-            try:
-                r = _req.post('http://127.0.0.1:5000/api/deep_crawl', json=payload, timeout=20)
-                j = r.json()
-            except Exception:
-                j = {'code': 1, 'msg': '采集失败'}
-            if isinstance(j, dict) and j.get('code') == 0:
-                content_text = j.get('content_text') or ''
-                content_html = j.get('content_html') or ''
-                title = j.get('title') or ''
-                if title:
-                    try:
-                        execute_update("update crawl_records set title=? where id=?", [title, rid])
-                    except Exception:
-                        pass
-                if content_text or content_html:
-                    execute_update("insert into crawl_details(record_id, url, content_text, content_html) select id, url, ?, ? from crawl_records where id=?", [content_text, content_html, rid])
-                    cnt += 1
-        except Exception:
-            pass
-    return jsonify({'code': 0, 'msg': '已批量采集', 'count': cnt})
+    # 提交到任务队列，页面通过 /api/jobs/<id> 查询进度
+    job = jobs.start_batch_collect(ids)
+    if not job:
+        return jsonify({'code': 1, 'msg': '所选记录没有可采集的链接'})
+    return jsonify({'code': 0, 'msg': '已开始采集', 'job': job})
 
 @bp.get('/warehouse/detail/<int:rid>')
 def warehouse_detail(rid: int):
-    detail = query_one("select content_text, content_html from crawl_details where record_id = ? order by id desc limit 1", [rid])
+    detail = load_detail(rid)
     return jsonify({'code': 0, 'detail': detail or {}})
 
 @bp.post('/warehouse/analyze/<int:rid>')
 def warehouse_analyze(rid: int):
-    detail = query_one("select content_text from crawl_details where record_id = ? order by id desc limit 1", [rid])
+    detail = load_detail(rid, with_html=False)
     rec = query_one("select title, summary from crawl_records where id = ?", [rid])
     content_text = (detail and detail.get('content_text')) or (rec and rec.get('summary')) or ''
     if not content_text:
@@ -682,21 +623,27 @@ def warehouse_save_detail(rid: int):
     title = request.form.get('title')
     content_text = request.form.get('content_text') or ''
     content_html = request.form.get('content_html') or ''
-    if title:
-        execute_update("update crawl_records set title=? where id=?", [title, rid])
-    execute_update("insert into crawl_details(record_id, url, content_text, content_html) select id, url, ?, ? from crawl_records where id=?", [content_text, content_html, rid])
+    with transaction():
+        if title:
+            execute_update("update crawl_records set title=? where id=?", [title, rid])
+            refresh_records([rid])
+        save_detail(rid, content_text, content_html)
+        if title:
+            index_new_records([rid])
     return jsonify({'code': 0, 'msg': 'ok'})
 
 @bp.post('/warehouse/update_summary/<int:rid>')
 def warehouse_update_summary(rid: int):
     summary = request.form.get('summary') or ''
-    execute_update("update crawl_records set summary=? where id=?", [summary, rid])
+    with transaction():
+        execute_update("update crawl_records set summary=? where id=?", [summary, rid])
+        refresh_records([rid])
+        index_new_records([rid])
     return jsonify({'code': 0, 'msg': '已更新摘要'})
 
 # 采集规则库
 @bp.route('/rules')
 def rules():
-    execute_update("create table if not exists crawl_rules(\n        id integer primary key autoincrement,\n        site text not null,\n        title_xpath text,\n        content_xpath text,\n        request_headers text,\n        enabled integer default 1,\n        created_at datetime default current_timestamp\n    )")
     q = request.args.get('q', '').strip()
     rows = []
     if q:
@@ -787,6 +734,7 @@ def rules_add():
                 i = j
             request_headers = json.dumps(hdrs, ensure_ascii=False)
     execute_update("insert into crawl_rules(site, title_xpath, content_xpath, request_headers, enabled) values(?, ?, ?, ?, ?)", [site, title_xpath, content_xpath, request_headers, en])
+    invalidate_rules()
     return jsonify({'code': 0, 'msg': '添加成功'})
 
 @bp.post('/rules/update/<int:rule_id>')
@@ -839,11 +787,13 @@ def rules_update(rule_id: int):
                 i = j
             request_headers = json.dumps(hdrs, ensure_ascii=False)
     execute_update("update crawl_rules set site=?, title_xpath=?, content_xpath=?, request_headers=?, enabled=? where id=?", [site, title_xpath, content_xpath, request_headers, en, rule_id])
+    invalidate_rules()
     return jsonify({'code': 0, 'msg': '已更新'})
 
 @bp.post('/rules/delete/<int:rule_id>')
 def rules_delete(rule_id: int):
     execute_update("delete from crawl_rules where id = ?", [rule_id])
+    invalidate_rules()
     return jsonify({'code': 0, 'msg': '已删除'})
 
 @bp.post('/rules/toggle/<int:rule_id>')
@@ -853,11 +803,11 @@ def rules_toggle(rule_id: int):
         return jsonify({'code': 1, 'msg': '未找到'})
     new_val = 0 if row['enabled'] == 1 else 1
     execute_update("update crawl_rules set enabled = ? where id = ?", [new_val, rule_id])
+    invalidate_rules()
     return jsonify({'code': 0, 'msg': '已更新', 'enabled': new_val})
 
 @bp.route('/ai_engines')
 def ai_engines():
-    execute_update("create table if not exists ai_engines(\n        id integer primary key autoincrement,\n        provider_name text not null,\n        api_url text not null,\n        api_key text not null,\n        model_name text not null,\n        enabled integer default 1,\n        created_at datetime default current_timestamp\n    )")
     q = request.args.get('q', '').strip()
     rows = []
     if q:
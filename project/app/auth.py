@@ -2,7 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
 from werkzeug.security import check_password_hash, generate_password_hash
 from .db import query_one, execute_update
-from .models import User
+from .models import User, invalidate_user
 
 bp = Blueprint('auth', __name__)
 
@@ -61,6 +61,7 @@ def profile():
         else:
             pwd_hash = generate_password_hash(password)
             execute_update("update users set password_hash = ? where id = ?", [pwd_hash, current_user.id])
+            invalidate_user(current_user.id)
             flash('密码修改成功', 'success')
             
     return render_template('profile.html')
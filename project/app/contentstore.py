@@ -0,0 +1,70 @@
+import hashlib
+import zlib
+from .db import query_one, execute_update, after_commit
+from . import neardup
+
+CODEC = 'zlib'
+LEVEL = 6
+
+def put_blob(text):
+    # 按内容哈希存储压缩正文，相同内容只存一份；空内容返回 None
+    if not text:
+        return None
+    raw = text.encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+    if not query_one("select 1 from content_blobs where hash = ?", [digest]):
+        execute_update(
+            "insert into content_blobs(hash, codec, size, data) values(?, ?, ?, ?) on conflict(hash) do nothing",
+            [digest, CODEC, len(raw), zlib.compress(raw, LEVEL)]
+        )
+    return digest
+
+def get_blob(digest):
+    if not digest:
+        return ''
+    row = query_one("select codec, data from content_blobs where hash = ?", [digest])
+    if not row:
+        return ''
+    return decode_blob(row['codec'], row['data'])
+
+def decode_blob(codec, data):
+    if data is None:
+        return ''
+    if codec == 'zlib':
+        data = zlib.decompress(data)
+    return data.decode('utf-8')
+
+def save_detail(record_id, content_text, content_html, sig=None):
+    # 写入一条详情；若与该记录最近一次采集内容相同则跳过，返回是否写入。
+    # 写入后更新正文的 MinHash 近似重复索引，sig 为调用方预先算好的签名
+    text_hash = put_blob(content_text)
+    html_hash = put_blob(content_html)
+    latest = query_one("select text_hash, html_hash from crawl_details where record_id = ? order by id desc limit 1", [record_id])
+    if latest and latest['text_hash'] == text_hash and latest['html_hash'] == html_hash:
+        return False
+    execute_update(
+        "insert into crawl_details(record_id, url, content_text, content_html, text_hash, html_hash) "
+        "select id, coalesce(url, ''), '', '', ?, ? from crawl_records where id = ?",
+        [text_hash, html_hash, record_id]
+    )
+    # 正文索引在调用方事务提交后再做，MinHash 计算与归簇不占用写锁；失败时由 dedup_backfill 补全
+    def index():
+        try:
+            neardup.index_content(record_id, content_text, text_hash, sig)
+        except Exception:
+            pass
+    after_commit(index)
+    return True
+
+def load_detail(record_id, with_html=True):
+    # 读取最近一次详情，只解压调用方需要的字段；兼容未压缩的历史行
+    row = query_one(
+        "select content_text, content_html, text_hash, html_hash from crawl_details where record_id = ? order by id desc limit 1",
+        [record_id]
+    )
+    if not row:
+        return None
+    detail = {'content_text': get_blob(row['text_hash']) if row['text_hash'] else (row['content_text'] or '')}
+    if with_html:
+        detail['content_html'] = get_blob(row['html_hash']) if row['html_hash'] else (row['content_html'] or '')
+    return detail
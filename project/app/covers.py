@@ -0,0 +1,179 @@
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+from lxml import html as lhtml
+from . import httpclient, decoding
+from .db import execute_many, query_all
+from .fetch import map_ordered
+from .normalize import url_key
+
+# 封面只需 <head> 中的 meta：流式读取到 </head> 或 HEAD_LIMIT 字节即停止
+HEAD_LIMIT = 64 * 1024
+CHUNK = 8192
+TIMEOUT = 5
+CACHE_SIZE = 4096
+CACHE_TTL = 6 * 3600
+BATCH = 8
+
+_head_end = re.compile(rb'</head\s*>', re.IGNORECASE)
+_xml_decl = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_queue = queue.Queue()
+_pending = set()
+_worker = None
+_worker_lock = threading.Lock()
+
+def read_head(url):
+    # 返回页面开头直到 </head> 的文本，以及最终 URL
+    resp = httpclient.get(url, profile='search', timeout=TIMEOUT, stream=True)
+    try:
+        buf = b''
+        for chunk in resp.iter_content(CHUNK):
+            buf += chunk
+            if _head_end.search(buf, max(0, len(buf) - len(chunk) - 8)) or len(buf) >= HEAD_LIMIT:
+                break
+        text, _ = decoding.decode(buf, resp.headers.get('Content-Type'))
+        return text, resp.url or url
+    finally:
+        resp.close()
+
+def parse_head(text, base_url):
+    # 依次取 og/twitter 图片、站点图标、首个 <img>；均按页面地址补全为绝对 URL
+    meta = icon = img = ''
+    text = _xml_decl.sub('', text or '')
+    if text.strip():
+        try:
+            doc = lhtml.document_fromstring(text)
+        except Exception:
+            doc = None
+        if doc is not None:
+            for name in ('og:image', 'twitter:image'):
+                vals = doc.xpath('//meta[@property=$n or @name=$n]/@content', n=name)
+                vals = [v for v in vals if v.strip()]
+                if vals:
+                    meta = vals[0].strip()
+                    break
+            for rel in ('icon', 'shortcut icon', 'apple-touch-icon'):
+                vals = [v for v in doc.xpath('//link[@rel=$r]/@href', r=rel) if v.strip()]
+                if vals:
+                    icon = vals[0].strip()
+                    break
+            vals = [v for v in doc.xpath('//img/@src') if v.strip()]
+            if vals:
+                img = vals[0].strip()
+    return tuple(urljoin(base_url, v) if v else '' for v in (meta, icon, img))
+
+def _cached(url):
+    with _cache_lock:
+        hit = _cache.get(url)
+        if hit is None:
+            return None
+        if time.time() - hit[0] > CACHE_TTL:
+            _cache.pop(url, None)
+            return None
+        _cache.move_to_end(url)
+        return hit[1]
+
+def _remember(url, value):
+    with _cache_lock:
+        _cache[url] = (time.time(), value)
+        _cache.move_to_end(url)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def _choose(found, url, icons):
+    if not found:
+        return ''
+    meta, icon, img = found
+    if icons:
+        if meta or icon or img:
+            return meta or icon or img
+        pu = urlsplit(url)
+        return f"{pu.scheme}://{pu.netloc}/favicon.ico" if pu.netloc else ''
+    return meta or img
+
+def resolve(url, icons=True):
+    # icons=True 时在没有 og:image 的情况下退回站点图标 / favicon
+    found = _cached(url)
+    if found is None:
+        text, final = read_head(url)
+        found = parse_head(text, final)
+        _remember(url, found)
+    return _choose(found, url, icons)
+
+def wants_cover(it):
+    return not it.get('封面') and (it.get('原始URL') or '').startswith('http')
+
+def enrich(items, icons=True, limit=None):
+    # 用缓存即时补全封面，未命中的交给后台解析并回写 crawl_records.cover；不阻塞调用方
+    misses = []
+    for it in (items if limit is None else items[:limit]):
+        if not wants_cover(it):
+            continue
+        found = _cached(it['原始URL'])
+        if found is None:
+            misses.append(it['原始URL'])
+        else:
+            it['封面'] = _choose(found, it['原始URL'], icons)
+    schedule(misses, icons)
+    return items
+
+def schedule(urls, icons=True):
+    added = False
+    with _worker_lock:
+        for u in urls:
+            if u and u not in _pending:
+                _pending.add(u)
+                _queue.put((u, icons))
+                added = True
+        if added:
+            _ensure_worker()
+
+def backfill(limit=500):
+    # 为已入库但没有封面的记录排队解析，返回排队条数
+    rows = query_all(
+        "select url from crawl_records where coalesce(cover, '') = '' and url like 'http%' order by id desc limit ?",
+        [limit]
+    )
+    schedule([r['url'] for r in rows])
+    return len(rows)
+
+def _ensure_worker():
+    global _worker
+    if _worker is None or not _worker.is_alive():
+        _worker = threading.Thread(target=_work, name='cover-backfill', daemon=True)
+        _worker.start()
+
+def _resolve_job(job):
+    url, icons = job
+    try:
+        return resolve(url, icons)
+    except Exception:
+        # 失败也记一次空结果，避免同一链接反复请求
+        _remember(url, ())
+        return ''
+
+def _work():
+    while True:
+        batch = [_queue.get()]
+        while len(batch) < BATCH:
+            try:
+                batch.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            found = map_ordered(_resolve_job, batch, url_of=lambda job: job[0], default='')
+            updates = [(cover, url_key(job[0])) for job, cover in zip(batch, found) if cover and url_key(job[0])]
+            if updates:
+                execute_many("update crawl_records set cover = ? where url_key = ? and coalesce(cover, '') = ''", updates)
+        except Exception:
+            pass
+        finally:
+            with _worker_lock:
+                for job in batch:
+                    _pending.discard(job[0])
@@ -1,7 +1,13 @@
-from flask import Blueprint, request, jsonify
-import requests
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from bs4 import BeautifulSoup
-from .db import execute_update, query_all, query_one
+from lxml import html as lhtml
+from .db import query_one, execute_update, transaction, after_commit
+from .search import search_records, reindex, FTS_INSERT, fts_params
+from .contentstore import save_detail
+from .normalize import url_key, title_fp
+from .fetch import map_ordered
+from .parsers import parse_items, parse_news_items
+from . import httpclient, httpcache, hostguard, covers, decoding, rules, jobs, neardup, extract, warehouse
 import json
 import time
 import random
@@ -11,260 +17,191 @@ from urllib.parse import urljoin
 
 bp = Blueprint('crawler', __name__, url_prefix='/api')
 
-def parse_items(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    items = []
-    def pick_cover(container):
-        img = container.select_one('img') or container.select_one('.c-img img') or container.select_one('.c-img')
-        url = ''
-        if img:
-            for key in ('src','data-src','data-original'):
-                if img.has_attr(key) and img.get(key):
-                    url = img.get(key)
-                    break
-        if not url:
-            styled = container.select_one('[style*="background"]')
-            if styled and styled.has_attr('style'):
-                m = re.search(r'url\(([^)]+)\)', styled['style'])
-                if m:
-                    url = m.group(1).strip('"\'')
-        if url.startswith('//'):
-            url = 'https:' + url
-        return url
-    for res in soup.select('div.result'):
-        title_tag = res.select_one('h3 a') or res.select_one('a')
-        title = title_tag.get_text(strip=True) if title_tag else ''
-        href = title_tag['href'] if title_tag and title_tag.has_attr('href') else ''
-        summary_tag = res.select_one('.c-line-clamp3') or res.select_one('.c-abstract') or res.select_one('div')
-        summary = summary_tag.get_text(strip=True) if summary_tag else ''
-        source_tag = res.select_one('.c-author') or res.select_one('.news-source') or res.select_one('span')
-        source = source_tag.get_text(strip=True) if source_tag else ''
-        cover = pick_cover(res)
-        if title or href:
-            items.append({'标题': title, '概要': summary, '封面': cover, '原始URL': href, '来源': source})
-    if not items:
-        for a in soup.select('h3 a'):
-            title = a.get_text(strip=True)
-            href = a.get('href', '')
-            items.append({'标题': title, '概要': '', '封面': '', '原始URL': href, '来源': ''})
-    return items
-
-def parse_news_items(html):
-    soup = BeautifulSoup(html, 'html.parser')
-    items = []
-    def pick_cover(container):
-        img = container.select_one('img') or container.select_one('.c-img img') or container.select_one('.c-img')
-        url = ''
-        if img:
-            for key in ('src','data-src','data-original'):
-                if img.has_attr(key) and img.get(key):
-                    url = img.get(key)
-                    break
-        if not url:
-            styled = container.select_one('[style*="background"]')
-            if styled and styled.has_attr('style'):
-                m = re.search(r'url\(([^)]+)\)', styled['style'])
-                if m:
-                    url = m.group(1).strip('"\'')
-        if url.startswith('//'):
-            url = 'https:' + url
-        return url
-    containers = soup.select('div.result') or soup.select('.result')
-    for res in containers:
-        title_tag = res.select_one('h3 a') or res.select_one('a')
-        title = title_tag.get_text(strip=True) if title_tag else ''
-        href = title_tag['href'] if title_tag and title_tag.has_attr('href') else ''
-        summary_tag = res.select_one('.c-summary') or res.select_one('.c-row') or res.select_one('p')
-        summary = summary_tag.get_text(strip=True) if summary_tag else ''
-        source_tag = res.select_one('.c-author') or res.select_one('.source')
-        source = source_tag.get_text(strip=True) if source_tag else ''
-        cover = pick_cover(res)
-        if title or href:
-            items.append({'标题': title, '概要': summary, '封面': cover, '原始URL': href, '来源': source})
-    if not items:
-        for a in soup.select('h3 a'):
-            title = a.get_text(strip=True)
-            href = a.get('href', '')
-            items.append({'标题': title, '概要': '', '封面': '', '原始URL': href, '来源': ''})
-    return items
-
-def collect_baidu_items(keyword, count):
+def collect_baidu_items(keyword, count, state=None):
+    # state 为来源的增量状态（incremental.SourceState）时逐页抓取，只返回未见过的条目，
+    # 某页已无新条目即停止翻页；此时不受 count 限制，避免新条目多于 count 时漏采
     if not keyword:
         return []
     url = 'https://www.baidu.com/s'
     params = {
         'rtt': '1', 'bsst': '1', 'cl': '2', 'tn': 'news', 'rsv_dl': 'ns_pc', 'word': keyword
     }
-    headers = {
-        'cache-control': 'max-age=0',
-        'referer': 'https://www.baidu.com/',
-        'sec-ch-ua': '"Chromium";v="142", "Microsoft Edge";v="142", "Not_A Brand";v="99"',
-        'sec-ch-ua-mobile': '?0',
-        'sec-ch-ua-platform': '"Windows"',
-        'user-agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
-    }
     count = count or 10
     out = []
     seen = set()
-    current_pn = 0
     max_attempts = max(5, count // 2)
-    for i in range(max_attempts):
-        if len(out) >= count:
-            break
-        params_p = dict(params)
-        params_p['pn'] = current_pn * 10
+    def fetch_page(pn):
         try:
-            resp = requests.get(url, params=params_p, headers=headers, timeout=10)
-            page_items = parse_items(resp.text)
+            resp = httpclient.get(url, params=dict(params, pn=pn * 10), profile='search', report=False)
+            page_items = httpclient.parse_reported(resp, lambda r: parse_items(decoding.text_of(r)))
         except Exception:
             page_items = []
         if not page_items:
             url2 = 'https://news.baidu.com/ns'
-            params2 = {'word': keyword, 'tn': 'news', 'from': 'news', 'pn': current_pn * 20}
+            params2 = {'word': keyword, 'tn': 'news', 'from': 'news', 'pn': pn * 20}
             try:
-                resp2 = requests.get(url2, params=params2, headers=headers, timeout=10)
-                page_items = parse_news_items(resp2.text)
+                resp2 = httpclient.get(url2, params=params2, profile='search', report=False)
+                page_items = httpclient.parse_reported(resp2, lambda r: parse_news_items(decoding.text_of(r)))
             except Exception:
                 page_items = []
-        added_in_page = 0
-        for it in page_items:
-            u = it.get('原始URL','')
-            t = it.get('标题','')
-            key = u or t
-            if key and key in seen:
-                continue
-            if key:
-                seen.add(key)
-            if not it.get('来源'):
-                it['来源'] = '百度'
-            out.append(it)
-            added_in_page += 1
-            if len(out) >= count:
+        return page_items
+    current_pn = 0
+    exhausted = False
+    incremental = state is not None
+    while current_pn < max_attempts and (incremental or len(out) < count) and not exhausted:
+        # 按还缺的条数（每页约10条）决定本轮并发抓取的页数，结果仍按页码顺序合并
+        batch = 1 if incremental else min(max_attempts - current_pn, max(1, -(-(count - len(out)) // 10)))
+        pages = map_ordered(fetch_page, range(current_pn, current_pn + batch), url_of=lambda pn: url, default=[])
+        current_pn += batch
+        for page_items in pages:
+            if incremental and state.exhausted(page_items):
+                exhausted = True
+            for it in page_items:
+                u = it.get('原始URL','')
+                t = it.get('标题','')
+                key = u or t
+                if key and key in seen:
+                    continue
+                if incremental and state.seen(it):
+                    continue
+                if key:
+                    seen.add(key)
+                if not it.get('来源'):
+                    it['来源'] = '百度'
+                out.append(it)
+                if len(out) >= count and not incremental:
+                    break
+            if len(out) >= count and not incremental:
                 break
-        current_pn += 1
-        if i > 1 and added_in_page == 0:
-            pass
-    out = out[:count]
+    if not incremental:
+        out = out[:count]
     if not out:
         out = []
-    try:
-        def find_meta_image(html, base_url):
-            s = BeautifulSoup(html, 'html.parser')
-            for sel in [
-                'meta[property="og:image"]',
-                'meta[name="og:image"]',
-                'meta[name="twitter:image"]',
-                'meta[property="twitter:image"]'
-            ]:
-                m = s.select_one(sel)
-                if m and m.has_attr('content') and m['content']:
-                    return m['content']
-            for sel in [
-                'link[rel="icon"]',
-                'link[rel="shortcut icon"]',
-                'link[rel="apple-touch-icon"]'
-            ]:
-                l = s.select_one(sel)
-                if l and l.has_attr('href') and l['href']:
-                    return l['href']
-            img = s.select_one('img')
-            if img and img.has_attr('src'):
-                return img['src']
-            try:
-                from urllib.parse import urlparse
-                pu = urlparse(base_url)
-                return f"{pu.scheme}://{pu.netloc}/favicon.ico"
-            except Exception:
-                return ''
-        for i in range(min(6, len(out))):
-            it = out[i]
-            if not it.get('封面') and it.get('原始URL','').startswith('http'):
-                try:
-                    r2 = requests.get(it['原始URL'], headers=headers, timeout=5)
-                    cover2 = find_meta_image(r2.text, it['原始URL'])
-                    if cover2:
-                        if cover2.startswith('//'):
-                            cover2 = 'https:' + cover2
-                        it['封面'] = cover2
-                except Exception:
-                    pass
-    except Exception:
-        pass
+    # 封面在后台解析，这里只取已缓存的结果
+    covers.enrich(out, limit=6)
     return out
 
+def wants_async(data=None):
+    # async=1 时提交到任务队列并立即返回任务，结果通过 /api/jobs/<id> 获取
+    value = request.args.get('async') or (data or {}).get('async')
+    return str(value).lower() in ('1', 'true')
+
+def submitted(kind, payload):
+    return jsonify({'code': 0, 'msg': '已提交', 'job': jobs.submit(kind, payload)})
+
 @bp.get('/crawl')
 def crawl():
     keyword = request.args.get('keyword', '')
     if not keyword:
         return jsonify([])
     count = request.args.get('count', type=int) or 10
+    save = request.args.get('save') == '1'
+    if wants_async():
+        return submitted('crawl', {'keyword': keyword, 'count': count, 'save': save})
+    return jsonify(crawl_result(keyword, count, save))
+
+def crawl_result(keyword, count, save=False):
     out = collect_baidu_items(keyword, count)
-    if request.args.get('save') == '1':
-        for it in out:
-            execute_update(
-                "insert into crawl_records(keyword, title, summary, cover, url, source) values(?, ?, ?, ?, ?, ?)",
-                [keyword, it.get('标题',''), it.get('概要',''), it.get('封面',''), it.get('原始URL',''), it.get('来源','')]
-            )
+    if save:
+        save_items_for_keyword(keyword, out)
     # 本地库兜底：若外部采集为空，尝试从数据库返回历史记录
     if not out:
         try:
-            rows = query_all(
-                "select title as 标题, summary as 概要, cover as 封面, url as 原始URL, source as 来源 from crawl_records where (keyword like ? or title like ? or summary like ?) order by id desc limit ?",
-                [f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", count]
-            )
+            rows = search_records(keyword, count)
             out = rows or []
         except Exception:
             pass
-    return jsonify(out)
+    return out
 
 def fetch_items_for_keyword(keyword):
-    settings_map = {s['key']: s['value'] for s in query_all("select * from settings")}
-    proxies = {}
-    if settings_map.get('http_proxy'):
-        proxies['http'] = settings_map['http_proxy']
-    if settings_map.get('https_proxy'):
-        proxies['https'] = settings_map['https_proxy']
-    ua = settings_map.get('user_agent') or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
-    referer = settings_map.get('referer') or 'https://www.baidu.com/'
-    ch_ua = settings_map.get('sec_ch_ua') or '"Chromium";v="142", "Not_A Brand";v="99", "Google Chrome";v="142"'
-    ch_ua_platform = settings_map.get('sec_ch_ua_platform') or '"Windows"'
-    ch_ua_mobile = settings_map.get('sec_ch_ua_mobile') or '?0'
     try:
-        call_ztbox(keyword, proxies, ua, referer)
+        call_ztbox(keyword)
     except Exception:
         pass
     url = 'https://www.baidu.com/s'
     params = {'rtt': '1', 'bsst': '1', 'cl': '2', 'tn': 'news', 'rsv_dl': 'ns_pc', 'word': keyword}
-    headers = {
-        'cache-control': 'max-age=0',
-        'referer': referer,
-        'sec-ch-ua': ch_ua,
-        'sec-ch-ua-mobile': ch_ua_mobile,
-        'sec-ch-ua-platform': ch_ua_platform,
-        'accept-language': 'zh-CN,zh;q=0.9',
-        'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-        'user-agent': ua
-    }
-    resp = requests.get(url, params=params, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-    items = parse_items(resp.text)
+    try:
+        resp = httpclient.get(url, params=params, profile='search', report=False)
+        items = httpclient.parse_reported(resp, lambda r: parse_items(decoding.text_of(r)))
+    except hostguard.HostUnavailable:
+        # 主站熔断或限速时直接改走新闻站
+        items = []
     if not items:
         url2 = 'https://news.baidu.com/ns'
         params2 = {'word': keyword, 'tn': 'news', 'from': 'news'}
-        resp2 = requests.get(url2, params=params2, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-        items = parse_news_items(resp2.text)
+        resp2 = httpclient.get(url2, params=params2, profile='search', report=False)
+        items = httpclient.parse_reported(resp2, lambda r: parse_news_items(decoding.text_of(r)))
     for it in items:
         if not it.get('来源'):
             it['来源'] = '百度'
     return items
 
-def save_items_for_keyword(keyword, items):
-    for it in items:
+# 归一化 URL 或同关键字标题指纹已存在时跳过，由唯一索引判重
+RECORD_INSERT = (
+    "insert into crawl_records(keyword, title, summary, cover, url, source, url_key, title_fp) "
+    "values(?, ?, ?, ?, ?, ?, ?, ?) on conflict do nothing"
+)
+
+def record_params(keyword, title, summary, cover, url, source):
+    return [keyword, title, summary, cover, url, source, url_key(url), title_fp(keyword, title)]
+
+def insert_record(conn, keyword, title, summary, cover, url, source):
+    # 写入记录及其全文索引行，返回新记录 id；去重键冲突时返回 None
+    cur = conn.execute(RECORD_INSERT, record_params(keyword, title, summary, cover, url, source))
+    if not cur.rowcount:
+        return None
+    conn.execute(FTS_INSERT, fts_params(cur.lastrowid, title, summary, keyword))
+    return cur.lastrowid
+
+def refresh_records(ids):
+    # 网址、标题、关键字或概要被修改后重算去重键与全文索引；与修改在同一事务中调用。
+    # 新键已被其他记录占用时置空
+    for rid in ids:
+        row = query_one("select url, title, keyword from crawl_records where id = ?", [rid])
+        if not row:
+            continue
         execute_update(
-            "insert into crawl_records(keyword, title, summary, cover, url, source) values(?, ?, ?, ?, ?, ?)",
-            [keyword, it.get('标题',''), it.get('概要',''), it.get('封面',''), it.get('原始URL',''), it.get('来源','')]
+            "update crawl_records set "
+            "url_key = case when exists (select 1 from crawl_records where url_key = ?1 and id <> ?3) then null else ?1 end, "
+            "title_fp = case when exists (select 1 from crawl_records where title_fp = ?2 and id <> ?3) then null else ?2 end "
+            "where id = ?3",
+            [url_key(row['url']), title_fp(row['keyword'], row['title']), rid]
         )
+    reindex(ids)
+    # 编辑可能改变记录是否符合已缓存总数的检索条件
+    after_commit(warehouse.invalidate_counts)
 
-def call_ztbox(keyword: str, proxies: dict, ua: str, referer: str):
+def index_new_records(ids):
+    # 为本次新增或编辑的记录计算近似重复指纹并归簇。在调用方事务提交之后执行，不占用写锁；
+    # 失败的记录指纹保持为空，由后台 dedup_backfill 任务补全（历史记录同样由该任务处理）
+    ids = list(ids or [])
+    if not ids:
+        return
+
+    def run():
+        try:
+            neardup.index_records(ids)
+        except Exception:
+            pass
+    after_commit(run)
+
+def save_items_for_keyword(keyword, items):
+    # 返回实际新增的条数；缺封面的条目在调用方事务提交后交给后台回填，回滚时不回填
+    ids = []
+    urls = [it.get('原始URL') for it in items or [] if covers.wants_cover(it)]
+    with transaction() as conn:
+        for it in items or []:
+            rid = insert_record(
+                conn, keyword, it.get('标题',''), it.get('概要',''), it.get('封面',''), it.get('原始URL',''), it.get('来源','')
+            )
+            if rid:
+                ids.append(rid)
+        if urls:
+            after_commit(lambda: covers.schedule(urls))
+        index_new_records(ids)
+    return len(ids)
+
+def call_ztbox(keyword: str):
     payload = {
         "cateid": "99",
         "actiondata": {
@@ -290,13 +227,7 @@ def call_ztbox(keyword: str, proxies: dict, ua: str, referer: str):
     data_param = urllib.parse.quote(json.dumps(payload, ensure_ascii=True))
     url = "https://mbd.baidu.com/ztbox"
     params = {"action": "zpblog", "appname": "pcsearch", "v": "2.0", "data": data_param}
-    headers = {
-        'referer': referer,
-        'origin': 'https://www.baidu.com',
-        'user-agent': ua,
-        'cache-control': 'max-age=0'
-    }
-    requests.get(url, params=params, headers=headers, timeout=5, proxies=proxies or None, allow_redirects=True)
+    httpclient.get(url, params=params, headers={'origin': 'https://www.baidu.com'}, profile='search', timeout=5)
 
 @bp.post('/deep_crawl')
 def deep_crawl():
@@ -304,267 +235,99 @@ def deep_crawl():
     url = data.get('url') or ''
     if not url:
         return jsonify({'code': 1, 'msg': '缺少URL'})
-    settings_map = {s['key']: s['value'] for s in query_all("select * from settings")}
-    proxies = {}
-    if settings_map.get('http_proxy'):
-        proxies['http'] = settings_map['http_proxy']
-    if settings_map.get('https_proxy'):
-        proxies['https'] = settings_map['https_proxy']
-    ua = settings_map.get('user_agent') or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
-    headers = {
-        'user-agent': ua,
-        'referer': settings_map.get('referer') or 'https://www.baidu.com/',
-        'accept-language': 'zh-CN,zh;q=0.9',
-        'accept-encoding': 'gzip, deflate'
-    }
-    # 读取采集规则，匹配站点并合并自定义请求头
-    rule = None
+    if wants_async(data):
+        return submitted('deep_crawl', {'url': url, 'source': data.get('source') or ''})
+    return jsonify(extract_detail(url, data.get('source') or ''))
+
+def extract_detail(url, source=''):
+    # 抓取并解析文章详情，返回 deep_crawl 接口的结果字典；批量采集任务直接调用。
+    # 按站点匹配采集规则，合并规则中的自定义请求头
     try:
-        rules = query_all("select * from crawl_rules where enabled = 1 order by id desc")
-        for r in rules:
-            s = r.get('site') or ''
-            src = (data.get('source') or '').strip()
-            if s and (s in url or (src and s in src)):
-                rule = r
-                break
-        if rule and (rule.get('request_headers')):
-            try:
-                hdrs = json.loads(rule['request_headers'])
-                if isinstance(hdrs, dict):
-                    for k, v in hdrs.items():
-                        if v is not None:
-                            headers[str(k)] = str(v)
-            except Exception:
-                pass
+        rule = rules.match(url, source)
     except Exception:
         rule = None
+    headers = dict(rule.headers) if rule else {}
     try:
-        r = requests.get(url, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-        raw = r.content
-        enc_hdr = (r.headers.get('Content-Encoding') or '').lower()
-        if 'br' in enc_hdr:
-            ok = False
-            try:
-                import brotli
-                raw = brotli.decompress(raw)
-                ok = True
-            except Exception:
-                try:
-                    import brotlicffi as brotli
-                    raw = brotli.decompress(raw)
-                    ok = True
-                except Exception:
-                    ok = False
-            if not ok:
-                try:
-                    hdr2 = dict(headers)
-                    hdr2['accept-encoding'] = 'identity'
-                    r2 = requests.get(url, headers=hdr2, timeout=10, proxies=proxies or None, allow_redirects=True)
-                    raw = r2.content
-                    r = r2
-                    enc_hdr = (r.headers.get('Content-Encoding') or '').lower()
-                except Exception:
-                    pass
-        elif 'gzip' in enc_hdr:
-            try:
-                import gzip
-                raw = gzip.decompress(raw)
-            except Exception:
-                pass
-        elif 'deflate' in enc_hdr:
-            try:
-                import zlib
-                raw = zlib.decompress(raw, -zlib.MAX_WBITS)
-            except Exception:
-                try:
-                    import zlib
-                    raw = zlib.decompress(raw)
-                except Exception:
-                    pass
+        # 重复打开同一文章时只发条件请求，304 直接使用磁盘缓存
+        # 无法解压的编码由 httpcache 以 identity 重新请求
+        r = httpcache.get(url, headers=headers, profile='page', stream=True)
+        raw = decoding.read_body(r)
         ct = (r.headers.get('Content-Type') or '').lower()
         if raw[:4] == b'%PDF' or raw[:2] == b'PK':
-            return jsonify({'code': 1, 'msg': '该链接返回非文本内容，暂不支持解析'})
-        def pick_encoding():
-            try:
-                from requests.utils import get_encoding_from_headers
-                enc_h = get_encoding_from_headers(r.headers)
-            except Exception:
-                enc_h = None
-            if enc_h:
-                return enc_h
-            try:
-                m1 = re.search(br'<meta[^>]*charset\s*=\s*[\"\']?([a-zA-Z0-9_-]+)', raw, re.IGNORECASE)
-                if m1:
-                    return m1.group(1).decode('ascii', errors='ignore')
-                m2 = re.search(br'charset\s*=\s*([a-zA-Z0-9_-]+)', raw, re.IGNORECASE)
-                if m2:
-                    return m2.group(1).decode('ascii', errors='ignore')
-            except Exception:
-                pass
-            enc_req = r.encoding
-            if enc_req and enc_req.lower() != 'iso-8859-1':
-                return enc_req
-            enc_app = getattr(r, 'apparent_encoding', None)
-            return enc_app or 'utf-8'
-        enc = pick_encoding() or 'utf-8'
-        html = None
-        candidates = [enc, 'utf-8', 'utf-8-sig', 'gb18030', 'gbk', 'gb2312', 'big5']
-        for candidate in candidates:
-            if not candidate:
-                continue
-            try:
-                h = raw.decode(candidate, errors='replace')
-                low = h.lower()
-                if ('<html' in low) or ('</html>' in low) or ('<div' in low) or ('</div>' in low):
-                    html = h
-                    break
-                if not html:
-                    html = h
-            except Exception:
-                continue
-        if html is None:
-            html = raw.decode('utf-8', errors='replace')
-        try:
-            html = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]', '', html)
-        except Exception:
-            pass
+            return {'code': 1, 'msg': '该链接返回非文本内容，暂不支持解析'}
+        html, _ = decoding.decode(raw, r.headers.get('Content-Type'))
         if ct and ('application/pdf' in ct or 'octet-stream' in ct):
-            return jsonify({'code': 1, 'msg': '该链接返回非文本内容，暂不支持解析'})
-        # 若存在规则且提供了XPath，尝试按规则提取
-        if rule and (rule.get('title_xpath') or rule.get('content_xpath')):
+            return {'code': 1, 'msg': '该链接返回非文本内容，暂不支持解析'}
+        # 页面只解析一次：规则 XPath 与正文抽取共用同一棵树
+        doc = extract.parse(html)
+        if doc is None:
+            return {'code': 0, 'msg': 'ok', 'title': '', 'content_text': '', 'content_html': html}
+        title_val = ''
+        content_text = ''
+        content_html = ''
+        if rule and (rule.title_xpath or rule.content_xpath):
             try:
-                from lxml import html as lhtml
-                import lxml.html
-                doc = lhtml.fromstring(html)
-                title_val = ''
-                if rule.get('title_xpath'):
-                    tn = doc.xpath(rule['title_xpath'])
+                if rule.title_xp is not None:
+                    tn = rule.title_xp(doc)
                     if tn:
                         t0 = tn[0]
-                        title_val = t0 if isinstance(t0, str) else (t0.text_content() or '').strip()
-                content_text = ''
-                content_html = ''
-                if rule.get('content_xpath'):
-                    cn = doc.xpath(rule['content_xpath'])
-                    if cn:
-                        content_text = '\n'.join([c if isinstance(c, str) else (c.text_content() or '').strip() for c in cn if c is not None])
-                        try:
-                            content_html = ''.join([c if isinstance(c, str) else lxml.html.tostring(c, encoding='unicode') for c in cn if c is not None])
-                        except Exception:
-                            content_html = ''
-                # 如果规则命中却未解析到有效内容，尝试自动探测内容容器并更新规则
-                if not (content_text or content_html):
-                    try:
-                        candidates = [
-                            "//article",
-                            "//div[@id='content']",
-                            "//div[contains(@class,'content')]",
-                            "//div[contains(@class,'article')]",
-                            "//div[contains(@class,'news')]",
-                            "//div[contains(@class,'main')]"
-                        ]
-                        best_xpath = None
-                        best_text = ''
-                        best_html = ''
-                        for xp in candidates:
-                            cn2 = doc.xpath(xp)
-                            if not cn2:
-                                continue
-                            txt2 = '\n'.join([c if isinstance(c, str) else (c.text_content() or '').strip() for c in cn2 if c is not None])
-                            if len(txt2) >= 200:  # 文本足够长认为有效
-                                best_xpath = xp
-                                try:
-                                    best_html = ''.join([c if isinstance(c, str) else lxml.html.tostring(c, encoding='unicode') for c in cn2 if c is not None])
-                                except Exception:
-                                    best_html = ''
-                                best_text = txt2
-                                break
-                        if best_xpath:
-                            content_text = best_text
-                            content_html = best_html
-                            # 自动更新规则库的内容XPath
-                            try:
-                                execute_update("update crawl_rules set content_xpath=? where id=?", [best_xpath, rule['id']])
-                            except Exception:
-                                pass
-                    except Exception:
-                        pass
-                if not title_val:
+                        title_val = t0.strip() if isinstance(t0, str) else extract.text_of(t0).replace('\n', ' ')
+                if rule.content_xp is not None:
+                    cn = [c for c in rule.content_xp(doc) if c is not None]
+                    content_text = '\n'.join(c.strip() if isinstance(c, str) else extract.text_of(c) for c in cn).strip()
+                    content_html = ''.join(c if isinstance(c, str) else lhtml.tostring(c, encoding='unicode') for c in cn)
+            except Exception:
+                pass
+            # 规则命中却未取到正文或标题时按正文密度抽取补齐，并把生成的 XPath 写回规则
+            if not content_text or not title_val:
+                auto = extract.extract(doc, url, xpaths=True)
+                fixed = {}
+                if not content_text and auto['content_text']:
+                    content_text, content_html = auto['content_text'], auto['content_html']
+                    fixed['content_xpath'] = auto['content_xpath']
+                if not title_val and auto['title']:
+                    title_val = auto['title']
+                    if auto['title_xpath']:
+                        fixed['title_xpath'] = auto['title_xpath']
+                if fixed:
                     try:
-                        tn2 = doc.xpath('//h1')
-                        if tn2:
-                            t0 = tn2[0]
-                            title_val = t0 if isinstance(t0, str) else (t0.text_content() or '').strip()
-                            try:
-                                execute_update("update crawl_rules set title_xpath=? where id=?", ['//h1', rule['id']])
-                            except Exception:
-                                pass
+                        rules.update_xpath(rule.id, **fixed)
                     except Exception:
                         pass
-                if content_text or content_html or title_val:
-                    if not content_text:
-                        soup2 = BeautifulSoup(html, 'html.parser')
-                        content_text = soup2.get_text(separator='\n', strip=True)
-                    if not content_html:
-                        content_html = html
-                    return jsonify({'code': 0, 'msg': 'ok', 'title': title_val, 'content_text': content_text, 'content_html': content_html})
-            except Exception:
-                pass
-        # 默认提取：无规则或规则失败
-        soup = BeautifulSoup(html, 'html.parser')
-        text = soup.get_text(separator='\n', strip=True)
-        ttag = soup.find('h1') or (soup.find('title') if soup.find('title') else None)
-        tval = ''
-        try:
-            if ttag:
-                tval = ttag.get_text(strip=True)
-        except Exception:
-            tval = ''
-        return jsonify({'code': 0, 'msg': 'ok', 'title': tval, 'content_text': text, 'content_html': html})
+        else:
+            auto = extract.extract(doc, url)
+            title_val, content_text, content_html = auto['title'], auto['content_text'], auto['content_html']
+        if not content_text:
+            # 没有识别出正文（如列表页）：退回整页文字
+            content_text = extract.text_of(doc)
+            content_html = content_html or html
+        return {'code': 0, 'msg': 'ok', 'title': title_val, 'content_text': content_text, 'content_html': content_html}
     except Exception as e:
-        return jsonify({'code': 1, 'msg': str(e)})
+        return {'code': 1, 'msg': str(e)}
 
-def collect_xinhua_items(keyword, count):
+def collect_xinhua_items(keyword, count, state=None):
     keyword = (keyword or '').strip()
     count = count or 10
     base_url = 'http://sc.news.cn/scyw.htm'
-    settings_map = {s['key']: s['value'] for s in query_all("select * from settings")}
-    proxies = {}
-    if settings_map.get('http_proxy'):
-        proxies['http'] = settings_map['http_proxy']
-    if settings_map.get('https_proxy'):
-        proxies['https'] = settings_map['https_proxy']
-    ua = settings_map.get('user_agent') or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
-    headers = {
-        'user-agent': ua,
-        'referer': 'http://sc.news.cn/',
-        'accept-language': 'zh-CN,zh;q=0.9'
-    }
+    headers = {'referer': 'http://sc.news.cn/'}
     try:
-        resp = requests.get(base_url, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-        raw = resp.content
-        enc = resp.encoding or resp.apparent_encoding or 'utf-8'
-        html = None
-        for candidate in [enc, 'utf-8', 'gbk', 'gb2312']:
-            try:
-                html = raw.decode(candidate, errors='ignore')
-                break
-            except Exception:
-                continue
-        if html is None:
-            html = raw.decode('utf-8', errors='ignore')
+        resp = httpclient.get(base_url, headers=headers)
+        html = decoding.text_of(resp)
         soup = BeautifulSoup(html, 'html.parser')
         items = []
         seen = set()
+        # 增量模式下接口列表已无新条目时，不再走首页列表与百度站内搜索等兜底
+        exhausted = False
         ids = re.findall(r'datasource:([0-9a-fA-F]{32})', html)
         if ids:
             nid = ids[0]
             for pg in range(1, 6):
                 api = f"https://qc.wa.news.cn/nodeart/list?nid={nid}&pgnum={pg}&cnt={max(10,count)}&tp=1&orderby=1"
                 try:
-                    jr = requests.get(api, headers=headers, timeout=10, proxies=proxies or None, verify=False)
+                    jr = httpclient.get(api, headers=headers, verify=False)
                     j = jr.json()
                     lst = j.get('data', {}).get('list') or j.get('list') or []
+                    page = []
                     for it in lst:
                         title = it.get('Title') or it.get('title') or ''
                         href = it.get('LinkUrl') or it.get('Url') or it.get('url') or ''
@@ -572,18 +335,24 @@ def collect_xinhua_items(keyword, count):
                         summary = it.get('Intro') or it.get('Digest') or it.get('intro') or ''
                         if href and not href.startswith('http'):
                             href = urljoin(base_url, href)
-                        k = href or title
+                        page.append({'标题': title, '概要': summary, '封面': cover or '', '原始URL': href, '来源': '新华网'})
+                    if state is not None and state.exhausted(page):
+                        exhausted = True
+                    for it in page:
+                        k = it['原始URL'] or it['标题']
                         if not k or k in seen:
                             continue
                         seen.add(k)
-                        items.append({'标题': title, '概要': summary, '封面': cover or '', '原始URL': href, '来源': '新华网'})
-                        if len(items) >= count:
+                        if state is not None and state.seen(it):
+                            continue
+                        items.append(it)
+                        if len(items) >= count and state is None:
                             break
                 except Exception:
                     pass
-                if len(items) >= count:
+                if (len(items) >= count and state is None) or exhausted:
                     break
-        containers = soup.select('#newslist li') or soup.select('.news_list li') or soup.select('li')
+        containers = [] if exhausted else (soup.select('#newslist li') or soup.select('.news_list li') or soup.select('li'))
         for li in containers:
             a = li.select_one('a')
             if not a:
@@ -619,41 +388,18 @@ def collect_xinhua_items(keyword, count):
             else:
                 extras = [it for it in items if it not in filt]
                 items = (filt + extras)[:count]
-        # try fill cover via meta
-        try:
-            def find_meta_image(html, base):
-                s = BeautifulSoup(html, 'html.parser')
-                m = s.select_one('meta[property="og:image"], meta[name="og:image"], meta[name="twitter:image"], meta[property="twitter:image"]')
-                if m and m.has_attr('content') and m['content']:
-                    return m['content']
-                img = s.select_one('img')
-                if img and img.has_attr('src'):
-                    return img['src']
-                return ''
-            for i in range(min(6, len(items))):
-                it = items[i]
-                if not it.get('封面') and it.get('原始URL','').startswith('http'):
-                    try:
-                        r2 = requests.get(it['原始URL'], headers=headers, timeout=5, proxies=proxies or None)
-                        html2 = r2.content.decode(r2.encoding or 'utf-8', errors='ignore')
-                        cover2 = find_meta_image(html2, it['原始URL'])
-                        if cover2:
-                            it['封面'] = cover2
-                    except Exception:
-                        pass
-        except Exception:
-            pass
-        if len(items) < count:
+        covers.enrich(items, icons=False, limit=6)
+        if len(items) < count and not exhausted:
             try:
                 urlb = 'https://www.baidu.com/s'
                 query_word = ('site:sc.news.cn ' + (keyword or '四川'))
                 paramsb = {'rtt':'1','bsst':'1','cl':'2','tn':'news','rsv_dl':'ns_pc','word': query_word}
-                rb = requests.get(urlb, params=paramsb, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-                alt = parse_items(rb.text)
+                rb = httpclient.get(urlb, params=paramsb, headers=headers, profile='search')
+                alt = parse_items(decoding.text_of(rb))
                 if not alt:
                     # 尝试新闻页解析
-                    rb2 = requests.get('https://news.baidu.com/ns', params={'word': query_word, 'tn':'news', 'from':'news'}, headers=headers, timeout=10, proxies=proxies or None, allow_redirects=True)
-                    alt = parse_news_items(rb2.text)
+                    rb2 = httpclient.get('https://news.baidu.com/ns', params={'word': query_word, 'tn':'news', 'from':'news'}, headers=headers, profile='search')
+                    alt = parse_news_items(decoding.text_of(rb2))
                 # 过滤和限制数量
                 for it in alt:
                     k = it.get('原始URL') or it.get('标题')
@@ -671,12 +417,9 @@ def collect_xinhua_items(keyword, count):
             except Exception:
                 pass
         # 本地库兜底：返回历史记录
-        if len(items) < count and keyword:
+        if len(items) < count and keyword and state is None:
             try:
-                rows = query_all(
-                    "select title as 标题, summary as 概要, cover as 封面, url as 原始URL, '新华网' as 来源 from crawl_records where (keyword like ? or title like ? or summary like ?) order by id desc limit ?",
-                    [f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", count - len(items)]
-                )
+                rows = search_records(keyword, count - len(items), source='新华网')
                 rows = rows or []
                 for it in rows:
                     k = it.get('原始URL') or it.get('标题')
@@ -696,26 +439,29 @@ def collect_xinhua_items(keyword, count):
 def crawl_xinhua():
     keyword = request.args.get('keyword', '').strip()
     count = request.args.get('count', type=int) or 10
+    if wants_async():
+        return submitted('crawl_xinhua', {'keyword': keyword, 'count': count})
     items = collect_xinhua_items(keyword, count)
     return jsonify(items)
 
-def run_crawler(name: str, keyword: str, count: int, config: dict = None):
+def run_crawler(name: str, keyword: str, count: int, config: dict = None, state=None):
+    # state 为来源的增量状态时，内置采集器在没有新条目的页停止翻页；其他采集器由调用方过滤
     name = (name or '').strip()
     count = count or 10
     if not keyword:
         return []
     reg = {
         # 使用带代理与统一UA的入口提高可用性
-        'baidu': lambda kw, ct: (fetch_items_for_keyword(kw) or [])[:ct],
-        'xinhua': collect_xinhua_items
+        'baidu': lambda kw, ct: (fetch_items_for_keyword(kw) or [])[:ct] if state is None else collect_baidu_items(kw, ct, state),
+        'xinhua': lambda kw, ct: collect_xinhua_items(kw, ct, state)
     }
     if name in reg:
         return reg[name](keyword, count)
     try:
         # rule-based: if name equals a rule site, use site-specific collection
-        rule = query_one("select * from crawl_rules where site = ? and enabled = 1", [name])
+        rule = rules.by_site(name)
         if rule:
-            return collect_site_items_by_rule(rule.get('site') or name, keyword, count)
+            return collect_site_items_by_rule(rule.site or name, keyword, count)
         row = query_one("select * from crawlers where name = ? and enabled = 1", [name])
         if row and (row.get('module') or '').strip():
             module = (row.get('module') or '').strip()
@@ -733,25 +479,27 @@ def run_crawler(name: str, keyword: str, count: int, config: dict = None):
             func = getattr(m, call)
             return func(keyword, count, cfg_raw)
     except Exception:
-        return collect_baidu_items(keyword, count)
-    return collect_baidu_items(keyword, count)
+        return collect_baidu_items(keyword, count, state)
+    return collect_baidu_items(keyword, count, state)
 
 @bp.get('/crawl_dynamic')
 def crawl_dynamic():
     keyword = request.args.get('keyword', '').strip()
     count = request.args.get('count', type=int) or 10
     source = request.args.get('source', '').strip()
+    if wants_async():
+        return submitted('crawl_dynamic', {'keyword': keyword, 'count': count, 'source': source})
+    return jsonify(crawl_dynamic_result(keyword, count, source))
+
+def crawl_dynamic_result(keyword, count, source=''):
     items = run_crawler(source or 'baidu', keyword, count)
     if not items:
         try:
-            rows = query_all(
-                "select title as 标题, summary as 概要, cover as 封面, url as 原始URL, source as 来源 from crawl_records where (keyword like ? or title like ? or summary like ?) order by id desc limit ?",
-                [f"%{keyword}%", f"%{keyword}%", f"%{keyword}%", count]
-            )
+            rows = search_records(keyword, count)
             items = rows or []
         except Exception:
             items = []
-    return jsonify(items)
+    return items
 
 def collect_site_items_by_rule(site: str, keyword: str, count: int):
     site = (site or '').strip()
@@ -759,23 +507,15 @@ def collect_site_items_by_rule(site: str, keyword: str, count: int):
     count = count or 10
     if not site:
         return []
-    settings_map = {s['key']: s['value'] for s in query_all("select * from settings")}
-    ua = settings_map.get('user_agent') or 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
-    headers = {
-        'cache-control': 'max-age=0',
-        'referer': 'https://www.baidu.com/',
-        'user-agent': ua,
-        'accept-language': 'zh-CN,zh;q=0.9'
-    }
     query_word = 'site:' + site + (' ' + keyword if keyword else '')
     urlb = 'https://www.baidu.com/s'
     paramsb = {'rtt':'1','bsst':'1','cl':'2','tn':'news','rsv_dl':'ns_pc','word': query_word}
     try:
-        rb = requests.get(urlb, params=paramsb, headers=headers, timeout=10, allow_redirects=True)
-        items = parse_items(rb.text)
+        rb = httpclient.get(urlb, params=paramsb, profile='search')
+        items = parse_items(decoding.text_of(rb))
         if not items:
-            rb2 = requests.get('https://news.baidu.com/ns', params={'word': query_word, 'tn':'news', 'from':'news'}, headers=headers, timeout=10, allow_redirects=True)
-            items = parse_news_items(rb2.text)
+            rb2 = httpclient.get('https://news.baidu.com/ns', params={'word': query_word, 'tn':'news', 'from':'news'}, profile='search')
+            items = parse_news_items(decoding.text_of(rb2))
         out = []
         seen = set()
         for it in items:
@@ -798,32 +538,37 @@ def save_selection():
     items = data.get('items') or []
     saved = []
     duplicates = []
-    for it in items:
-        title = it.get('标题') or it.get('title') or ''
-        summary = it.get('概要') or it.get('summary') or ''
-        cover = it.get('封面') or it.get('cover') or ''
-        url = it.get('原始URL') or it.get('url') or ''
-        source = it.get('来源') or it.get('source') or ''
-        exists = None
-        if url:
-            exists = query_one("select id from crawl_records where url = ?", [url])
-        if (not exists) and title and keyword:
-            exists = query_one("select id from crawl_records where title = ? and keyword = ?", [title, keyword])
-        if exists:
-            duplicates.append(exists['id'])
-            continue
-        rid = execute_update(
-            "insert into crawl_records(keyword, title, summary, cover, url, source) values(?, ?, ?, ?, ?, ?)",
-            [keyword, title, summary, cover, url, source]
-        )
-        deep_text = it.get('deep_content_text')
-        deep_html = it.get('deep_content_html')
-        if deep_text or deep_html:
-            execute_update(
-                "insert into crawl_details(record_id, url, content_text, content_html) values(?, ?, ?, ?)",
-                [rid, url, deep_text or '', deep_html or '']
-            )
-        saved.append(rid)
+    with transaction() as conn:
+        for it in items:
+            title = it.get('标题') or it.get('title') or ''
+            summary = it.get('概要') or it.get('summary') or ''
+            cover = it.get('封面') or it.get('cover') or ''
+            url = it.get('原始URL') or it.get('url') or ''
+            source = it.get('来源') or it.get('source') or ''
+            rid = insert_record(conn, keyword, title, summary, cover, url, source)
+            if not rid:
+                duplicates.append(url or title)
+                continue
+            deep_text = it.get('deep_content_text')
+            deep_html = it.get('deep_content_html')
+            if deep_text or deep_html:
+                save_detail(rid, deep_text or '', deep_html or '')
+            saved.append(rid)
+    index_new_records(saved)
     if len(items) == 1 and not saved:
         return jsonify({'code': 2, 'msg': '重复入库'})
     return jsonify({'code': 0, 'msg': 'ok', 'ids': saved, 'dup_count': len(duplicates)})
+
+@bp.get('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({'code': 1, 'msg': '任务不存在'})
+    return jsonify({'code': 0, 'job': job})
+
+@bp.get('/jobs/<job_id>/stream')
+def job_stream(job_id):
+    resp = Response(stream_with_context(jobs.events(job_id)), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    resp.headers['X-Accel-Buffering'] = 'no'
+    return resp
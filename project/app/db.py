@@ -1,38 +1,248 @@
+import os
+import re
 import sqlite3
+import threading
+from contextlib import contextmanager
 from pathlib import Path
+from .normalize import bigrams, url_key, title_fp
 
 DATA_DIR = Path(__file__).resolve().parent / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 DATABASE = DATA_DIR / "app.db"
 
+# 每个连接建立时执行一次：WAL 允许读写并发，NORMAL 在 WAL 下仍然安全且省去每次提交的 fsync
+PRAGMAS = (
+    "pragma journal_mode = wal",
+    "pragma synchronous = normal",
+    "pragma cache_size = -16000",
+    "pragma mmap_size = 268435456",
+    "pragma temp_store = memory",
+    "pragma busy_timeout = 5000",
+)
+
+_local = threading.local()
+
+def _configure(conn):
+    for pragma in PRAGMAS:
+        try:
+            conn.execute(pragma)
+        except sqlite3.DatabaseError:
+            pass
+    return conn
+
+def register_functions(conn):
+    # 迁移 006、010、017 回填历史数据时用到的自定义函数；日常写库在 Python 中计算，不依赖它们
+    conn.create_function('fts_bigrams', 1, bigrams, deterministic=True)
+    conn.create_function('norm_url_key', 1, url_key, deterministic=True)
+    conn.create_function('norm_title_fp', 2, title_fp, deterministic=True)
+    return conn
+
 def get_connection():
-    conn = sqlite3.connect(str(DATABASE))
+    # 返回独立的新连接，由调用方负责关闭
+    conn = sqlite3.connect(str(DATABASE), timeout=5)
     conn.row_factory = sqlite3.Row
+    register_functions(conn)
+    return _configure(conn)
+
+def thread_connection():
+    # 线程内复用的连接；进程 fork 或数据库路径变化后自动重建
+    key = (os.getpid(), str(DATABASE))
+    conn = getattr(_local, 'conn', None)
+    if conn is not None:
+        if _local.key == key:
+            return conn
+        # fork 继承来的连接不能在子进程中关闭，直接丢弃
+        if _local.key[0] == key[0]:
+            try:
+                conn.close()
+            except Exception:
+                pass
+    conn = get_connection()
+    _local.conn = conn
+    _local.key = key
     return conn
 
+def close_connection():
+    conn = getattr(_local, 'conn', None)
+    _local.conn = None
+    _local.key = None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
 def query_all(sql, params=None):
-    conn = get_connection()
+    conn = thread_connection()
+    cur = conn.execute(sql, params or [])
     try:
-        cur = conn.execute(sql, params or [])
         rows = cur.fetchall()
         return [dict(row) for row in rows]
     finally:
-        conn.close()
+        cur.close()
 
 def query_one(sql, params=None):
-    conn = get_connection()
+    conn = thread_connection()
+    cur = conn.execute(sql, params or [])
     try:
-        cur = conn.execute(sql, params or [])
         row = cur.fetchone()
         return dict(row) if row else None
+    finally:
+        cur.close()
+
+def iter_query(sql, params=None, batch=500):
+    # 流式读取：独立连接 + fetchmany，内存占用与结果集大小无关；迭代结束或中断时关闭连接
+    conn = get_connection()
+    try:
+        cur = conn.execute(sql, params or [])
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            for row in rows:
+                yield dict(row)
     finally:
         conn.close()
 
+def _in_transaction():
+    return getattr(_local, 'tx_depth', 0) > 0
+
 def execute_update(sql, params=None):
-    conn = get_connection()
+    conn = thread_connection()
+    if _in_transaction():
+        return conn.execute(sql, params or []).lastrowid
     try:
         cur = conn.execute(sql, params or [])
         conn.commit()
         return cur.lastrowid
+    except Exception:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+
+def execute_many(sql, seq_params):
+    # 批量写入：一次 executemany，一个事务，一次提交；返回受影响行数
+    seq_params = list(seq_params or [])
+    if not seq_params:
+        return 0
+    with transaction() as conn:
+        cur = conn.executemany(sql, seq_params)
+        return cur.rowcount
+
+@contextmanager
+def transaction():
+    # 块内的 execute_update / execute_many 共用同一事务，退出时统一提交；可嵌套
+    conn = thread_connection()
+    depth = getattr(_local, 'tx_depth', 0)
+    if depth == 0:
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute("begin immediate")
+    _local.tx_depth = depth + 1
+    try:
+        yield conn
+    except BaseException:
+        _local.tx_depth = depth
+        if depth == 0:
+            _local.after_commit = []
+            if conn.in_transaction:
+                conn.rollback()
+        raise
+    _local.tx_depth = depth
+    if depth == 0:
+        conn.commit()
+        _run_after_commit()
+
+def after_commit(fn):
+    # 在最外层事务提交后调用 fn（回滚则丢弃）；不在事务中时立即调用。
+    # 用于入库后的派生计算，避免在持有写锁的事务里执行
+    if not _in_transaction():
+        fn()
+        return
+    if not hasattr(_local, 'after_commit'):
+        _local.after_commit = []
+    _local.after_commit.append(fn)
+
+def _run_after_commit():
+    callbacks = getattr(_local, 'after_commit', None)
+    _local.after_commit = []
+    for fn in callbacks or []:
+        try:
+            fn()
+        except Exception:
+            # 数据已提交，回调失败不影响调用方
+            pass
+
+MIGRATIONS_DIR = Path(__file__).resolve().parents[1] / "migrations"
+# 引入 schema_migrations 之前，启动时每次都会重放的迁移；已有库直接视为已执行
+LEGACY_BASELINE = '005'
+
+_ADD_COLUMN = re.compile(r'\s*alter\s+table\s+\S+\s+add\s', re.IGNORECASE)
+
+def _statements(sql):
+    buf = ''
+    for line in sql.splitlines(keepends=True):
+        # 语句之间的整行注释直接丢弃
+        if not buf and (not line.strip() or line.lstrip().startswith('--')):
+            continue
+        buf += line
+        if sqlite3.complete_statement(buf):
+            yield buf.strip()
+            buf = ''
+    if buf.strip():
+        yield buf.strip()
+
+def _execute_statement(conn, stmt):
+    try:
+        conn.execute(stmt)
+    except sqlite3.OperationalError as e:
+        # sqlite 不支持 add column if not exists，重复加列视为已完成
+        if 'duplicate column name' in str(e) and _ADD_COLUMN.match(stmt):
+            return
+        raise
+
+def run_migrations(directory=None):
+    # 按版本号顺序执行尚未记录的迁移，每个文件一个事务；返回本次执行的文件名
+    directory = Path(directory or MIGRATIONS_DIR)
+    conn = get_connection()
+    conn.isolation_level = None
+    applied_now = []
+    try:
+        conn.execute(
+            "create table if not exists schema_migrations("
+            "version text primary key, name text not null, applied_at datetime default current_timestamp)"
+        )
+        files = sorted(directory.glob("*.sql"))
+        conn.execute("begin immediate")
+        try:
+            has_versions = conn.execute("select 1 from schema_migrations limit 1").fetchone()
+            legacy = conn.execute("select 1 from sqlite_master where type = 'table' and name = 'crawl_records'").fetchone()
+            if not has_versions and legacy:
+                conn.executemany(
+                    "insert into schema_migrations(version, name) values(?, ?)",
+                    [(f.name.split('_', 1)[0], f.name) for f in files if f.name.split('_', 1)[0] <= LEGACY_BASELINE]
+                )
+            conn.execute("commit")
+        except Exception:
+            conn.execute("rollback")
+            raise
+        for f in files:
+            version = f.name.split('_', 1)[0]
+            conn.execute("begin immediate")
+            try:
+                # 多进程同时启动时，拿到写锁后再确认一次
+                if conn.execute("select 1 from schema_migrations where version = ?", [version]).fetchone():
+                    conn.execute("rollback")
+                    continue
+                for stmt in _statements(f.read_text(encoding='utf-8')):
+                    _execute_statement(conn, stmt)
+                conn.execute("insert into schema_migrations(version, name) values(?, ?)", [version, f.name])
+                conn.execute("commit")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("rollback")
+                raise
+            applied_now.append(f.name)
+        return applied_now
     finally:
         conn.close()
@@ -0,0 +1,230 @@
+import codecs
+import re
+import zlib
+from requests.compat import chardet
+
+# 页面解码：只在有限前缀内探测编码（BOM → 响应头 → meta → 严格试解 → chardet），全文只解码一次
+SNIFF_BYTES = 16 * 1024
+PROBE_BYTES = 64 * 1024
+MAX_BODY = 16 * 1024 * 1024
+CHUNK = 64 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+# GBK / GB2312 标注的页面常含超出字符集的字，按 GB18030（超集）解码
+_ALIASES = {'gb2312': 'gb18030', 'gbk': 'gb18030', 'x-gbk': 'gb18030', 'utf8': 'utf-8',
+            'iso-8859-1': 'cp1252', 'latin-1': 'cp1252', 'ascii': 'utf-8', 'us-ascii': 'utf-8'}
+_header_charset = re.compile(r'charset\s*=\s*["\']?([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+_meta_charset = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+_xml_encoding = re.compile(rb'^\s*<\?xml[^>]+encoding\s*=\s*["\']([a-zA-Z0-9_.:-]+)', re.IGNORECASE)
+_non_ascii = re.compile(rb'[\x80-\xff]')
+# 去除除 \t \n \r 之外的控制字符
+_control = re.compile(r'[\x00-\x08\x0B\x0C\x0E-\x1F]')
+
+class UnsupportedEncoding(Exception):
+    pass
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        try:
+            import brotlicffi as brotli
+        except ImportError:
+            return None
+    return brotli
+
+# 请求头 Accept-Encoding：安装了 brotli 时才声明 br
+ACCEPT_ENCODING = 'gzip, deflate, br' if _brotli() is not None else 'gzip, deflate'
+
+def normalize(name):
+    if not name:
+        return None
+    name = name.strip().strip('"\'').lower()
+    name = _ALIASES.get(name, name)
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def _strict_ok(prefix, enc):
+    # 截断位置可能落在多字节字符中间，容许末尾最多 3 个字节不完整
+    try:
+        codecs.getincrementaldecoder(enc)('strict').decode(prefix, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def detect(raw, content_type=None, default='utf-8'):
+    # 返回 (编码, 来源)；只看前缀，不会对整页做多次解码
+    for bom, enc in _BOMS:
+        if raw.startswith(bom):
+            return enc, 'bom'
+    if content_type:
+        m = _header_charset.search(content_type)
+        enc = normalize(m.group(1)) if m else None
+        if enc:
+            return enc, 'header'
+    head = raw[:SNIFF_BYTES]
+    m = _xml_encoding.search(head) or _meta_charset.search(head)
+    if m:
+        enc = normalize(m.group(1).decode('ascii', errors='ignore'))
+        if enc:
+            return enc, 'meta'
+    # 从第一个非 ASCII 字节开始试解，避免开头大段脚本/样式让判断失效
+    m = _non_ascii.search(raw)
+    if not m:
+        return 'utf-8', 'probe'
+    probe = raw[m.start():m.start() + PROBE_BYTES]
+    for enc in ('utf-8', 'gb18030'):
+        if _strict_ok(probe, enc):
+            return enc, 'probe'
+    try:
+        guess = normalize((chardet.detect(probe) or {}).get('encoding'))
+    except Exception:
+        guess = None
+    return (guess or default), 'guess'
+
+def decode(raw, content_type=None, default='utf-8'):
+    # 一次解码并去除控制字符；返回 (文本, 编码)
+    enc, _ = detect(raw, content_type, default)
+    try:
+        text = raw.decode(enc, errors='replace')
+    except LookupError:
+        enc = default
+        text = raw.decode(enc, errors='replace')
+    return _control.sub('', text), enc
+
+class Decompressor:
+    # 按 Content-Encoding 流式解压，支持 gzip / deflate（zlib 或裸 deflate）/ br / 多层编码
+    def __init__(self, content_encoding):
+        names = [e.strip().lower() for e in (content_encoding or '').split(',') if e.strip()]
+        # 多层编码按相反顺序解开
+        self._stages = [self._make(n) for n in reversed(names) if n not in ('identity', '')]
+
+    @staticmethod
+    def _make(name):
+        if name in ('gzip', 'x-gzip'):
+            return _Zlib(16 + zlib.MAX_WBITS)
+        if name == 'deflate':
+            return _Deflate()
+        if name == 'br':
+            return _Brotli()
+        raise UnsupportedEncoding(name)
+
+    def feed(self, data):
+        for stage in self._stages:
+            data = stage.feed(data)
+        return data
+
+    def flush(self):
+        data = b''
+        for stage in self._stages:
+            data = stage.feed(data) + stage.flush()
+        return data
+
+class _Zlib:
+    def __init__(self, wbits):
+        self._d = zlib.decompressobj(wbits)
+
+    def feed(self, data):
+        return self._d.decompress(data) if data else b''
+
+    def flush(self):
+        return self._d.flush()
+
+class _Deflate:
+    # 标准要求 zlib 封装，但不少服务器直接发裸 deflate：看第一块数据决定
+    def __init__(self):
+        self._d = None
+
+    def feed(self, data):
+        if not data:
+            return b''
+        if self._d is None:
+            self._d = zlib.decompressobj(zlib.MAX_WBITS)
+            try:
+                return self._d.decompress(data)
+            except zlib.error:
+                self._d = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._d.decompress(data)
+
+    def flush(self):
+        return self._d.flush() if self._d is not None else b''
+
+class _Brotli:
+    def __init__(self):
+        brotli = _brotli()
+        if brotli is None:
+            raise UnsupportedEncoding('br')
+        self._d = brotli.Decompressor()
+
+    def feed(self, data):
+        if not data:
+            return b''
+        fn = getattr(self._d, 'process', None) or self._d.decompress
+        return fn(data)
+
+    def flush(self):
+        return b''
+
+def _still_compressed(body, content_encoding):
+    # requests 已透明解压 gzip/deflate（以及安装了 brotli 时的 br）；只有仍是压缩数据时才再解一次
+    enc = (content_encoding or '').lower()
+    if not body:
+        return False
+    if 'gzip' in enc:
+        return body[:2] == b'\x1f\x8b'
+    if 'deflate' in enc:
+        # zlib 头：0x78 开头且前两字节按大端可被 31 整除
+        return len(body) > 1 and body[0] == 0x78 and (body[0] * 256 + body[1]) % 31 == 0
+    if 'br' in enc:
+        # br 没有魔数：看起来不像文本即认为未解压
+        head = body[:512]
+        return b'<' not in head and not _strict_ok(head, 'utf-8')
+    return False
+
+def read_body(resp, limit=MAX_BODY):
+    # 读取响应正文并解压一次。stream=True 的响应按块读取原始数据边读边解压，超过 limit 截断；
+    # 无法解压（如未安装 brotli）时抛出 UnsupportedEncoding，调用方可改用 identity 重新请求
+    content_encoding = resp.headers.get('Content-Encoding')
+    if getattr(resp, '_content_consumed', True) or resp.raw is None:
+        body = resp.content or b''
+        if _still_compressed(body, content_encoding):
+            d = Decompressor(content_encoding)
+            try:
+                body = d.feed(body) + d.flush()
+            except UnsupportedEncoding:
+                raise
+            except Exception as e:
+                raise UnsupportedEncoding(str(e))
+        return body[:limit]
+    d = Decompressor(content_encoding)
+    out = bytearray()
+    try:
+        for chunk in resp.raw.stream(CHUNK, decode_content=False):
+            out += d.feed(chunk)
+            if len(out) >= limit:
+                break
+        else:
+            out += d.flush()
+    except UnsupportedEncoding:
+        raise
+    except Exception as e:
+        if not out:
+            raise UnsupportedEncoding(str(e))
+    finally:
+        resp.close()
+    body = bytes(out[:limit])
+    resp._content = body
+    resp._content_consumed = True
+    return body
+
+def text_of(resp, default='utf-8'):
+    # 取代 resp.text：不对全文跑 chardet
+    return decode(read_body(resp), resp.headers.get('Content-Type'), default)[0]
@@ -0,0 +1,298 @@
+import copy
+import re
+from lxml import etree, html as lhtml
+from .neardup import strip_site
+
+# 正文抽取：页面只解析一次，自底向上一遍统计每个元素的文字量、链接文字量、标点数，
+# 以“段落”（p/td/li 或直接含较多文字的 div）为单位打分并累加给父元素（祖父元素减半），
+# 候选元素再乘以 (1 - 链接密度) 并按 class/id 加减分，得分最高者为正文容器。
+# 输出前去掉容器内链接密集的子块（相关链接、分享栏等）、脚本与属性，得到精简 HTML
+MIN_PARA = 20
+LINK_NOISE = 0.5
+CLASS_WEIGHT = 25
+# 得分低于该值视为没有找到正文
+MIN_SCORE = 5
+
+# 不计入文字也不输出的元素
+_NOISE_TAGS = {'script', 'style', 'noscript', 'template', 'iframe', 'textarea', 'select', 'button', 'nav', 'aside', 'footer'}
+_PARA_TAGS = {'p', 'pre', 'blockquote', 'td', 'li'}
+# 直接含有足够文字时也视为段落（用 <br> 分段的页面）
+_TEXT_BLOCK_TAGS = {'div', 'section', 'article', 'span', 'font', 'center'}
+_CANDIDATE_TAGS = {'div', 'section', 'article', 'main', 'td', 'table', 'tbody', 'body', 'font', 'center', 'form'}
+# 输出文本时在这些元素前后换行
+_BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'pre', 'blockquote', 'li', 'ul', 'ol', 'table', 'tr',
+               'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'center', 'dd', 'dt', 'dl', 'figure', 'figcaption', 'header'}
+# 可剔除的链接密集子块
+_PRUNE_TAGS = {'div', 'ul', 'ol', 'table', 'section', 'dl', 'p', 'header', 'span'}
+_KEEP_ATTRS = {'href', 'src', 'alt', 'colspan', 'rowspan'}
+_PUNCT = re.compile(r'[，。；：！？、“”‘’（）《》,.;:!?]')
+_POSITIVE = re.compile(r'article|content|text|detail|zoom|trs_editor|main|body|post|entry|news_?con|pages?_con', re.I)
+_NEGATIVE = re.compile(r'comment|footer|foot|nav|menu|sidebar|share|related|relevant|copyright|banner|'
+                       r'header|crumb|position|location|login|advert|recommend|friend', re.I)
+_xml_decl = re.compile(r'^\s*<\?xml[^>]*\?>')
+_X_TITLE = etree.XPath('//title')
+_X_HEADINGS = etree.XPath('//h1 | //h2')
+_space = re.compile(r'\s+')
+
+class Stats:
+    __slots__ = ('text', 'link', 'anchors', 'punct', 'own', 'own_punct')
+
+    def __init__(self):
+        self.text = 0
+        self.link = 0
+        self.anchors = 0
+        self.punct = 0
+        # 元素自身直接包含的文字（text 与子元素 tail），不含子元素内部
+        self.own = 0
+        self.own_punct = 0
+
+def parse(html):
+    # 与 parsers 一致：去掉 XML 声明后交给 lxml；空页面返回 None
+    html = _xml_decl.sub('', html or '')
+    if not html.strip():
+        return None
+    try:
+        return lhtml.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+def _clean(s):
+    return _space.sub(' ', s or '').strip()
+
+def _count(s):
+    s = (s or '').strip()
+    if not s:
+        return 0, 0
+    return len(s), len(_PUNCT.findall(s))
+
+def _noise(el):
+    return not isinstance(el.tag, str) or el.tag in _NOISE_TAGS
+
+def measure(doc):
+    # 一次遍历得到所有元素的统计：按文档序反向处理，子元素先于父元素，处理完即把合计累加到父元素；
+    # 元素的 tail 属于父元素自身的文字。脚本、导航等噪声元素及其子树不统计
+    skip = set()
+    for el in doc.iter(*_NOISE_TAGS, etree.Comment, etree.ProcessingInstruction):
+        skip.update(el.iter())
+    stats = {}
+    for el in reversed(list(doc.iter())):
+        parent = el.getparent()
+        pst = None
+        if parent is not None and parent not in skip:
+            pst = stats.get(parent)
+            if pst is None:
+                pst = stats[parent] = Stats()
+            n, p = _count(el.tail)
+            pst.own += n
+            pst.own_punct += p
+        if el in skip:
+            continue
+        st = stats.get(el)
+        if st is None:
+            st = stats[el] = Stats()
+        n, p = _count(el.text)
+        st.own += n
+        st.own_punct += p
+        st.text += st.own
+        st.punct += st.own_punct
+        if el.tag == 'a':
+            st.link = st.text
+            st.anchors += 1
+        if pst is not None:
+            pst.text += st.text
+            pst.link += st.link
+            pst.anchors += st.anchors
+            pst.punct += st.punct
+    return stats
+
+def link_density(st):
+    return st.link / st.text if st.text else 0.0
+
+def _class_weight(el):
+    label = f"{el.get('class') or ''} {el.get('id') or ''}"
+    if not label.strip():
+        return 0
+    weight = 0
+    if _POSITIVE.search(label):
+        weight += CLASS_WEIGHT
+    if _NEGATIVE.search(label):
+        weight -= CLASS_WEIGHT
+    return weight
+
+def score(stats):
+    # 返回 [(得分, 元素)]，按得分从高到低
+    scores = {}
+    for el, st in stats.items():
+        if el.tag in _PARA_TAGS:
+            length, punct = st.text - st.link, st.punct
+        elif el.tag in _TEXT_BLOCK_TAGS and st.own >= MIN_PARA:
+            length, punct = st.own, st.own_punct
+        else:
+            continue
+        if length < MIN_PARA:
+            continue
+        value = (1 + punct + min(length // 100, 3)) * (1 - link_density(st))
+        parent = el.getparent()
+        level = 0
+        while parent is not None and level < 2:
+            if parent.tag in _CANDIDATE_TAGS:
+                scores[parent] = scores.get(parent, 0) + value / (level + 1)
+            parent = parent.getparent()
+            level += 1
+        # 没有合适父元素时段落自身也作为候选
+        if el.tag in _CANDIDATE_TAGS:
+            scores[el] = scores.get(el, 0) + value
+    ranked = []
+    for el, value in scores.items():
+        st = stats.get(el)
+        if st is None:
+            continue
+        ranked.append(((value + _class_weight(el)) * (1 - link_density(st)), el))
+    ranked.sort(key=lambda x: x[0], reverse=True)
+    return ranked
+
+def _expand(best, value, ranked, stats):
+    # 正文被拆成几个并列块（如正文与附件分在两个 div）时上移到共同父元素
+    parent = best.getparent()
+    if parent is None or parent.tag not in _CANDIDATE_TAGS:
+        return best
+    siblings = [v for v, el in ranked if el is not best and el.getparent() is parent and v >= value * 0.5]
+    pst = stats.get(parent)
+    if siblings and pst is not None and link_density(pst) < LINK_NOISE:
+        return parent
+    return best
+
+def _prune(node, stats):
+    # 容器内由多个链接组成的链接列表，或被 class 标为噪声且没有正文标点的子块；
+    # 单个链接（如附件）保留
+    out = []
+    for el in node.iter(*_PRUNE_TAGS):
+        st = stats.get(el)
+        if el is node or st is None:
+            continue
+        if st.anchors >= 3 and link_density(st) > LINK_NOISE:
+            out.append(el)
+        elif _class_weight(el) < 0 and st.punct < 3:
+            out.append(el)
+    return out
+
+def text_of(el):
+    # 块级元素与 <br> 处换行，去掉空行；跳过脚本、样式等
+    parts = []
+    stack = [el]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if _noise(node):
+            continue
+        block = node.tag in _BLOCK_TAGS or node.tag == 'br'
+        if block:
+            parts.append('\n')
+        if node.text:
+            parts.append(node.text)
+        if block:
+            stack.append('\n')
+        for child in reversed(node):
+            if child.tail:
+                stack.append(child.tail)
+            stack.append(child)
+    lines = (_clean(line) for line in ''.join(parts).split('\n'))
+    return '\n'.join(line for line in lines if line)
+
+def compact(el, drop=(), base_url=None):
+    # 复制元素，去掉指定子块、注释、脚本与多余属性，返回副本
+    clone = copy.deepcopy(el)
+    dropped = set(drop)
+    if dropped:
+        targets = [c for o, c in zip(el.iter(), clone.iter()) if o in dropped]
+    else:
+        targets = []
+    targets += [c for c in clone.iter() if c is not clone and _noise(c)]
+    for c in targets:
+        if c.getparent() is not None:
+            c.drop_tree()
+    for c in clone.iter():
+        if isinstance(c.tag, str):
+            for name in [a for a in c.attrib if a not in _KEEP_ATTRS]:
+                del c.attrib[name]
+    if base_url:
+        try:
+            clone.make_links_absolute(base_url)
+        except Exception:
+            pass
+    return clone
+
+def _xpath_literal(value):
+    return f"'{value}'" if "'" not in value else f'"{value}"'
+
+def xpath_for(doc, el):
+    # 为元素生成尽量稳定的 XPath：唯一 id > 唯一 class > 祖先 id 下的 class > 绝对路径
+    tag = el.tag
+    ident = (el.get('id') or '').strip()
+    if ident and not ident[-1:].isdigit():
+        xp = f"//{tag}[@id={_xpath_literal(ident)}]"
+        if doc.xpath(xp) == [el]:
+            return xp
+    classes = (el.get('class') or '').split()
+    for cls in classes:
+        xp = f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), {_xpath_literal(' ' + cls + ' ')})]"
+        if doc.xpath(xp) == [el]:
+            return xp
+        anc = el.getparent()
+        while anc is not None:
+            aid = (anc.get('id') or '').strip()
+            if aid and not aid[-1:].isdigit():
+                xp2 = f"//{anc.tag}[@id={_xpath_literal(aid)}]{xp[1:]}"
+                if doc.xpath(xp2) == [el]:
+                    return xp2
+                break
+            anc = anc.getparent()
+    if tag in ('h1', 'article', 'main') and doc.xpath(f'//{tag}') == [el]:
+        return f'//{tag}'
+    return el.getroottree().getpath(el)
+
+def title_of(doc):
+    # 返回 (标题, 标题元素)。站点 logo 常写在 h1 里，因此先看哪个 h1/h2 与去掉站名的 <title> 一致，
+    # 其次取不属于 <title> 的 h1，最后用去掉站名的 <title>
+    nodes = _X_TITLE(doc)
+    page_title = _clean(nodes[0].text_content()) if nodes else ''
+    stripped = strip_site(page_title)
+    headings = [(h, _clean(h.text_content())) for h in _X_HEADINGS(doc)[:10]]
+    headings = [(h, t) for h, t in headings if len(t) >= 4]
+    if stripped:
+        matched = [(h, t) for h, t in headings if t in stripped or stripped in t]
+        if matched:
+            h, t = max(matched, key=lambda x: len(x[1]))
+            return t, h
+    for h, t in headings:
+        if h.tag == 'h1' and t not in page_title:
+            return t, h
+    return stripped, None
+
+def extract(doc, base_url=None, xpaths=False):
+    # doc 为 parse() 的结果（或 HTML 字符串）。返回 title、content_text、content_html；
+    # xpaths=True 时另外生成用于采集规则的 title_xpath、content_xpath。找不到正文时 content_* 为空
+    if isinstance(doc, str):
+        doc = parse(doc)
+    out = {'title': '', 'content_text': '', 'content_html': '', 'title_xpath': '', 'content_xpath': ''}
+    if doc is None:
+        return out
+    title, heading = title_of(doc)
+    out['title'] = title
+    if xpaths and heading is not None:
+        out['title_xpath'] = xpath_for(doc, heading)
+    stats = measure(doc)
+    ranked = score(stats)
+    if not ranked or ranked[0][0] < MIN_SCORE:
+        return out
+    value, best = ranked[0]
+    node = _expand(best, value, ranked, stats)
+    drop = _prune(node, stats)
+    clone = compact(node, drop, base_url)
+    out['content_text'] = text_of(clone)
+    out['content_html'] = lhtml.tostring(clone, encoding='unicode')
+    if xpaths:
+        out['content_xpath'] = xpath_for(doc, node)
+    return out
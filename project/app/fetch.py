@@ -0,0 +1,80 @@
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+# 进程内共享的抓取线程池；同一主机同时进行的请求数受 PER_HOST 限制
+MAX_WORKERS = 8
+PER_HOST = 2
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='fetch')
+_active = {}
+_cond = threading.Condition()
+_local = threading.local()
+
+def host_of(url):
+    try:
+        return (urlsplit(url or '').hostname or '').lower()
+    except ValueError:
+        return ''
+
+def _try_acquire(host, limit):
+    with _cond:
+        if _active.get(host, 0) >= limit:
+            return False
+        _active[host] = _active.get(host, 0) + 1
+        return True
+
+def _release(host):
+    with _cond:
+        n = _active.get(host, 0) - 1
+        if n > 0:
+            _active[host] = n
+        else:
+            _active.pop(host, None)
+        _cond.notify_all()
+
+def _run(fn, item, host):
+    _local.worker = True
+    try:
+        return fn(item)
+    finally:
+        _release(host)
+
+def map_ordered(fn, items, url_of=None, per_host=PER_HOST, default=None):
+    # 并发执行 fn(item)，结果按输入顺序返回；异常的条目返回 default
+    items = list(items or [])
+    url_of = url_of or (lambda it: it)
+    # 在抓取线程内再次调用时直接串行执行，避免线程池自锁
+    if getattr(_local, 'worker', False) or len(items) <= 1:
+        results = []
+        for it in items:
+            try:
+                results.append(fn(it))
+            except Exception:
+                results.append(default)
+        return results
+    results = [default] * len(items)
+    pending = deque(range(len(items)))
+    running = {}
+    while pending or running:
+        for _ in range(len(pending)):
+            i = pending.popleft()
+            host = host_of(url_of(items[i]))
+            if _try_acquire(host, per_host):
+                running[_pool.submit(_run, fn, items[i], host)] = i
+            else:
+                pending.append(i)
+        if not running:
+            # 该主机的额度被其他调用方占满，等待有请求结束
+            with _cond:
+                _cond.wait(0.1)
+            continue
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for fut in done:
+            i = running.pop(fut)
+            try:
+                results[i] = fut.result()
+            except Exception:
+                results[i] = default
+    return results
@@ -0,0 +1,155 @@
+import threading
+import time
+import requests
+from .fetch import host_of
+
+# 每个主机的令牌桶：平均 RATE 次/秒，最多突发 BURST 次；取令牌最多等待 MAX_WAIT 秒
+RATE = 2.0
+BURST = 4
+MAX_WAIT = 5.0
+# 熔断：连续 FAILURE_THRESHOLD 次失败（网络错误、429/5xx、验证码、解析为空）后打开，
+# COOLDOWN 秒内直接失败；冷却结束放行一个探测请求，成功则关闭，失败则重新打开
+FAILURE_THRESHOLD = 5
+COOLDOWN = 60.0
+# 探测请求超过该时间仍未上报结果（调用方异常退出等）视为丢失，放行下一个探测
+PROBE_TIMEOUT = 30.0
+
+class HostUnavailable(requests.RequestException):
+    pass
+
+class CircuitOpen(HostUnavailable):
+    pass
+
+class RateLimited(HostUnavailable):
+    pass
+
+class _Host:
+    __slots__ = ('tokens', 'stamp', 'state', 'failures', 'opened_at', 'probing', 'probe_at',
+                 'requests', 'total_failures', 'rejected', 'waited', 'last_error', 'last_ok')
+
+    def __init__(self, burst):
+        self.tokens = float(burst)
+        self.stamp = time.monotonic()
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_at = 0.0
+        self.requests = 0
+        self.total_failures = 0
+        self.rejected = 0
+        self.waited = 0.0
+        self.last_error = ''
+        self.last_ok = None
+
+_hosts = {}
+_lock = threading.Lock()
+
+def _limits():
+    # 可在设置表中用 host_rate / host_burst / breaker_threshold / breaker_cooldown 覆盖
+    try:
+        from .settings import get_settings
+        values = get_settings().values
+    except Exception:
+        values = {}
+    def num(key, default, cast=float):
+        try:
+            return cast(values.get(key) or default)
+        except (TypeError, ValueError):
+            return default
+    return (num('host_rate', RATE), num('host_burst', BURST, int),
+            num('breaker_threshold', FAILURE_THRESHOLD, int), num('breaker_cooldown', COOLDOWN))
+
+def _get(host, burst):
+    h = _hosts.get(host)
+    if h is None:
+        h = _hosts[host] = _Host(burst)
+    return h
+
+def acquire(url):
+    # 请求前调用：熔断打开时立即抛出 CircuitOpen；令牌不足时等待，超过 MAX_WAIT 抛出 RateLimited
+    host = host_of(url)
+    rate, burst, _, cooldown = _limits()
+    deadline = time.monotonic() + MAX_WAIT
+    first = True
+    while True:
+        with _lock:
+            h = _get(host, burst)
+            now = time.monotonic()
+            if first:
+                if h.state == 'open':
+                    if now - h.opened_at < cooldown:
+                        h.rejected += 1
+                        raise CircuitOpen(f'{host} 熔断中，{cooldown - (now - h.opened_at):.0f}s 后重试')
+                    h.state = 'half_open'
+                    h.probing = False
+                if h.state == 'half_open':
+                    if h.probing and now - h.probe_at < PROBE_TIMEOUT:
+                        h.rejected += 1
+                        raise CircuitOpen(f'{host} 正在探测恢复')
+                    h.probing = True
+                    h.probe_at = now
+                first = False
+            h.tokens = min(float(burst), h.tokens + (now - h.stamp) * rate)
+            h.stamp = now
+            if h.tokens >= 1:
+                h.tokens -= 1
+                h.requests += 1
+                return
+            delay = (1 - h.tokens) / rate if rate > 0 else MAX_WAIT
+            if now + delay > deadline:
+                h.rejected += 1
+                if h.state == 'half_open':
+                    h.probing = False
+                raise RateLimited(f'{host} 请求过于频繁')
+            h.waited += delay
+        time.sleep(delay)
+
+def success(url):
+    host = host_of(url)
+    with _lock:
+        h = _hosts.get(host)
+        if h is None:
+            return
+        h.failures = 0
+        h.state = 'closed'
+        h.probing = False
+        h.last_ok = time.time()
+
+def failure(url, reason=''):
+    host = host_of(url)
+    _, burst, threshold, _ = _limits()
+    with _lock:
+        h = _get(host, burst)
+        h.failures += 1
+        h.total_failures += 1
+        h.last_error = str(reason)[:200]
+        if h.state == 'half_open' or h.failures >= threshold:
+            h.state = 'open'
+            h.opened_at = time.monotonic()
+            h.probing = False
+
+def reset(host=None):
+    with _lock:
+        if host is None:
+            _hosts.clear()
+        else:
+            _hosts.pop(host, None)
+
+def snapshot():
+    # 供监控接口使用：各主机的熔断状态、剩余令牌与累计计数
+    rate, burst, _, cooldown = _limits()
+    now = time.monotonic()
+    out = []
+    with _lock:
+        for host, h in sorted(_hosts.items()):
+            tokens = min(float(burst), h.tokens + (now - h.stamp) * rate)
+            retry_in = max(0.0, cooldown - (now - h.opened_at)) if h.state == 'open' else 0.0
+            out.append({
+                'host': host, 'state': h.state, 'consecutive_failures': h.failures,
+                'tokens': round(tokens, 2), 'retry_in': round(retry_in, 1),
+                'requests': h.requests, 'failures': h.total_failures, 'rejected': h.rejected,
+                'waited_seconds': round(h.waited, 2), 'last_error': h.last_error,
+                'last_ok': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(h.last_ok)) if h.last_ok else None,
+            })
+    return out
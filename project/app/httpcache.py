@@ -0,0 +1,156 @@
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from .db import DATA_DIR, query_one, query_all, execute_update
+from . import httpclient, decoding
+
+# 磁盘 HTTP 缓存：索引在 http_cache 表，正文压缩后存为 data/httpcache 下的文件
+CACHE_DIR = DATA_DIR / "httpcache"
+MAX_BYTES = 128 * 1024 * 1024
+MAX_ENTRY = 4 * 1024 * 1024
+# 响应未给出 max-age 时，在这段时间内直接使用缓存而不发请求
+DEFAULT_FRESH = 300
+# 回放时需要保留的响应头
+KEEP_HEADERS = ('content-type', 'content-encoding', 'content-language', 'etag', 'last-modified', 'cache-control', 'expires')
+
+_max_age = re.compile(r'max-age\s*=\s*(\d+)', re.IGNORECASE)
+_evict_lock = threading.Lock()
+
+def cache_key(url, params=None):
+    full = requests.Request('GET', url, params=params).prepare().url if params else url
+    return full, hashlib.sha1(full.encode('utf-8')).hexdigest()
+
+def _path(key):
+    return CACHE_DIR / key[:2] / key
+
+def _read_body(key):
+    try:
+        return zlib.decompress(_path(key).read_bytes())
+    except Exception:
+        return None
+
+def _write_body(key, body):
+    p = _path(key)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix('.tmp')
+    tmp.write_bytes(zlib.compress(body, 6))
+    tmp.replace(p)
+    return p.stat().st_size
+
+def _freshness(headers):
+    cc = (headers.get('Cache-Control') or '').lower()
+    if 'no-store' in cc:
+        return None
+    if 'no-cache' in cc:
+        return 0
+    m = _max_age.search(cc)
+    if m:
+        return int(m.group(1))
+    return DEFAULT_FRESH
+
+def _replay(row, body, extra=None):
+    # 由缓存内容构造与实时请求一致的 Response，调用方无需区分
+    headers = CaseInsensitiveDict(json.loads(row['headers'] or '{}'))
+    for k, v in (extra or {}).items():
+        if k.lower() in KEEP_HEADERS:
+            headers[k] = v
+    r = requests.Response()
+    r.status_code = 200
+    r.reason = 'OK'
+    r.headers = headers
+    r._content = body
+    r._content_consumed = True
+    r.url = row['final_url'] or row['url']
+    r.encoding = get_encoding_from_headers(headers)
+    r.from_cache = True
+    return r
+
+def _store(key, url, resp):
+    body = resp.content
+    fresh = _freshness(resp.headers)
+    if fresh is None or resp.status_code != 200 or not body or len(body) > MAX_ENTRY:
+        return
+    now = time.time()
+    headers = {k: v for k, v in resp.headers.items() if k.lower() in KEEP_HEADERS}
+    try:
+        size = _write_body(key, body)
+        execute_update(
+            "insert or replace into http_cache(key, url, final_url, etag, last_modified, headers, size, expires_at, fetched_at, accessed_at) "
+            "values(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [key, url, resp.url, resp.headers.get('ETag'), resp.headers.get('Last-Modified'),
+             json.dumps(headers, ensure_ascii=False), size, now + fresh, now, now]
+        )
+    except Exception:
+        return
+    _evict()
+
+def _evict():
+    # 超出容量时按最近访问时间淘汰
+    if not _evict_lock.acquire(blocking=False):
+        return
+    try:
+        total = (query_one("select coalesce(sum(size), 0) as n from http_cache") or {}).get('n', 0)
+        if total <= MAX_BYTES:
+            return
+        for row in query_all("select key, size from http_cache order by accessed_at asc"):
+            execute_update("delete from http_cache where key = ?", [row['key']])
+            try:
+                _path(row['key']).unlink()
+            except OSError:
+                pass
+            total -= row['size'] or 0
+            if total <= MAX_BYTES * 0.9:
+                break
+    finally:
+        _evict_lock.release()
+
+def get(url, params=None, headers=None, profile='page', timeout=httpclient.TIMEOUT, **kwargs):
+    # 带缓存的 GET：新鲜期内直接返回；过期后携带 If-None-Match / If-Modified-Since 重新验证，304 时使用磁盘内容。
+    # stream=True 时正文经 decoding.read_body 边读边解压，超过 MAX_BODY 截断，缓存与返回的都是解压后的内容；
+    # 无法解压（如 br 且未安装 brotli）时以 identity 重新请求一次
+    full, key = cache_key(url, params)
+    row = query_one("select * from http_cache where key = ?", [key])
+    body = _read_body(key) if row else None
+    now = time.time()
+    if row and body is not None and row['expires_at'] > now:
+        execute_update("update http_cache set accessed_at = ? where key = ?", [now, key])
+        return _replay(row, body)
+    hdrs = dict(headers or {})
+    if row and body is not None:
+        if row['etag']:
+            hdrs['If-None-Match'] = row['etag']
+        if row['last_modified']:
+            hdrs['If-Modified-Since'] = row['last_modified']
+    resp = httpclient.get(full, headers=hdrs, profile=profile, timeout=timeout, **kwargs)
+    if kwargs.get('stream'):
+        try:
+            decoding.read_body(resp)
+        except decoding.UnsupportedEncoding:
+            hdrs['accept-encoding'] = 'identity'
+            resp = httpclient.get(full, headers=hdrs, profile=profile, timeout=timeout, **kwargs)
+            decoding.read_body(resp)
+    if resp.status_code == 304 and row and body is not None:
+        # 304 未带缓存策略时沿用原响应的
+        r = _replay(row, body, resp.headers)
+        fresh = _freshness(r.headers)
+        execute_update(
+            "update http_cache set accessed_at = ?, expires_at = ?, etag = coalesce(?, etag), last_modified = coalesce(?, last_modified) where key = ?",
+            [now, now + (fresh if fresh is not None else 0), resp.headers.get('ETag'), resp.headers.get('Last-Modified'), key]
+        )
+        return r
+    _store(key, full, resp)
+    return resp
+
+def clear():
+    for row in query_all("select key from http_cache"):
+        try:
+            _path(row['key']).unlink()
+        except OSError:
+            pass
+    execute_update("delete from http_cache")
@@ -0,0 +1,119 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from .fetch import host_of
+from . import hostguard
+from .settings import get_settings
+
+# 重试策略：连接/读取错误与以下状态码按指数退避重试；可在设置表中用 http_retries / http_backoff 覆盖
+RETRIES = 2
+BACKOFF = 0.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+POOL_SIZE = 8
+TIMEOUT = 10
+
+_sessions = {}
+_sessions_version = None
+_lock = threading.Lock()
+
+def _retry(cfg):
+    try:
+        total = int(cfg.values.get('http_retries') or RETRIES)
+    except (TypeError, ValueError):
+        total = RETRIES
+    try:
+        backoff = float(cfg.values.get('http_backoff') or BACKOFF)
+    except (TypeError, ValueError):
+        backoff = BACKOFF
+    # 读超时本身已等待较久，最多只重试一次
+    return Retry(total=total, connect=total, read=min(total, 1), status=total, backoff_factor=backoff,
+                 status_forcelist=RETRY_STATUS, allowed_methods=frozenset(['GET', 'HEAD']),
+                 raise_on_status=False, respect_retry_after_header=True)
+
+def session_for(url):
+    # 每个主机一个长连接会话；设置变更后重建，以应用新的重试参数
+    global _sessions_version
+    cfg = get_settings()
+    host = host_of(url)
+    with _lock:
+        if _sessions_version != cfg.version:
+            _sessions.clear()
+            _sessions_version = cfg.version
+        s = _sessions.get(host)
+        if s is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=_retry(cfg))
+            s.mount('http://', adapter)
+            s.mount('https://', adapter)
+            _sessions[host] = s
+        return s
+
+def base_headers(profile, cfg=None):
+    # search: 搜索结果页；page: 正文页；None: 仅 UA
+    cfg = cfg or get_settings()
+    if profile == 'search':
+        return dict(cfg.search_headers)
+    if profile == 'page':
+        return dict(cfg.page_headers)
+    return {'user-agent': cfg.user_agent}
+
+def _blocked(resp):
+    # 被重定向到验证码/安全验证页，视同失败
+    final = (resp.url or '').lower()
+    return 'captcha' in final or 'wappass.baidu.com' in final
+
+def get(url, params=None, headers=None, profile='page', timeout=TIMEOUT, proxies=None, report=True, **kwargs):
+    # 统一的 GET：合并设置中的请求头与代理，调用方传入的请求头优先。
+    # 请求前经过主机限速与熔断；report=False 时 200 响应是否算成功由调用方解析后自行上报
+    cfg = get_settings()
+    merged = base_headers(profile, cfg)
+    for k, v in (headers or {}).items():
+        if v is not None:
+            merged[str(k)] = str(v)
+    kwargs.setdefault('allow_redirects', True)
+    hostguard.acquire(url)
+    try:
+        resp = session_for(url).get(url, params=params, headers=merged, timeout=timeout,
+                                    proxies=proxies if proxies is not None else cfg.proxies, **kwargs)
+    except Exception as e:
+        hostguard.failure(url, type(e).__name__)
+        raise
+    # 结果记在请求的主机上：重定向到其他主机时，本主机的半开探测同样需要得到结论
+    resp.guard_url = url
+    resp.guard_reported = True
+    if resp.status_code == 429 or resp.status_code >= 500:
+        hostguard.failure(url, f'HTTP {resp.status_code}')
+    elif _blocked(resp):
+        hostguard.failure(url, 'captcha')
+    elif report:
+        hostguard.success(url)
+    else:
+        resp.guard_reported = False
+    return resp
+
+def _guard_url(resp):
+    return getattr(resp, 'guard_url', None) or resp.url
+
+def report_parsed(resp, items):
+    # 配合 report=False：解析出结果算成功，空页面（多为反爬页）计入连续失败
+    if getattr(resp, 'guard_reported', True):
+        return
+    resp.guard_reported = True
+    if items:
+        hostguard.success(_guard_url(resp))
+    else:
+        hostguard.failure(_guard_url(resp), 'empty')
+
+def parse_reported(resp, parse):
+    # 配合 report=False：parse(resp) 的结果交给 report_parsed；解析抛出异常同样计为失败后再抛出，
+    # 否则熔断半开时放行的探测请求得不到结论，该主机会一直拒绝请求
+    try:
+        items = parse(resp)
+    except Exception as e:
+        if not getattr(resp, 'guard_reported', True):
+            resp.guard_reported = True
+            hostguard.failure(_guard_url(resp), f'parse {type(e).__name__}')
+        raise
+    report_parsed(resp, items)
+    return items
@@ -0,0 +1,75 @@
+import time
+from .db import query_all, query_one, execute_update, execute_many
+from .normalize import url_key, title_fp
+
+# 来源级增量采集：记录每个来源已采集条目的归一化键（无误判的哈希集合）与上次结果首条（高水位）。
+# 翻页时整页都已见过或遇到高水位即停止，写库时只写入未见过的条目
+MAX_SEEN = 5000
+
+class SourceState:
+    def __init__(self, source_id, keyword, keys=(), high_water=None):
+        self.source_id = source_id
+        self.keyword = keyword
+        self.keys = set(keys)
+        self.high_water = high_water
+
+    def key(self, it):
+        return url_key(it.get('原始URL')) or title_fp(self.keyword, it.get('标题'))
+
+    def seen(self, it):
+        return self.key(it) in self.keys
+
+    def exhausted(self, page_items):
+        # 空页、整页已见过或出现上次的首条结果：后面的页不会再有新条目
+        keys = [k for k in (self.key(it) for it in page_items or []) if k]
+        if not keys:
+            return True
+        return self.high_water in keys or all(k in self.keys for k in keys)
+
+    def unseen(self, items):
+        out = []
+        batch = set()
+        for it in items or []:
+            k = self.key(it)
+            if not k or k in self.keys or k in batch:
+                continue
+            batch.add(k)
+            out.append(it)
+        return out
+
+    def save(self, fresh, fetched=None):
+        # 在调用方的事务中写入新键与高水位；超过 MAX_SEEN 时淘汰最早的键
+        now = time.time()
+        keys = [k for k in (self.key(it) for it in fresh or []) if k]
+        if keys:
+            execute_many(
+                "insert or ignore into source_seen(source_id, key, seen_at) values(?, ?, ?)",
+                [[self.source_id, k, now] for k in keys]
+            )
+            self.keys.update(keys)
+        top = next((k for k in (self.key(it) for it in fetched or []) if k), None)
+        if top and top != self.high_water:
+            execute_update("update sources set high_water = ? where id = ?", [top, self.source_id])
+            self.high_water = top
+        if len(self.keys) > MAX_SEEN:
+            execute_update(
+                "delete from source_seen where source_id = ? and key not in "
+                "(select key from source_seen where source_id = ? order by seen_at desc limit ?)",
+                [self.source_id, self.source_id, MAX_SEEN]
+            )
+            self.keys = {r['key'] for r in query_all("select key from source_seen where source_id = ?", [self.source_id])}
+
+def load(src):
+    keyword = src['keyword']
+    rows = query_all("select key from source_seen where source_id = ?", [src['id']])
+    if not rows:
+        # 首次运行：以库中该关键字已有的记录作为初始状态
+        execute_update(
+            "insert or ignore into source_seen(source_id, key, seen_at) "
+            "select ?, url_key, ? from crawl_records where keyword = ? and url_key is not null order by id desc limit ?",
+            [src['id'], time.time(), keyword, MAX_SEEN]
+        )
+        rows = query_all("select key from source_seen where source_id = ?", [src['id']])
+    # 调度器缓存的来源行可能已过时，高水位从库中读取
+    row = query_one("select high_water from sources where id = ?", [src['id']])
+    return SourceState(src['id'], keyword, (r['key'] for r in rows), row and row.get('high_water'))
@@ -0,0 +1,441 @@
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from .db import query_all, query_one, execute_update, execute_many, transaction, after_commit
+from .contentstore import save_detail, load_detail
+from . import neardup
+from .leader import holder_id
+
+# 持久化采集任务队列：任务写入 crawl_jobs 表，任意进程的执行器领取后持有租约并定期续约；
+# 进程退出或重启后租约过期，任务重新入队，超过重试次数则标记失败
+WORKERS = 4
+LEASE_TTL = 60.0
+POLL = 1.0
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = 5.0
+# 进度写库的最小间隔
+PROGRESS_EVERY = 1.0
+KEEP_DAYS = 7
+PRUNE_EVERY = 3600
+# 批量详情采集：任务内部的并发数与每批写库条数
+BATCH_WORKERS = 6
+FLUSH_EVERY = 20
+
+FINISHED = ('done', 'failed')
+# 手动采集时等待该来源正在进行的定时采集结束的最长时间；执行器在等待期间照常续约
+SOURCE_WAIT = 600
+# 某来源排队或运行中的采集任务
+ACTIVE_SOURCE_JOB = ("select * from crawl_jobs where kind = 'run_source' and status in ('queued', 'running') "
+                     "and json_extract(payload, '$.source_id') = ? order by created_at limit 1")
+
+class JobFailed(Exception):
+    # 不重试的失败，例如参数错误、数据已删除
+    pass
+
+class Job:
+    # 执行中的任务；处理函数通过 progress() 汇报进度
+    __slots__ = ('id', 'kind', 'payload', 'attempts', 'max_attempts', 'holder', 'state', 'renewed', 'lock')
+
+    def __init__(self, row, holder):
+        self.id = row['id']
+        self.kind = row['kind']
+        self.payload = json.loads(row.get('payload') or '{}')
+        self.attempts = row['attempts']
+        self.max_attempts = row['max_attempts']
+        self.holder = holder
+        self.state = json.loads(row.get('progress') or '{}')
+        self.renewed = time.time()
+        self.lock = threading.Lock()
+
+    def progress(self, **values):
+        with self.lock:
+            self.state.update(values)
+            due = time.time() - self.renewed >= PROGRESS_EVERY
+        if due:
+            self.renew()
+
+    def snapshot(self):
+        with self.lock:
+            return json.dumps(self.state, ensure_ascii=False)
+
+    def renew(self):
+        # 续约并写入进度；租约已被其他执行器接手时返回 False
+        self.renewed = time.time()
+        try:
+            with transaction() as conn:
+                cur = conn.execute(
+                    "update crawl_jobs set lease_expires = ?, progress = ? where id = ? and lease_holder = ? and status = 'running'",
+                    [self.renewed + LEASE_TTL, self.snapshot(), self.id, self.holder]
+                )
+                return cur.rowcount > 0
+        except Exception:
+            return False
+
+def _enqueue(kind, payload, max_attempts, progress):
+    job_id = uuid.uuid4().hex
+    now = time.time()
+    execute_update(
+        "insert into crawl_jobs(id, kind, payload, status, max_attempts, run_after, progress, created_at) "
+        "values(?, ?, ?, 'queued', ?, ?, ?, ?)",
+        [job_id, kind, json.dumps(payload or {}, ensure_ascii=False), max_attempts, now,
+         json.dumps(progress or {}, ensure_ascii=False), now]
+    )
+    return job_id
+
+def submit(kind, payload=None, max_attempts=MAX_ATTEMPTS, progress=None):
+    # 入队并返回任务状态；本进程的执行器立即领取，其他进程的执行器轮询发现
+    job_id = _enqueue(kind, payload, max_attempts, progress)
+    start_worker().wake()
+    return get(job_id)
+
+def active_source_job(source_id):
+    row = query_one(ACTIVE_SOURCE_JOB, [source_id])
+    return _public(row) if row else None
+
+def submit_source(source_id):
+    # 手动采集某来源：已有排队或运行中的任务时返回该任务，不重复入队。返回 (任务, 是否新建)
+    with transaction():
+        row = query_one(ACTIVE_SOURCE_JOB, [source_id])
+        if row:
+            return _public(row), False
+        job_id = _enqueue('run_source', {'source_id': source_id}, MAX_ATTEMPTS, None)
+    start_worker().wake()
+    return get(job_id), True
+
+def _public(row):
+    out = json.loads(row.get('progress') or '{}')
+    out.update({
+        'id': row['id'], 'kind': row['kind'], 'status': row['status'], 'attempts': row['attempts'],
+        'error': row.get('error') or '',
+        'elapsed': round((row.get('finished_at') or time.time()) - row['created_at'], 1),
+        'result': json.loads(row['result']) if row.get('result') else None,
+    })
+    return out
+
+def get(job_id):
+    row = query_one("select * from crawl_jobs where id = ?", [job_id])
+    return _public(row) if row else None
+
+def events(job_id, interval=0.5):
+    # Server-Sent Events：状态变化时推送，任务结束后关闭
+    last = None
+    while True:
+        job = get(job_id)
+        if not job:
+            yield 'event: error\ndata: {}\n\n'
+            return
+        if job != last:
+            yield f"data: {json.dumps(job, ensure_ascii=False)}\n\n"
+            last = job
+        if job['status'] in FINISHED:
+            return
+        time.sleep(interval)
+
+def claim(holder, ttl=LEASE_TTL):
+    now = time.time()
+    # 先用只读查询判断有无可领取的任务，空闲轮询不占写锁
+    if not query_one(
+        "select 1 from crawl_jobs where (status = 'queued' and run_after <= ?) or (status = 'running' and lease_expires < ?) limit 1",
+        [now, now]
+    ):
+        return None
+    with transaction():
+        # 租约过期说明执行进程已退出：未超过重试次数的重新入队
+        execute_update(
+            "update crawl_jobs set "
+            "status = case when attempts >= max_attempts then 'failed' else 'queued' end, "
+            "finished_at = case when attempts >= max_attempts then ? end, "
+            "run_after = ?, lease_holder = null, lease_expires = null, error = '执行进程中断' "
+            "where status = 'running' and lease_expires < ?",
+            [now, now, now]
+        )
+        row = query_one(
+            "select * from crawl_jobs where status = 'queued' and run_after <= ? order by run_after, created_at limit 1",
+            [now]
+        )
+        if not row:
+            return None
+        execute_update(
+            "update crawl_jobs set status = 'running', attempts = attempts + 1, lease_holder = ?, lease_expires = ?, "
+            "started_at = ? where id = ?",
+            [holder, now + ttl, now, row['id']]
+        )
+    row['attempts'] += 1
+    return Job(row, holder)
+
+def complete(job, result):
+    execute_update(
+        "update crawl_jobs set status = 'done', result = ?, progress = ?, error = '', lease_holder = null, "
+        "lease_expires = null, finished_at = ? where id = ? and lease_holder = ?",
+        [json.dumps(result, ensure_ascii=False), job.snapshot(), time.time(), job.id, job.holder]
+    )
+
+def fail(job, error):
+    now = time.time()
+    if not isinstance(error, JobFailed) and job.attempts < job.max_attempts:
+        # 指数退避后重试
+        execute_update(
+            "update crawl_jobs set status = 'queued', run_after = ?, error = ?, progress = ?, lease_holder = null, "
+            "lease_expires = null where id = ? and lease_holder = ?",
+            [now + RETRY_BACKOFF * 2 ** (job.attempts - 1), str(error), job.snapshot(), job.id, job.holder]
+        )
+    else:
+        execute_update(
+            "update crawl_jobs set status = 'failed', error = ?, progress = ?, lease_holder = null, "
+            "lease_expires = null, finished_at = ? where id = ? and lease_holder = ?",
+            [str(error), job.snapshot(), now, job.id, job.holder]
+        )
+
+def release(job):
+    # 未执行就放弃的任务放回队列，不计入重试次数
+    execute_update(
+        "update crawl_jobs set status = 'queued', attempts = attempts - 1, lease_holder = null, lease_expires = null "
+        "where id = ? and lease_holder = ?",
+        [job.id, job.holder]
+    )
+
+def prune(days=KEEP_DAYS):
+    return execute_update(
+        "delete from crawl_jobs where status in ('done', 'failed') and finished_at < ?",
+        [time.time() - days * 86400]
+    )
+
+class Worker:
+    # 调度线程负责领取任务与续约，任务在有界线程池中执行
+    def __init__(self, workers=WORKERS, holder=None):
+        self.workers = workers
+        self.holder = holder or holder_id()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._active = {}
+        self._slots = None
+        self._pool = None
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stop.clear()
+            self._slots = threading.BoundedSemaphore(self.workers)
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            self._thread = threading.Thread(target=self._loop, name='jobs', daemon=True)
+            self._thread.start()
+        return self
+
+    def wake(self):
+        self._wake.set()
+
+    def stop(self, wait=True):
+        # 不再领取新任务；wait=True 时等待执行中的任务结束，否则由租约过期后重新入队
+        self._stop.set()
+        self._wake.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _loop(self):
+        last_prune = 0.0
+        while True:
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            with self._lock:
+                active = list(self._active.values())
+            if stopping and not active:
+                return
+            now = time.time()
+            # 停止后仍为执行中的任务续约，直到它们结束
+            for job in active:
+                if now - job.renewed >= LEASE_TTL / 3:
+                    job.renew()
+            if not stopping:
+                if now - last_prune >= PRUNE_EVERY:
+                    try:
+                        prune()
+                    except Exception:
+                        pass
+                    last_prune = now
+                while self._slots.acquire(blocking=False):
+                    try:
+                        job = claim(self.holder)
+                    except Exception:
+                        job = None
+                    if job is None:
+                        self._slots.release()
+                        break
+                    with self._lock:
+                        self._active[job.id] = job
+                    try:
+                        self._pool.submit(self._execute, job)
+                    except RuntimeError:
+                        # 领取的同时线程池已关闭：归还任务
+                        with self._lock:
+                            self._active.pop(job.id, None)
+                        self._slots.release()
+                        release(job)
+                        break
+            self._wake.wait(POLL)
+
+    def _execute(self, job):
+        try:
+            handler = _handlers().get(job.kind)
+            if handler is None:
+                raise JobFailed(f'未知任务类型：{job.kind}')
+            result = handler(job.payload, job)
+        except Exception as e:
+            try:
+                fail(job, e)
+            except Exception:
+                pass
+        else:
+            try:
+                complete(job, result)
+            except Exception:
+                pass
+        finally:
+            with self._lock:
+                self._active.pop(job.id, None)
+            self._slots.release()
+            self._wake.set()
+
+    def status(self):
+        with self._lock:
+            return {'holder': self.holder, 'workers': self.workers, 'running': sorted(self._active)}
+
+_worker = Worker()
+
+def start_worker():
+    return _worker.start()
+
+def stop_worker(wait=True):
+    _worker.stop(wait)
+
+def worker_status():
+    return _worker.status()
+
+# ---- 任务处理函数：handler(payload, job) 返回可 JSON 序列化的结果 ----
+
+def _run_source(payload, job):
+    # 与定时采集走同一路径；该来源的定时采集（可能在其他进程）正在运行时先等它释放租约
+    from . import scheduler, incremental
+    src = query_one("select * from sources where id = ?", [payload.get('source_id')])
+    if not src:
+        raise JobFailed('未找到数据源')
+    with scheduler.source_lease(src['id'], wait=SOURCE_WAIT) as acquired:
+        if not acquired:
+            raise RuntimeError('该数据源正在采集')
+        state = incremental.load(src)
+        items = scheduler.collect_for_source(src, state)
+        count = scheduler.save_source_run(src, items, state)
+    scheduler.reload()
+    return {'count': count, 'fetched': len(items)}
+
+def _flush(titles, details):
+    # 一批结果一个事务：标题更新 + 详情写入；提交后再为这些记录重算近似重复指纹
+    if not titles and not details:
+        return
+    from .crawler import refresh_records
+    with transaction():
+        if titles:
+            execute_many("update crawl_records set title = ? where id = ?", titles)
+            refresh_records([rid for _, rid in titles])
+        for content_text, content_html, rid, sig in details:
+            save_detail(rid, content_text, content_html, sig)
+        if titles:
+            # 事务提交后只重算本批改了标题的记录
+            changed = [rid for _, rid in titles]
+            after_commit(lambda: neardup.index_records(changed))
+
+def _collect_one(rec):
+    from .crawler import extract_detail
+    try:
+        res = extract_detail(rec['url'], rec.get('source') or '')
+        # MinHash 签名在采集线程里算好，写库事务中不再计算
+        if res.get('code') == 0:
+            res['minhash'] = neardup.minhash(res.get('content_text') or '')
+        return res
+    except Exception as e:
+        return {'code': 1, 'msg': str(e)}
+
+def _records_with_url(ids):
+    ids = [int(i) for i in ids if str(i).isdigit()]
+    records = []
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        records += query_all(
+            f"select id, url, source from crawl_records where id in ({','.join('?' * len(chunk))}) and coalesce(url, '') != ''",
+            chunk
+        )
+    return records
+
+def _batch_collect(payload, job):
+    records = _records_with_url(payload.get('ids') or [])
+    done = saved = failed = 0
+    job.progress(total=len(records), done=0, saved=0, failed=0)
+    titles, details = [], []
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='collect') as pool:
+        futures = {pool.submit(_collect_one, rec): rec['id'] for rec in records}
+        for fut in as_completed(futures):
+            rid = futures[fut]
+            res = fut.result()
+            done += 1
+            if isinstance(res, dict) and res.get('code') == 0:
+                if res.get('title'):
+                    titles.append([res['title'], rid])
+                if res.get('content_text') or res.get('content_html'):
+                    details.append([res.get('content_text') or '', res.get('content_html') or '', rid, res.get('minhash')])
+            else:
+                failed += 1
+            if len(titles) + len(details) >= FLUSH_EVERY:
+                _flush(titles, details)
+                saved += len(details)
+                titles, details = [], []
+            job.progress(done=done, saved=saved, failed=failed)
+    _flush(titles, details)
+    saved += len(details)
+    job.progress(done=done, saved=saved, failed=failed)
+    return {'total': len(records), 'saved': saved, 'failed': failed}
+
+def start_batch_collect(ids):
+    # 没有可采集 URL 时不建任务，返回 None
+    records = _records_with_url(ids)
+    if not records:
+        return None
+    return submit('batch_collect', {'ids': [r['id'] for r in records]},
+                  progress={'total': len(records), 'done': 0, 'saved': 0, 'failed': 0})
+
+def _dedup_backfill(payload, job):
+    # 为历史记录补算近似重复指纹：先标题+摘要，再正文
+    records = contents = 0
+    while True:
+        n = neardup.index_pending()
+        if not n:
+            break
+        records += n
+        job.progress(records=records, contents=contents)
+    while True:
+        rows = neardup.pending_content()
+        if not rows:
+            break
+        for row in rows:
+            detail = load_detail(row['record_id'], with_html=False) or {}
+            neardup.index_content(row['record_id'], detail.get('content_text') or '', row['text_hash'])
+        contents += len(rows)
+        job.progress(records=records, contents=contents)
+    return {'records': records, 'contents': contents}
+
+def _handlers():
+    from . import crawler
+    return {
+        'crawl': lambda p, job: crawler.crawl_result(p.get('keyword') or '', p.get('count') or 10, bool(p.get('save'))),
+        'crawl_dynamic': lambda p, job: crawler.crawl_dynamic_result(p.get('keyword') or '', p.get('count') or 10, p.get('source') or ''),
+        'crawl_xinhua': lambda p, job: crawler.collect_xinhua_items(p.get('keyword') or '', p.get('count') or 10),
+        'deep_crawl': lambda p, job: crawler.extract_detail(p.get('url') or '', p.get('source') or ''),
+        'run_source': _run_source,
+        'batch_collect': _batch_collect,
+        'dedup_backfill': _dedup_backfill,
+    }
@@ -0,0 +1,94 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from .db import execute_update, query_one, transaction
+
+# 基于 SQLite 租约的主节点选举：同一名称的租约同一时刻只有一个持有者，
+# 持有者每 TTL/3 续约一次；进程退出或卡死时租约过期，由其他进程接手
+TTL = 30.0
+
+def holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def try_acquire(name, holder, ttl=TTL):
+    # 未被持有、已过期或本来就是自己持有时获得（续约）租约，返回是否成功
+    now = time.time()
+    with transaction() as conn:
+        cur = conn.execute(
+            "insert into leases(name, holder, expires_at, acquired_at) values(?, ?, ?, ?) "
+            "on conflict(name) do update set "
+            "acquired_at = case when leases.holder = excluded.holder then leases.acquired_at else excluded.acquired_at end, "
+            "holder = excluded.holder, expires_at = excluded.expires_at "
+            "where leases.holder = excluded.holder or leases.expires_at < ?",
+            [name, holder, now + ttl, now, now]
+        )
+        return cur.rowcount > 0
+
+def release(name, holder):
+    execute_update("delete from leases where name = ? and holder = ?", [name, holder])
+
+def current(name):
+    row = query_one("select holder, expires_at, acquired_at from leases where name = ?", [name])
+    if row:
+        row['expired'] = row['expires_at'] < time.time()
+    return row
+
+class Elector:
+    # 后台线程维持租约；成为主节点时调用 on_elected，失去租约时调用 on_demoted
+    def __init__(self, name, on_elected, on_demoted, ttl=TTL, holder=None):
+        self.name = name
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.ttl = ttl
+        self.holder = holder or holder_id()
+        self.is_leader = False
+        self._valid_until = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name=f'lease-{self.name}', daemon=True)
+            self._thread.start()
+        return self
+
+    def run(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.ttl / 3)
+        self._demote()
+        try:
+            release(self.name, self.holder)
+        except Exception:
+            pass
+
+    def tick(self):
+        try:
+            ok = try_acquire(self.name, self.holder, self.ttl)
+        except Exception:
+            # 数据库暂时不可用：本地租约未到期前继续视为主节点
+            ok = self.is_leader and time.time() < self._valid_until
+        else:
+            if ok:
+                self._valid_until = time.time() + self.ttl
+        if ok and not self.is_leader:
+            self.is_leader = True
+            self.on_elected()
+        elif not ok and self.is_leader:
+            self._demote()
+
+    def _demote(self):
+        if self.is_leader:
+            self.is_leader = False
+            try:
+                self.on_demoted()
+            except Exception:
+                pass
+
+    def stop(self, wait=True):
+        self._stop.set()
+        if wait and self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
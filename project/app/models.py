@@ -1,15 +1,53 @@
-from flask_login import UserMixin
+import threading
+import time
+from collections import OrderedDict
 from .db import query_one
 
-class User(UserMixin):
+# load_user 在每个已登录请求上调用，缓存用户与角色避免每次都查库
+USER_CACHE_SIZE = 1024
+USER_CACHE_TTL = 60
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+class User:
+    # 实现 Flask-Login 所需的接口；使用 __slots__ 让缓存中的对象更紧凑
+    __slots__ = ('id', 'username', 'role_id', 'role_name')
+    is_authenticated = True
+    is_active = True
+    is_anonymous = False
+
     def __init__(self, id, username, role_id, role_name):
         self.id = id
         self.username = username
         self.role_id = role_id
         self.role_name = role_name
 
+    def get_id(self):
+        return str(self.id)
+
+    def __eq__(self, other):
+        if isinstance(other, User):
+            return self.get_id() == other.get_id()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        if equal is NotImplemented:
+            return equal
+        return not equal
+
+    __hash__ = None
+
     @staticmethod
     def get(user_id):
+        key = str(user_id)
+        now = time.monotonic()
+        with _cache_lock:
+            hit = _cache.get(key)
+            if hit and hit[1] > now:
+                _cache.move_to_end(key)
+                return hit[0]
         sql = """
             select u.id, u.username, u.role_id, r.name as role_name 
             from users u 
@@ -18,9 +56,24 @@ class User(UserMixin):
         """
         row = query_one(sql, [user_id])
         if not row:
+            invalidate_user(key)
             return None
-        return User(row['id'], row['username'], row['role_id'], row['role_name'])
+        user = User(row['id'], row['username'], row['role_id'], row['role_name'])
+        with _cache_lock:
+            _cache[key] = (user, now + USER_CACHE_TTL)
+            _cache.move_to_end(key)
+            while len(_cache) > USER_CACHE_SIZE:
+                _cache.popitem(last=False)
+        return user
 
     @property
     def is_admin(self):
         return self.role_name == 'admin'
+
+def invalidate_user(user_id=None):
+    # 不传 user_id 时清空整个缓存（如角色变更）
+    with _cache_lock:
+        if user_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(str(user_id), None)
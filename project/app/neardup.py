@@ -0,0 +1,251 @@
+import hashlib
+import random
+import re
+import unicodedata
+import zlib
+from array import array
+from .db import query_all, query_one, execute_update, execute_many, transaction, after_commit
+
+# 近似重复检测：
+# - 标题（去掉末尾站名）+摘要做 64 位 SimHash，分 6 段入桶；汉明距离 ≤ 5 的两条记录至少有一段完全相同。
+#   标题很短，转载时的少量改字就有 3~4 位差异，所以阈值比长文常用的 3 放宽
+# - 正文做 64 个哈希的 MinHash，16 段×4 行做 LSH，Jaccard 0.7 的正文约 99% 落入同一桶
+# 候选只从相同的桶里取，再按汉明距离 / MinHash 相似度确认；命中的记录并入同一簇，簇号为簇内最小的记录 id
+SIM_BANDS = 6
+SIM_DISTANCE = 5
+MINHASH_PERM = 64
+MINHASH_ROWS = 4
+# dup_bands.band 中 MinHash 段的起始编号，0-5 为 SimHash 段
+MINHASH_BAND_BASE = 16
+SHINGLE = 5
+JACCARD = 0.7
+# 正文过短不做 MinHash；过长只取前面一段，转载稿的差异通常不影响开头
+MIN_TEXT = 50
+MAX_TEXT = 4000
+# 单个桶最多取这么多候选，避免常见值拖慢入库
+MAX_BUCKET = 200
+BATCH = 500
+
+_MASK64 = (1 << 64) - 1
+# MinHash 的哈希族：h -> (a*h + b) mod 2^64，a 为奇数；种子固定，签名跨进程可比
+_rng = random.Random(20240601)
+_PERMS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(MINHASH_PERM)]
+_NOISE = re.compile(r'[\W_]+')
+# 转载标题末尾的站名，如“-新华网”“_中国政府网”“|四川日报”
+_SITE_SUFFIX = re.compile(r'\s*[-_|｜—–]\s*[^-_|｜—–\s]{0,12}(?:网|报|台|站|号|政府|新闻|频道|客户端|门户)\s*$')
+
+def normalize(text):
+    # 全半角、大小写统一，去掉空白与标点
+    return _NOISE.sub('', unicodedata.normalize('NFKC', text or '').lower())
+
+def strip_site(title):
+    title = (title or '').strip()
+    for _ in range(3):
+        stripped = _SITE_SUFFIX.sub('', title)
+        if stripped == title or not stripped:
+            break
+        title = stripped
+    return title
+
+def _h64(data):
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+def _signed(v):
+    # SQLite integer 为有符号 64 位
+    return v - (1 << 64) if v >= (1 << 63) else v
+
+def simhash(text):
+    # 以字符二元组为特征，按出现次数加权；无有效字符时返回 None
+    s = normalize(text)
+    if not s:
+        return None
+    counts = {}
+    for i in range(max(1, len(s) - 1)):
+        f = s[i:i + 2]
+        counts[f] = counts.get(f, 0) + 1
+    v = [0] * 64
+    for f, w in counts.items():
+        h = _h64(f.encode('utf-8'))
+        for bit in range(64):
+            if h >> bit & 1:
+                v[bit] += w
+            else:
+                v[bit] -= w
+    out = 0
+    for bit in range(64):
+        if v[bit] > 0:
+            out |= 1 << bit
+    return _signed(out)
+
+def hamming(a, b):
+    return bin((a ^ b) & _MASK64).count('1')
+
+def sim_bands(h):
+    # 64 位按 11,11,11,11,10,10 切段
+    u = h & _MASK64
+    out = []
+    shift = 0
+    for i in range(SIM_BANDS):
+        width = 64 // SIM_BANDS + (1 if i < 64 % SIM_BANDS else 0)
+        out.append((i, u >> shift & ((1 << width) - 1)))
+        shift += width
+    return out
+
+def minhash(text):
+    # 字符 SHINGLE 元组的 MinHash 签名；正文过短返回 None
+    s = normalize(text)[:MAX_TEXT]
+    if len(s) < MIN_TEXT:
+        return None
+    hs = list({zlib.crc32(s[i:i + SHINGLE].encode('utf-8')) for i in range(len(s) - SHINGLE + 1)})
+    return array('Q', [min([(a * h + b) & _MASK64 for h in hs]) for a, b in _PERMS])
+
+def similarity(sig_a, sig_b):
+    # 签名中相同位置取值相等的比例，是 Jaccard 相似度的无偏估计
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+def minhash_bands(sig):
+    return [(MINHASH_BAND_BASE + i, _signed(_h64(sig[i * MINHASH_ROWS:(i + 1) * MINHASH_ROWS].tobytes())))
+            for i in range(MINHASH_PERM // MINHASH_ROWS)]
+
+def _candidates(bands, record_id):
+    if not bands:
+        return []
+    sql = " union ".join(
+        "select record_id from (select record_id from dup_bands where band = ? and value = ? limit ?)" for _ in bands
+    )
+    params = []
+    for band, value in bands:
+        params += [band, value, MAX_BUCKET]
+    return [r['record_id'] for r in query_all(sql, params) if r['record_id'] != record_id]
+
+def _replace_bands(record_id, bands, minhash_part):
+    cond = "band >= ?" if minhash_part else "band < ?"
+    execute_update(f"delete from dup_bands where record_id = ? and {cond}", [record_id, MINHASH_BAND_BASE])
+    execute_many(
+        "insert or ignore into dup_bands(band, value, record_id) values(?, ?, ?)",
+        [[band, value, record_id] for band, value in bands]
+    )
+
+def _join(record_id, matched_ids):
+    # 与命中的记录合并为一簇；涉及多个簇时全部并入簇号最小者
+    row = query_one("select cluster_id from crawl_records where id = ?", [record_id])
+    if not row:
+        return None
+    clusters = {row['cluster_id'] or record_id}
+    for i in range(0, len(matched_ids), 500):
+        chunk = matched_ids[i:i + 500]
+        rows = query_all(
+            f"select id, cluster_id from crawl_records where id in ({','.join('?' * len(chunk))})", chunk
+        )
+        clusters.update(r['cluster_id'] or r['id'] for r in rows)
+    root = min(clusters)
+    execute_update("update crawl_records set cluster_id = ? where id = ?", [root, record_id])
+    for cid in clusters:
+        if cid != root:
+            execute_update("update crawl_records set cluster_id = ? where cluster_id = ? or id = ?", [root, cid, cid])
+    if root != record_id or len(clusters) > 1:
+        # 并入已有簇后去重列表的总数随之变化
+        after_commit(_clusters_changed)
+    return root
+
+def _clusters_changed():
+    from .warehouse import invalidate_counts
+    invalidate_counts(unique_only=True)
+
+def index_record(record_id, title, summary):
+    # 计算标题+摘要的 SimHash，查找近似记录并归簇；返回簇号
+    h = simhash(f"{strip_site(title)} {summary or ''}")
+    with transaction():
+        if h is None:
+            # 没有可比较的文本：单独成簇，不入桶
+            execute_update("update crawl_records set simhash = 0, cluster_id = coalesce(cluster_id, id) where id = ?", [record_id])
+            return record_id
+        bands = sim_bands(h)
+        matched = []
+        candidates = _candidates(bands, record_id)
+        for i in range(0, len(candidates), 500):
+            chunk = candidates[i:i + 500]
+            rows = query_all(
+                f"select id, simhash from crawl_records where id in ({','.join('?' * len(chunk))}) and simhash is not null", chunk
+            )
+            matched += [r['id'] for r in rows if hamming(r['simhash'], h) <= SIM_DISTANCE]
+        _replace_bands(record_id, bands, False)
+        execute_update("update crawl_records set simhash = ? where id = ?", [h, record_id])
+        return _join(record_id, matched)
+
+def index_records(ids):
+    # 只为指定的记录建索引（入库或编辑后调用），每条记录单独一个事务；返回处理条数
+    ids = list(dict.fromkeys(i for i in ids or [] if i))
+    done = 0
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        rows = query_all(
+            f"select id, title, summary from crawl_records where id in ({','.join('?' * len(chunk))}) and simhash is null",
+            chunk
+        )
+        for row in rows:
+            index_record(row['id'], row['title'], row['summary'])
+            done += 1
+    return done
+
+def index_pending(limit=BATCH):
+    # 为尚未计算指纹的记录建索引，返回处理条数；由后台 dedup_backfill 任务分批调用，补全历史记录
+    rows = query_all("select id, title, summary from crawl_records where simhash is null order by id limit ?", [limit])
+    with transaction():
+        for row in rows:
+            index_record(row['id'], row['title'], row['summary'])
+    return len(rows)
+
+def index_content(record_id, content_text, text_hash=None, sig=None):
+    # 正文 MinHash 入桶并归簇；正文未变化时跳过。sig 可在事务外预先计算
+    row = query_one("select text_hash from record_minhash where record_id = ?", [record_id])
+    if row and text_hash and row['text_hash'] == text_hash:
+        return None
+    sig = sig if sig is not None else minhash(content_text)
+    with transaction():
+        if sig is None:
+            # 正文过短：记下空签名表示已处理，不入桶
+            _replace_bands(record_id, [], True)
+            execute_update(
+                "insert into record_minhash(record_id, text_hash, sig) values(?, ?, x'') "
+                "on conflict(record_id) do update set text_hash = excluded.text_hash, sig = excluded.sig",
+                [record_id, text_hash]
+            )
+            return None
+        bands = minhash_bands(sig)
+        matched = []
+        candidates = _candidates(bands, record_id)
+        for i in range(0, len(candidates), 500):
+            chunk = candidates[i:i + 500]
+            rows = query_all(
+                f"select record_id, sig from record_minhash where record_id in ({','.join('?' * len(chunk))})", chunk
+            )
+            matched += [r['record_id'] for r in rows
+                        if r['sig'] and similarity(sig, array('Q', r['sig'])) >= JACCARD]
+        _replace_bands(record_id, bands, True)
+        execute_update(
+            "insert into record_minhash(record_id, text_hash, sig) values(?, ?, ?) "
+            "on conflict(record_id) do update set text_hash = excluded.text_hash, sig = excluded.sig",
+            [record_id, text_hash, sig.tobytes()]
+        )
+        return _join(record_id, matched)
+
+def pending_content(limit=BATCH):
+    # 已有详情但 MinHash 缺失或过期的记录
+    return query_all(
+        "select d.record_id, d.text_hash from crawl_details d "
+        "where d.id in (select max(id) from crawl_details group by record_id) "
+        "and not exists (select 1 from record_minhash m where m.record_id = d.record_id and m.text_hash is d.text_hash) "
+        "order by d.record_id limit ?",
+        [limit]
+    )
+
+def cluster_sizes(cluster_ids):
+    ids = [c for c in set(cluster_ids) if c]
+    if not ids:
+        return {}
+    rows = query_all(
+        f"select cluster_id, count(*) as cnt from crawl_records where cluster_id in ({','.join('?' * len(ids))}) group by cluster_id",
+        ids
+    )
+    return {r['cluster_id']: r['cnt'] for r in rows}
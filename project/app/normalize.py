@@ -0,0 +1,80 @@
+import hashlib
+import re
+import unicodedata
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# 中日韩统一表意文字（含扩展A与兼容区）
+_CJK_RUN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+')
+_WORD = re.compile(r'\w+')
+
+def bigrams(text):
+    # 中文连续片段切成相邻二元组，其余文本原样保留，交给 FTS5 unicode61 分词
+    if not text:
+        return ''
+    parts = []
+    pos = 0
+    for m in _CJK_RUN.finditer(text):
+        parts.append(text[pos:m.start()])
+        run = m.group()
+        if len(run) == 1:
+            parts.append(run)
+        else:
+            parts.extend(run[i:i + 2] for i in range(len(run) - 1))
+        pos = m.end()
+    parts.append(text[pos:])
+    return ' '.join(p for p in parts if p and not p.isspace())
+
+def fts_query(q):
+    # 把搜索词转换为 FTS5 MATCH 表达式；无法用二元组表达（如单个汉字）时返回 None
+    q = (q or '').strip()
+    if not q:
+        return None
+    terms = []
+    pos = 0
+    for m in _CJK_RUN.finditer(q):
+        terms.extend(f'"{w}"*' for w in _WORD.findall(q[pos:m.start()]))
+        run = m.group()
+        if len(run) == 1:
+            return None
+        terms.append('"' + ' '.join(run[i:i + 2] for i in range(len(run) - 1)) + '"')
+        pos = m.end()
+    terms.extend(f'"{w}"*' for w in _WORD.findall(q[pos:]))
+    return ' '.join(terms) or None
+
+# 已知跟踪平台的参数名（另有 utm_* 前缀），不影响页面内容。from、fr、timestamp 之类的通用名
+# 在不少站点是页面参数，去掉会把不同页面归成同一个键，因此不在此列
+TRACKING_PARAMS = {
+    'spm', 'spm_id_from', 'wfr', 'share_token', 'isappinstalled', 'sharer_sharetime', 'sharer_shareid', 'tt_from',
+    'gclid', 'fbclid', 'msclkid', 'bd_vid', '_hsenc', '_hsmi', 'mc_cid', 'mc_eid'
+}
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+_TITLE_NOISE = re.compile(r'[\W_]+')
+
+def url_key(url):
+    # 归一化 URL：协议与主机小写、去默认端口、去片段与跟踪参数、参数排序
+    url = (url or '').strip()
+    if not url:
+        return None
+    try:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        port = parts.port
+    except ValueError:
+        return url
+    if not host:
+        return url
+    netloc = host if not port or _DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if k.lower() not in TRACKING_PARAMS and not k.lower().startswith('utm_')]
+    query.sort()
+    return urlunsplit((scheme, netloc, parts.path or '/', urlencode(query), ''))
+
+def title_fp(keyword, title):
+    # 同一关键字下的标题指纹：忽略大小写、全半角、空白与标点
+    keyword = (keyword or '').strip()
+    title = unicodedata.normalize('NFKC', title or '').lower()
+    title = _TITLE_NOISE.sub('', title)
+    if not keyword or not title:
+        return None
+    return hashlib.sha1(f"{keyword}\x1f{title}".encode('utf-8')).hexdigest()[:16]
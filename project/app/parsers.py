@@ -0,0 +1,197 @@
+import re
+from bs4 import BeautifulSoup
+from lxml import etree, html as lhtml
+
+# 搜索结果列表解析：bs4 为原实现，lxml 为预编译 XPath 的快速实现，两者输出逐项一致。
+# 通过设置项 parser_backend（lxml / bs4）切换，默认 lxml
+BACKENDS = ('lxml', 'bs4')
+DEFAULT_BACKEND = 'lxml'
+
+_bg_url = re.compile(r'url\(([^)]+)\)')
+_xml_decl = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+def backend():
+    try:
+        from .settings import get_settings
+        name = (get_settings().values.get('parser_backend') or '').strip().lower()
+    except Exception:
+        name = ''
+    return name if name in BACKENDS else DEFAULT_BACKEND
+
+def parse_items(html, using=None):
+    return _PARSERS[(using or backend(), 'web')](html)
+
+def parse_news_items(html, using=None):
+    return _PARSERS[(using or backend(), 'news')](html)
+
+# ---- bs4 ----
+
+def _bs4_cover(container):
+    img = container.select_one('img') or container.select_one('.c-img img') or container.select_one('.c-img')
+    url = ''
+    if img:
+        for key in ('src', 'data-src', 'data-original'):
+            if img.has_attr(key) and img.get(key):
+                url = img.get(key)
+                break
+    if not url:
+        styled = container.select_one('[style*="background"]')
+        if styled and styled.has_attr('style'):
+            m = _bg_url.search(styled['style'])
+            if m:
+                url = m.group(1).strip('"\'')
+    if url.startswith('//'):
+        url = 'https:' + url
+    return url
+
+def _bs4_fallback(soup):
+    items = []
+    for a in soup.select('h3 a'):
+        items.append({'标题': a.get_text(strip=True), '概要': '', '封面': '', '原始URL': a.get('href', ''), '来源': ''})
+    return items
+
+def bs4_parse_items(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+    for res in soup.select('div.result'):
+        title_tag = res.select_one('h3 a') or res.select_one('a')
+        title = title_tag.get_text(strip=True) if title_tag else ''
+        href = title_tag['href'] if title_tag and title_tag.has_attr('href') else ''
+        summary_tag = res.select_one('.c-line-clamp3') or res.select_one('.c-abstract') or res.select_one('div')
+        summary = summary_tag.get_text(strip=True) if summary_tag else ''
+        source_tag = res.select_one('.c-author') or res.select_one('.news-source') or res.select_one('span')
+        source = source_tag.get_text(strip=True) if source_tag else ''
+        cover = _bs4_cover(res)
+        if title or href:
+            items.append({'标题': title, '概要': summary, '封面': cover, '原始URL': href, '来源': source})
+    return items or _bs4_fallback(soup)
+
+def bs4_parse_news_items(html):
+    soup = BeautifulSoup(html, 'html.parser')
+    items = []
+    containers = soup.select('div.result') or soup.select('.result')
+    for res in containers:
+        title_tag = res.select_one('h3 a') or res.select_one('a')
+        title = title_tag.get_text(strip=True) if title_tag else ''
+        href = title_tag['href'] if title_tag and title_tag.has_attr('href') else ''
+        summary_tag = res.select_one('.c-summary') or res.select_one('.c-row') or res.select_one('p')
+        summary = summary_tag.get_text(strip=True) if summary_tag else ''
+        source_tag = res.select_one('.c-author') or res.select_one('.source')
+        source = source_tag.get_text(strip=True) if source_tag else ''
+        cover = _bs4_cover(res)
+        if title or href:
+            items.append({'标题': title, '概要': summary, '封面': cover, '原始URL': href, '来源': source})
+    return items or _bs4_fallback(soup)
+
+# ---- lxml ----
+
+def _cls(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _first(*exprs):
+    # 依次尝试多个选择器，取第一个有结果者的首个节点（与 select_one(a) or select_one(b) 等价）
+    compiled = [etree.XPath(e) for e in exprs]
+    def pick(el):
+        for xp in compiled:
+            found = xp(el)
+            if found:
+                return found[0]
+        return None
+    return pick
+
+_X_DIV_RESULT = etree.XPath(f"//div[{_cls('result')}]")
+_X_ANY_RESULT = etree.XPath(f"//*[{_cls('result')}]")
+_X_H3_A = etree.XPath("//h3//a")
+# 与 CSS 后代选择器一致：祖先 h3 可以在容器之外
+_TITLE = _first(".//a[ancestor::h3]", ".//a")
+_WEB_SUMMARY = _first(f".//*[{_cls('c-line-clamp3')}]", f".//*[{_cls('c-abstract')}]", ".//div")
+_WEB_SOURCE = _first(f".//*[{_cls('c-author')}]", f".//*[{_cls('news-source')}]", ".//span")
+_NEWS_SUMMARY = _first(f".//*[{_cls('c-summary')}]", f".//*[{_cls('c-row')}]", ".//p")
+_NEWS_SOURCE = _first(f".//*[{_cls('c-author')}]", f".//*[{_cls('source')}]")
+_IMG = _first(".//img", f".//*[{_cls('c-img')}]")
+_STYLED = _first(".//*[contains(@style, 'background')]")
+
+# bs4 的 get_text 不包含注释与 script/style/template 中的文字
+_SKIP_TEXT = {'script', 'style', 'template'}
+
+def _text(el):
+    parts = []
+    stack = [el]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            parts.append(node)
+            continue
+        if isinstance(node.tag, str) and node.tag not in _SKIP_TEXT:
+            if node.text:
+                parts.append(node.text)
+            for child in reversed(node):
+                if child.tail:
+                    stack.append(child.tail)
+                stack.append(child)
+    return ''.join(s for s in (p.strip() for p in parts) if s)
+
+def _lxml_cover(container):
+    img = _IMG(container)
+    url = ''
+    if img is not None:
+        for key in ('src', 'data-src', 'data-original'):
+            val = img.get(key)
+            if val:
+                url = val
+                break
+    if not url:
+        styled = _STYLED(container)
+        if styled is not None:
+            m = _bg_url.search(styled.get('style') or '')
+            if m:
+                url = m.group(1).strip('"\'')
+    if url.startswith('//'):
+        url = 'https:' + url
+    return url
+
+def _doc(html):
+    html = _xml_decl.sub('', html or '')
+    if not html.strip():
+        return None
+    try:
+        return lhtml.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return None
+
+def _lxml_items(doc, containers, summary_of, source_of):
+    items = []
+    for res in containers:
+        title_tag = _TITLE(res)
+        title = _text(title_tag) if title_tag is not None else ''
+        href = title_tag.get('href', '') if title_tag is not None else ''
+        summary_tag = summary_of(res)
+        summary = _text(summary_tag) if summary_tag is not None else ''
+        source_tag = source_of(res)
+        source = _text(source_tag) if source_tag is not None else ''
+        cover = _lxml_cover(res)
+        if title or href:
+            items.append({'标题': title, '概要': summary, '封面': cover, '原始URL': href, '来源': source})
+    if not items:
+        for a in _X_H3_A(doc):
+            items.append({'标题': _text(a), '概要': '', '封面': '', '原始URL': a.get('href', ''), '来源': ''})
+    return items
+
+def lxml_parse_items(html):
+    doc = _doc(html)
+    if doc is None:
+        return []
+    return _lxml_items(doc, _X_DIV_RESULT(doc), _WEB_SUMMARY, _WEB_SOURCE)
+
+def lxml_parse_news_items(html):
+    doc = _doc(html)
+    if doc is None:
+        return []
+    return _lxml_items(doc, _X_DIV_RESULT(doc) or _X_ANY_RESULT(doc), _NEWS_SUMMARY, _NEWS_SOURCE)
+
+_PARSERS = {
+    ('bs4', 'web'): bs4_parse_items,
+    ('bs4', 'news'): bs4_parse_news_items,
+    ('lxml', 'web'): lxml_parse_items,
+    ('lxml', 'news'): lxml_parse_news_items,
+}
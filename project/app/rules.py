@@ -0,0 +1,133 @@
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+from lxml import etree
+from .db import query_all, execute_update
+from .fetch import host_of
+
+# 采集规则注册表：启用的规则按站点域名及其后缀建索引，请求头与 XPath 预先解析/编译；
+# 本进程修改规则时立即失效，其他进程的修改最多延迟 TTL 秒可见
+TTL = 30
+
+_domain = re.compile(r'^[a-z0-9-]+(\.[a-z0-9-]+)+$')
+
+class Rule:
+    __slots__ = ('id', 'site', 'title_xpath', 'content_xpath', 'headers', 'title_xp', 'content_xp')
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.site = (row.get('site') or '').strip()
+        self.title_xpath = row.get('title_xpath') or ''
+        self.content_xpath = row.get('content_xpath') or ''
+        self.headers = parse_headers(row.get('request_headers'))
+        self.title_xp = compile_xpath(self.title_xpath)
+        self.content_xp = compile_xpath(self.content_xpath)
+
+def parse_headers(raw):
+    if not raw:
+        return {}
+    try:
+        obj = json.loads(raw)
+    except Exception:
+        return {}
+    if not isinstance(obj, dict):
+        return {}
+    return {str(k): str(v) for k, v in obj.items() if v is not None}
+
+def compile_xpath(expr):
+    if not expr:
+        return None
+    try:
+        return etree.XPath(expr)
+    except etree.XPathError:
+        return None
+
+def site_host(site):
+    # 站点写成域名（可带协议）时返回小写主机名，否则返回 None 按子串匹配
+    s = (site or '').strip().lower()
+    if '://' in s:
+        s = urlsplit(s).hostname or ''
+    elif s.endswith('/'):
+        s = s.rstrip('/')
+    return s if _domain.match(s) else None
+
+def host_suffixes(host):
+    # www.sc.news.cn -> www.sc.news.cn, sc.news.cn, news.cn（不含顶级域）
+    parts = (host or '').split('.')
+    return ['.'.join(parts[i:]) for i in range(len(parts) - 1)]
+
+class Registry:
+    def __init__(self, rows):
+        self.rules = [Rule(r) for r in rows]
+        self.by_id = {r.id: r for r in self.rules}
+        self.by_host = {}
+        self.by_site = {}
+        self.tokens = []
+        for r in self.rules:
+            if not r.site:
+                continue
+            self.by_site.setdefault(r.site, r)
+            host = site_host(r.site)
+            if host:
+                self.by_host.setdefault(host, r)
+            else:
+                self.tokens.append(r)
+
+    def match(self, url, source=''):
+        # 与原先按 id 倒序逐条比对的结果一致：命中多条时取 id 最大者
+        best = None
+        for suffix in host_suffixes(host_of(url)):
+            r = self.by_host.get(suffix)
+            if r is not None and (best is None or r.id > best.id):
+                best = r
+        for r in self.tokens:
+            if best is not None and r.id < best.id:
+                break
+            if r.site in url:
+                best = r
+                break
+        source = (source or '').strip()
+        if source:
+            for r in self.rules:
+                if best is not None and r.id < best.id:
+                    break
+                if r.site and r.site in source:
+                    best = r
+                    break
+        return best
+
+_lock = threading.Lock()
+_registry = None
+_loaded_at = 0.0
+
+def registry():
+    global _registry, _loaded_at
+    reg = _registry
+    if reg is not None and time.time() - _loaded_at < TTL:
+        return reg
+    with _lock:
+        if _registry is None or time.time() - _loaded_at >= TTL:
+            _registry = Registry(query_all("select * from crawl_rules where enabled = 1 order by id desc"))
+            _loaded_at = time.time()
+        return _registry
+
+def invalidate():
+    global _registry
+    with _lock:
+        _registry = None
+
+def match(url, source=''):
+    return registry().match(url, source)
+
+def by_site(site):
+    return registry().by_site.get((site or '').strip())
+
+def update_xpath(rule_id, title_xpath=None, content_xpath=None):
+    # deep_crawl 自动修复规则时调用，写库后刷新注册表
+    if content_xpath is not None:
+        execute_update("update crawl_rules set content_xpath = ? where id = ?", [content_xpath, rule_id])
+    if title_xpath is not None:
+        execute_update("update crawl_rules set title_xpath = ? where id = ?", [title_xpath, rule_id])
+    invalidate()
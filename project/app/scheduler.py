@@ -0,0 +1,243 @@
+import calendar
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from .db import query_all, query_one, execute_update, transaction
+from .leader import Elector, holder_id, try_acquire, release
+from . import incremental
+
+# 定时采集：按下次运行时间维护小根堆，到期的来源交给有界线程池执行；
+# 同一来源不会重叠运行：定时采集与手动采集任务（可能在不同进程）都先取得该来源的数据库租约；
+# 来源在后台被修改时调用 reload() 重建
+WORKERS = 4
+DEFAULT_INTERVAL = 60
+LAG_SAMPLES = 200
+# 其他进程（Web 后台）修改来源后，最多这么久被调度进程发现
+VERSION_POLL = 5.0
+# 多进程部署时只有持有该租约的进程运行调度器
+LEASE = 'scheduler'
+# 单个来源的采集租约：正常结束时释放，进程异常退出时到期后自动失效
+SOURCE_LEASE_TTL = 1800
+
+def sources_version():
+    row = query_one("select version from change_versions where name = 'sources'")
+    return row['version'] if row else None
+
+def _parse_utc(value):
+    # sources.last_run 由 current_timestamp 写入，为 UTC
+    try:
+        return calendar.timegm(time.strptime(value, "%Y-%m-%d %H:%M:%S"))
+    except (TypeError, ValueError):
+        return None
+
+def collect_for_source(src, state=None):
+    # 指定了采集器则只用它；否则依次使用所有启用的采集器，都没有时走百度
+    from .crawler import run_crawler, fetch_items_for_keyword, collect_baidu_items
+    cname = (src.get('crawler_name') or '').strip()
+    if cname:
+        return run_crawler(cname, src['keyword'], 10, state=state) or []
+    items = []
+    enabled_crawlers = query_all("select name from crawlers where enabled = 1")
+    if not enabled_crawlers:
+        return collect_baidu_items(src['keyword'], 10, state) if state is not None else fetch_items_for_keyword(src['keyword'])
+    for c in enabled_crawlers:
+        try:
+            items.extend(run_crawler(c.get('name'), src['keyword'], 10, state=state) or [])
+        except Exception:
+            continue
+    return items
+
+def save_source_run(src, items, state):
+    # 只写入该来源未见过的条目；新键、高水位与 last_run 合并为一次提交
+    from .crawler import save_items_for_keyword
+    fresh = state.unseen(items)
+    with transaction():
+        save_items_for_keyword(src['keyword'], fresh)
+        state.save(fresh, items)
+        execute_update("update sources set last_run = current_timestamp where id = ?", [src['id']])
+    return len(fresh)
+
+@contextmanager
+def source_lease(sid, wait=0.0, poll=1.0):
+    # 取得来源 sid 的采集租约，最多等待 wait 秒；返回是否取得，取得时退出后释放
+    name = f'source:{sid}'
+    holder = holder_id()
+    deadline = time.time() + wait
+    acquired = try_acquire(name, holder, SOURCE_LEASE_TTL)
+    while not acquired and time.time() < deadline:
+        time.sleep(poll)
+        acquired = try_acquire(name, holder, SOURCE_LEASE_TTL)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            release(name, holder)
+
+def run_source(src):
+    # 该来源已有排队或运行中的手动采集任务（可能在其他进程）时跳过本次，按间隔排到下一轮
+    from .jobs import active_source_job
+    if active_source_job(src['id']):
+        return 0
+    with source_lease(src['id']) as acquired:
+        if not acquired:
+            return 0
+        state = incremental.load(src)
+        return save_source_run(src, collect_for_source(src, state), state)
+
+class Scheduler:
+    def __init__(self, workers=WORKERS, runner=run_source):
+        self.workers = workers
+        self.runner = runner
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        self._sources = {}
+        self._gen = {}
+        self._running = set()
+        self._dirty = True
+        self._version = None
+        self._stopped = False
+        self._thread = None
+        self._pool = None
+        self._lags = deque(maxlen=LAG_SAMPLES)
+        self._stats = {}
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stopped = False
+            self._dirty = True
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='source')
+            self._thread = threading.Thread(target=self._loop, name='scheduler', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, wait=True):
+        # wait=False 时不等待正在执行的采集结束，但不会再派发新的任务
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+
+    def reload(self):
+        with self._cond:
+            self._dirty = True
+            self._cond.notify_all()
+
+    def _push(self, sid, when):
+        gen = self._gen.get(sid, 0) + 1
+        self._gen[sid] = gen
+        heapq.heappush(self._heap, (when, next(self._seq), sid, gen))
+
+    def _load(self):
+        # 全量重建：新增/修改/删除的来源都在这里生效，运行中的来源等结束后再排期
+        self._version = sources_version()
+        rows = query_all("select * from sources where enabled = 1")
+        now = time.time()
+        self._sources = {r['id']: r for r in rows}
+        self._heap = []
+        self._gen = {}
+        for sid, src in self._sources.items():
+            if sid in self._running:
+                continue
+            last = _parse_utc(src.get('last_run'))
+            interval = (src.get('interval_minutes') or DEFAULT_INTERVAL) * 60
+            # 已过期的来源按当前时间排期，调度延迟只统计调度器自身造成的部分
+            self._push(sid, now if last is None else max(now, last + interval))
+        self._dirty = False
+
+    def _loop(self):
+        while True:
+            due = []
+            with self._cond:
+                if self._stopped:
+                    return
+                if not self._dirty:
+                    try:
+                        self._dirty = sources_version() != self._version
+                    except Exception:
+                        pass
+                if self._dirty:
+                    try:
+                        self._load()
+                    except Exception:
+                        self._dirty = False
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    when, _, sid, gen = heapq.heappop(self._heap)
+                    if self._gen.get(sid) != gen or sid not in self._sources or sid in self._running:
+                        continue
+                    self._running.add(sid)
+                    due.append((when, self._sources[sid]))
+                if not due:
+                    timeout = min(self._heap[0][0] - now, VERSION_POLL) if self._heap else VERSION_POLL
+                    self._cond.wait(timeout)
+                    continue
+            for when, src in due:
+                self._pool.submit(self._run, src, when)
+
+    def _run(self, src, scheduled):
+        started = time.time()
+        lag = max(0.0, started - scheduled)
+        ok = True
+        count = 0
+        try:
+            count = self.runner(src)
+        except Exception:
+            ok = False
+        finished = time.time()
+        with self._cond:
+            self._lags.append(lag)
+            self._stats[src['id']] = {
+                'keyword': src.get('keyword'), 'scheduled_at': scheduled, 'started_at': started,
+                'lag': round(lag, 3), 'duration': round(finished - started, 3), 'ok': ok, 'items': count,
+            }
+            self._running.discard(src['id'])
+            current = self._sources.get(src['id'])
+            if current is not None and not self._dirty:
+                interval = (current.get('interval_minutes') or DEFAULT_INTERVAL) * 60
+                self._push(src['id'], finished + interval)
+            self._cond.notify_all()
+
+    def status(self):
+        # 调度延迟 = 实际开始时间 - 计划时间
+        with self._cond:
+            lags = sorted(self._lags)
+            now = time.time()
+            upcoming = sorted((when, sid) for when, _, sid, gen in self._heap if self._gen.get(sid) == gen)
+            return {
+                'running': sorted(self._running),
+                'scheduled': len(upcoming),
+                'lag_avg': round(sum(lags) / len(lags), 3) if lags else 0.0,
+                'lag_p95': round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 3) if lags else 0.0,
+                'lag_max': round(lags[-1], 3) if lags else 0.0,
+                'next': [{'id': sid, 'keyword': (self._sources.get(sid) or {}).get('keyword'), 'in_seconds': round(when - now, 1)}
+                         for when, sid in upcoming[:20]],
+                'recent': self._stats,
+            }
+
+_scheduler = Scheduler()
+
+def start():
+    return _scheduler.start()
+
+def stop(wait=True):
+    _scheduler.stop(wait)
+
+def reload():
+    _scheduler.reload()
+
+def status():
+    return _scheduler.status()
+
+def run_elected():
+    # 通过租约选主后再启动调度器；失去租约时停止派发
+    return Elector(LEASE, _scheduler.start, lambda: _scheduler.stop(wait=False)).start()
@@ -0,0 +1,42 @@
+from .db import query_all, query_one, execute_update
+from .normalize import fts_query, bigrams
+
+# bm25 列权重：标题 > 关键字 > 概要
+RANK = "bm25(crawl_records_fts, 10.0, 1.0, 5.0)"
+FTS_INSERT = "insert into crawl_records_fts(rowid, title, summary, keyword) values(?, ?, ?, ?)"
+
+def fts_params(rid, title, summary, keyword):
+    # 中文切成二元组后写入全文索引。在 Python 中计算，任何连接写库都不依赖自定义 SQL 函数
+    return [rid, bigrams(title), bigrams(summary), bigrams(keyword)]
+
+def reindex(ids):
+    # 标题、概要或关键字被修改后重写索引行；与修改在同一事务中调用
+    for rid in ids:
+        execute_update("delete from crawl_records_fts where rowid = ?", [rid])
+        row = query_one("select title, summary, keyword from crawl_records where id = ?", [rid])
+        if row:
+            execute_update(FTS_INSERT, fts_params(rid, row['title'], row['summary'], row['keyword']))
+
+def match_filter(q, alias=''):
+    # 返回 (where 片段, 参数)，按 crawl_records 主键过滤；单字等无法走索引的查询退回 like
+    p = f"{alias}." if alias else ''
+    expr = fts_query(q)
+    if expr:
+        return f"{p}id in (select rowid from crawl_records_fts where crawl_records_fts match ?)", [expr]
+    like = f"%{(q or '').strip()}%"
+    return f"({p}title like ? or {p}summary like ? or {p}keyword like ?)", [like, like, like]
+
+def search_records(q, limit, source=None):
+    # 本地库检索，按相关度排序；source 指定时覆盖返回的来源字段
+    src = "?" if source is not None else "r.source"
+    cols = f"r.title as 标题, r.summary as 概要, r.cover as 封面, r.url as 原始URL, {src} as 来源"
+    head = [source] if source is not None else []
+    expr = fts_query(q)
+    if expr:
+        return query_all(
+            f"select {cols} from crawl_records_fts join crawl_records r on r.id = crawl_records_fts.rowid "
+            f"where crawl_records_fts match ? order by {RANK}, r.id desc limit ?",
+            head + [expr, limit]
+        )
+    where, params = match_filter(q, 'r')
+    return query_all(f"select {cols} from crawl_records r where {where} order by r.id desc limit ?", head + params + [limit])
@@ -0,0 +1,80 @@
+import threading
+import time
+from .db import query_all, execute_many
+from .decoding import ACCEPT_ENCODING
+
+DEFAULT_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36 Edg/142.0.0.0'
+DEFAULT_REFERER = 'https://www.baidu.com/'
+# 本进程写入时立即失效；其他进程（如独立采集进程）写入的设置最多延迟这么久可见
+SNAPSHOT_TTL = 30
+
+class Settings:
+    # 某一版本设置的只读快照，代理与请求头在构造时一次算好
+    __slots__ = ('version', 'values', 'app_name', 'app_logo', 'proxies', 'user_agent', 'referer',
+                 'sec_ch_ua', 'sec_ch_ua_platform', 'sec_ch_ua_mobile', 'search_headers', 'page_headers')
+
+    def __init__(self, values, version):
+        self.version = version
+        self.values = values
+        self.app_name = values.get('app_name') or ''
+        self.app_logo = values.get('app_logo') or ''
+        proxies = {}
+        if values.get('http_proxy'):
+            proxies['http'] = values['http_proxy']
+        if values.get('https_proxy'):
+            proxies['https'] = values['https_proxy']
+        # requests 中 proxies=None 表示不设置代理
+        self.proxies = proxies or None
+        self.user_agent = values.get('user_agent') or DEFAULT_UA
+        self.referer = values.get('referer') or DEFAULT_REFERER
+        self.sec_ch_ua = values.get('sec_ch_ua') or '"Chromium";v="142", "Not_A Brand";v="99", "Google Chrome";v="142"'
+        self.sec_ch_ua_platform = values.get('sec_ch_ua_platform') or '"Windows"'
+        self.sec_ch_ua_mobile = values.get('sec_ch_ua_mobile') or '?0'
+        # 搜索结果页请求头
+        self.search_headers = {
+            'cache-control': 'max-age=0',
+            'referer': self.referer,
+            'sec-ch-ua': self.sec_ch_ua,
+            'sec-ch-ua-mobile': self.sec_ch_ua_mobile,
+            'sec-ch-ua-platform': self.sec_ch_ua_platform,
+            'accept-language': 'zh-CN,zh;q=0.9',
+            'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+            'user-agent': self.user_agent
+        }
+        # 正文页请求头
+        self.page_headers = {
+            'user-agent': self.user_agent,
+            'referer': self.referer,
+            'accept-language': 'zh-CN,zh;q=0.9',
+            'accept-encoding': ACCEPT_ENCODING
+        }
+
+_lock = threading.Lock()
+_snapshot = None
+_loaded_at = 0.0
+_version = 0
+
+def get_settings():
+    global _snapshot, _loaded_at
+    snap = _snapshot
+    if snap is not None and time.time() - _loaded_at < SNAPSHOT_TTL:
+        return snap
+    with _lock:
+        if _snapshot is None or _snapshot is snap:
+            values = {s['key']: s['value'] for s in query_all("select key, value from settings")}
+            _snapshot = Settings(values, _version)
+            _loaded_at = time.time()
+        return _snapshot
+
+def invalidate_settings():
+    global _snapshot, _version
+    with _lock:
+        _version += 1
+        _snapshot = None
+
+def save_settings(values):
+    # 一条语句、一个事务写入全部键值，随后让快照失效
+    rows = [[k, v] for k, v in (values or {}).items()]
+    if rows:
+        execute_many("insert into settings(key, value) values(?, ?) on conflict(key) do update set value=excluded.value", rows)
+    invalidate_settings()
@@ -0,0 +1,151 @@
+import csv
+import io
+import json
+import threading
+import time
+import zlib
+from .db import query_all, query_one, iter_query
+from .search import match_filter
+from .contentstore import decode_blob
+
+COLUMNS = "id, keyword, title, summary, cover, url, source, created_at"
+PAGE_COLUMNS = COLUMNS + ", cluster_id"
+# 每个近似重复簇只显示簇号所在的记录（最早入库的一条）；尚未归簇的记录照常显示
+UNIQUE_FILTER = "({p}cluster_id is null or {p}cluster_id = {p}id)"
+# 带筛选条件的总数缓存：过期前只对新增的 id 增量计数，过期后全量重算；
+# 删除、编辑与归簇会改变已计数的记录是否符合条件，由 invalidate_counts() 清空
+COUNT_TTL = 300
+COUNT_CACHE_SIZE = 256
+
+_counts = {}
+_counts_lock = threading.Lock()
+
+def _where(q, extra=None, unique=False, alias=''):
+    # 列表、总数与导出共用的筛选条件；alias 为联表查询时 crawl_records 的别名
+    conds = []
+    params = []
+    if q:
+        cond, params = match_filter(q, alias)
+        conds.append(cond)
+    if unique:
+        conds.append(UNIQUE_FILTER.format(p=f"{alias}." if alias else ''))
+    if extra:
+        conds.append(extra)
+    return (" where " + " and ".join(conds)) if conds else '', list(params)
+
+def invalidate_counts(unique_only=False):
+    # 只清本进程的缓存；其他进程的修改在 COUNT_TTL 内生效
+    with _counts_lock:
+        if not unique_only:
+            _counts.clear()
+            return
+        for key in [k for k in _counts if k[1]]:
+            _counts.pop(key, None)
+
+def record_count(q='', unique=False):
+    q = (q or '').strip()
+    if not q and not unique:
+        row = query_one("select cnt from table_counts where name = 'crawl_records'")
+        if row:
+            return row['cnt']
+        return query_one("select count(*) as cnt from crawl_records")['cnt']
+    top = (query_one("select max(id) as top from crawl_records") or {}).get('top') or 0
+    now = time.time()
+    key = (q, unique)
+    with _counts_lock:
+        entry = _counts.get(key)
+    if entry and now - entry[2] < COUNT_TTL:
+        cnt, seen_top, ts = entry
+        if top > seen_top:
+            where, params = _where(q, "id > ? and id <= ?", unique)
+            cnt += query_one(f"select count(*) as cnt from crawl_records{where}", params + [seen_top, top])['cnt']
+    else:
+        where, params = _where(q, "id <= ?", unique)
+        cnt = query_one(f"select count(*) as cnt from crawl_records{where}", params + [top])['cnt']
+        ts = now
+    with _counts_lock:
+        _counts.pop(key, None)
+        _counts[key] = (cnt, top, ts)
+        while len(_counts) > COUNT_CACHE_SIZE:
+            _counts.pop(next(iter(_counts)))
+    return cnt
+
+def page_records(q='', page_size=10, after=None, before=None, unique=False):
+    # 按 id 的游标分页：after 取下一页，before 取上一页，代价与页码无关
+    if before:
+        where, params = _where(q, "id < ?", unique)
+        rows = query_all(f"select {PAGE_COLUMNS} from crawl_records{where} order by id desc limit ?", params + [before, page_size])
+        rows.reverse()
+        return rows
+    if after:
+        where, params = _where(q, "id > ?", unique)
+        return query_all(f"select {PAGE_COLUMNS} from crawl_records{where} order by id asc limit ?", params + [after, page_size])
+    where, params = _where(q, None, unique)
+    return query_all(f"select {PAGE_COLUMNS} from crawl_records{where} order by id asc limit ?", params + [page_size])
+
+def page_records_offset(q='', page=1, page_size=10, unique=False):
+    # 兼容按页码跳转：先只扫描 id 定位上一页末尾，再走游标分页
+    if page <= 1:
+        return page_records(q, page_size, unique=unique)
+    where, params = _where(q, None, unique)
+    row = query_one(f"select id from crawl_records{where} order by id asc limit 1 offset ?", params + [(page - 1) * page_size - 1])
+    if not row:
+        return []
+    return page_records(q, page_size, after=row['id'], unique=unique)
+
+EXPORT_FIELDS = ['id', 'keyword', 'title', 'summary', 'cover', 'url', 'source', 'created_at']
+EXPORT_CHUNK = 64 * 1024
+
+def export_rows(q='', with_details=False, unique=False):
+    # 逐行读取导出数据，筛选条件与列表页一致；with_details 时附带该记录最近一次详情的正文
+    if not with_details:
+        where, params = _where(q, None, unique)
+        yield from iter_query(f"select {COLUMNS} from crawl_records{where} order by id asc", params)
+        return
+    where, params = _where(q, None, unique, 'r')
+    sql = (
+        "select r.id, r.keyword, r.title, r.summary, r.cover, r.url, r.source, r.created_at, "
+        "d.content_text as inline_text, b.codec, b.data "
+        "from crawl_records r "
+        "left join crawl_details d on d.id = (select max(id) from crawl_details where record_id = r.id) "
+        "left join content_blobs b on b.hash = d.text_hash"
+        + where + " order by r.id asc"
+    )
+    for row in iter_query(sql, params):
+        codec = row.pop('codec')
+        data = row.pop('data')
+        inline = row.pop('inline_text')
+        row['content_text'] = decode_blob(codec, data) if data is not None else (inline or '')
+        yield row
+
+def export_stream(fmt='csv', q='', with_details=False, gzip=False, unique=False):
+    # 生成 CSV/JSONL 字节块，按需边生成边 gzip 压缩
+    fields = EXPORT_FIELDS + (['content_text'] if with_details else [])
+    def chunks():
+        buf = io.StringIO()
+        writer = None
+        if fmt == 'csv':
+            buf.write('\ufeff')
+            writer = csv.DictWriter(buf, fieldnames=fields, extrasaction='ignore')
+            writer.writeheader()
+        for row in export_rows(q, with_details, unique):
+            if writer:
+                writer.writerow(row)
+            else:
+                buf.write(json.dumps(row, ensure_ascii=False))
+                buf.write('\n')
+            if buf.tell() >= EXPORT_CHUNK:
+                yield buf.getvalue().encode('utf-8')
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue().encode('utf-8')
+    if not gzip:
+        yield from chunks()
+        return
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks():
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
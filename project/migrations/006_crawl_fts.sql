@@ -0,0 +1,26 @@
+-- full-text index over crawl_records; text is pre-split into Chinese bigrams by
+-- the fts_bigrams() function that app/db.py registers on every connection
+create virtual table if not exists crawl_records_fts using fts5(
+  title, summary, keyword,
+  tokenize = 'unicode61'
+);
+
+insert into crawl_records_fts(rowid, title, summary, keyword)
+  select id, fts_bigrams(title), fts_bigrams(summary), fts_bigrams(keyword)
+  from crawl_records
+  where id not in (select rowid from crawl_records_fts);
+
+create trigger if not exists crawl_records_fts_ai after insert on crawl_records begin
+  insert into crawl_records_fts(rowid, title, summary, keyword)
+    values (new.id, fts_bigrams(new.title), fts_bigrams(new.summary), fts_bigrams(new.keyword));
+end;
+
+create trigger if not exists crawl_records_fts_ad after delete on crawl_records begin
+  delete from crawl_records_fts where rowid = old.id;
+end;
+
+create trigger if not exists crawl_records_fts_au after update of title, summary, keyword on crawl_records begin
+  update crawl_records_fts
+    set title = fts_bigrams(new.title), summary = fts_bigrams(new.summary), keyword = fts_bigrams(new.keyword)
+    where rowid = new.id;
+end;
@@ -0,0 +1,23 @@
+-- tables that admin pages used to create on every request
+create table if not exists crawl_rules (
+  id integer primary key autoincrement,
+  site text not null,
+  title_xpath text,
+  content_xpath text,
+  request_headers text,
+  enabled integer default 1,
+  created_at datetime default current_timestamp
+);
+
+create table if not exists ai_engines (
+  id integer primary key autoincrement,
+  provider_name text not null,
+  api_url text not null,
+  api_key text not null,
+  model_name text not null,
+  enabled integer default 1,
+  created_at datetime default current_timestamp
+);
+
+-- already present on databases where the crawler pages were opened
+alter table crawlers add column domain text;
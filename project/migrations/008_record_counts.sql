@@ -0,0 +1,15 @@
+-- row counts maintained by triggers so list pages do not run count(*)
+create table if not exists table_counts (
+  name text primary key,
+  cnt integer not null default 0
+);
+
+insert or replace into table_counts(name, cnt) select 'crawl_records', count(*) from crawl_records;
+
+create trigger if not exists crawl_records_count_ai after insert on crawl_records begin
+  update table_counts set cnt = cnt + 1 where name = 'crawl_records';
+end;
+
+create trigger if not exists crawl_records_count_ad after delete on crawl_records begin
+  update table_counts set cnt = cnt - 1 where name = 'crawl_records';
+end;
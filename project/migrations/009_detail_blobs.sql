@@ -0,0 +1,22 @@
+-- detail bodies stored once per content hash, zlib-compressed
+create table if not exists content_blobs (
+  hash text primary key,
+  codec text not null,
+  size integer not null,
+  data blob not null
+);
+
+alter table crawl_details add column text_hash text;
+alter table crawl_details add column html_hash text;
+
+create index if not exists idx_crawl_details_record on crawl_details(record_id, id);
+create index if not exists idx_crawl_details_text_hash on crawl_details(text_hash);
+create index if not exists idx_crawl_details_html_hash on crawl_details(html_hash);
+
+-- drop blobs no longer referenced by any detail row
+create trigger if not exists crawl_details_blob_gc after delete on crawl_details begin
+  delete from content_blobs
+    where hash in (old.text_hash, old.html_hash)
+      and not exists (select 1 from crawl_details where text_hash = content_blobs.hash)
+      and not exists (select 1 from crawl_details where html_hash = content_blobs.hash);
+end;
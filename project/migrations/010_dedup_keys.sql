@@ -0,0 +1,22 @@
+-- dedup keys: normalized URL and per-keyword title fingerprint
+alter table crawl_records add column url_key text;
+alter table crawl_records add column title_fp text;
+
+-- existing duplicates keep the key on their oldest row only
+update crawl_records set url_key = norm_url_key(url)
+  where id in (select min(id) from crawl_records where norm_url_key(url) is not null group by norm_url_key(url));
+update crawl_records set title_fp = norm_title_fp(keyword, title)
+  where id in (select min(id) from crawl_records where norm_title_fp(keyword, title) is not null group by norm_title_fp(keyword, title));
+
+create unique index if not exists uq_crawl_records_url_key on crawl_records(url_key);
+create unique index if not exists uq_crawl_records_title_fp on crawl_records(title_fp);
+
+-- edits recompute the keys; a key already owned by another row is left empty
+create trigger if not exists crawl_records_keys_au after update of url, title, keyword on crawl_records begin
+  update crawl_records set
+    url_key = case when exists (select 1 from crawl_records where url_key = norm_url_key(new.url) and id <> new.id)
+                   then null else norm_url_key(new.url) end,
+    title_fp = case when exists (select 1 from crawl_records where title_fp = norm_title_fp(new.keyword, new.title) and id <> new.id)
+                    then null else norm_title_fp(new.keyword, new.title) end
+  where id = new.id;
+end;
@@ -0,0 +1,15 @@
+-- conditional-request cache index; bodies live in data/httpcache as compressed files
+create table if not exists http_cache (
+  key text primary key,
+  url text not null,
+  final_url text,
+  etag text,
+  last_modified text,
+  headers text,
+  size integer not null default 0,
+  expires_at real not null default 0,
+  fetched_at real not null,
+  accessed_at real not null
+);
+
+create index if not exists idx_http_cache_accessed on http_cache(accessed_at);
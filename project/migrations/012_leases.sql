@@ -0,0 +1,27 @@
+-- leader leases shared by every process that opens the database
+create table if not exists leases (
+  name text primary key,
+  holder text not null,
+  expires_at real not null,
+  acquired_at real not null
+);
+
+-- bumped when a source's schedule changes, so a scheduler in another process can reload
+create table if not exists change_versions (
+  name text primary key,
+  version integer not null default 0
+);
+
+insert or ignore into change_versions(name, version) values('sources', 0);
+
+create trigger if not exists sources_version_ai after insert on sources begin
+  update change_versions set version = version + 1 where name = 'sources';
+end;
+
+create trigger if not exists sources_version_ad after delete on sources begin
+  update change_versions set version = version + 1 where name = 'sources';
+end;
+
+create trigger if not exists sources_version_au after update of keyword, interval_minutes, enabled, crawler_name on sources begin
+  update change_versions set version = version + 1 where name = 'sources';
+end;
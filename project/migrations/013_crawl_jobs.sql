@@ -0,0 +1,21 @@
+-- durable crawl job queue: any process may lease a queued job and must renew the lease while it runs;
+-- jobs whose lease expires (worker crashed or restarted) are queued again
+create table if not exists crawl_jobs (
+  id text primary key,
+  kind text not null,
+  payload text not null default '{}',
+  status text not null default 'queued',
+  attempts integer not null default 0,
+  max_attempts integer not null default 3,
+  run_after real not null,
+  lease_holder text,
+  lease_expires real,
+  progress text,
+  result text,
+  error text,
+  created_at real not null,
+  started_at real,
+  finished_at real
+);
+
+create index if not exists idx_crawl_jobs_status on crawl_jobs(status, run_after);
@@ -0,0 +1,22 @@
+-- per-source incremental crawl state: normalized keys of items each source has already collected
+create table if not exists source_seen (
+  source_id integer not null,
+  key text not null,
+  seen_at real not null,
+  primary key (source_id, key)
+) without rowid;
+
+create index if not exists idx_source_seen_age on source_seen(source_id, seen_at);
+
+-- key of the top result of the latest run; paging stops once it shows up again
+alter table sources add column high_water text;
+
+create trigger if not exists source_seen_ad after delete on sources begin
+  delete from source_seen where source_id = old.id;
+end;
+
+-- a different keyword means different results: start over
+create trigger if not exists source_seen_au after update of keyword on sources when old.keyword is not new.keyword begin
+  delete from source_seen where source_id = old.id;
+  update sources set high_water = null where id = old.id;
+end;
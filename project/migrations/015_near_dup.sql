@@ -0,0 +1,37 @@
+-- near-duplicate detection: SimHash of title+summary and cluster id on the record
+alter table crawl_records add column simhash integer;
+alter table crawl_records add column cluster_id integer;
+
+create index if not exists idx_crawl_records_cluster on crawl_records(cluster_id);
+-- records still waiting for a fingerprint (new, or title/summary edited)
+create index if not exists idx_crawl_records_unhashed on crawl_records(id) where simhash is null;
+
+-- MinHash signature of the latest detail text; empty when the text is too short to compare
+create table if not exists record_minhash (
+  record_id integer primary key,
+  text_hash text,
+  sig blob not null
+);
+
+-- LSH buckets: bands 0-5 hold SimHash bit ranges, bands 16 and up hold MinHash row bands
+create table if not exists dup_bands (
+  band integer not null,
+  value integer not null,
+  record_id integer not null,
+  primary key (band, value, record_id)
+) without rowid;
+
+create index if not exists idx_dup_bands_record on dup_bands(record_id);
+
+create trigger if not exists crawl_records_simhash_au after update of title, summary on crawl_records
+  when old.title is not new.title or old.summary is not new.summary begin
+  update crawl_records set simhash = null where id = new.id;
+end;
+
+-- a deleted cluster root hands the cluster id to the oldest remaining member
+create trigger if not exists crawl_records_dup_ad after delete on crawl_records begin
+  delete from dup_bands where record_id = old.id;
+  delete from record_minhash where record_id = old.id;
+  update crawl_records set cluster_id = (select min(id) from crawl_records where cluster_id = old.id)
+    where cluster_id = old.id;
+end;
@@ -0,0 +1,9 @@
+-- the insert/update triggers from 006 and 010 called fts_bigrams(), norm_url_key()
+-- and norm_title_fp(), which exist only on connections set up by app/db.py, so a
+-- write from any other connection failed with "no such function". The full-text
+-- rows and dedup keys are now computed in Python on the write path
+-- (crawler.insert_record / crawler.refresh_records); only the delete trigger,
+-- which needs no custom function, stays.
+drop trigger if exists crawl_records_fts_ai;
+drop trigger if exists crawl_records_fts_au;
+drop trigger if exists crawl_records_keys_au;
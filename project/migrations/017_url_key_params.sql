@@ -0,0 +1,8 @@
+-- url_key no longer strips generic query parameters (from, fr, for, timestamp, ...);
+-- recompute keys that changed, keeping the new key on the oldest row only and
+-- leaving rows whose new key is already taken on their old key
+update crawl_records set url_key = norm_url_key(url)
+  where id in (select min(id) from crawl_records
+               where url_key is not null and url_key <> norm_url_key(url)
+               group by norm_url_key(url))
+    and norm_url_key(url) not in (select url_key from crawl_records where url_key is not null);
@@ -91,3 +91,32 @@ function streamSSEToMarkdown(container, url) {
   es.onerror = function () { try { es.close(); } catch (e) { } };
   return es;
 }
+
+// 后台采集任务：通过 SSE 跟踪状态（不支持或断开时改为轮询），任务结束时 resolve 任务对象
+function watchJob(jobId, onUpdate) {
+  return new Promise(function (resolve, reject) {
+    var finished = false;
+    function handle(job) {
+      if (onUpdate) { try { onUpdate(job); } catch (e) { } }
+      if (job.status === 'done' || job.status === 'failed') { finished = true; resolve(job); return true; }
+      return false;
+    }
+    function poll() {
+      fetch('/api/jobs/' + jobId).then(function (r) { return r.json(); }).then(function (res) {
+        if (res.code !== 0) { reject(new Error(res.msg || '任务不存在')); return; }
+        if (!handle(res.job)) setTimeout(poll, 1000);
+      }).catch(reject);
+    }
+    if (!window.EventSource) { poll(); return; }
+    var es = new EventSource('/api/jobs/' + jobId + '/stream');
+    es.onmessage = function (ev) { if (handle(JSON.parse(ev.data))) es.close(); };
+    es.onerror = function () { es.close(); if (!finished) poll(); };
+  });
+}
+
+function submitJob(url, init, onUpdate) {
+  return fetch(url, init).then(function (r) { return r.json(); }).then(function (res) {
+    if (res.code !== 0 || !res.job) throw new Error(res.msg || '提交失败');
+    return watchJob(res.job.id, onUpdate);
+  });
+}
@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+import pytest
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app import db as _db
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    # 每个用例使用一个执行过全部迁移的空库
+    monkeypatch.setattr(_db, 'DATABASE', tmp_path / 'test.db')
+    _db.close_connection()
+    _db.run_migrations()
+    yield _db
+    _db.close_connection()
@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import requests
+from project.app import crawler, httpclient, covers, search
+from project.app.incremental import SourceState
+
+INDEX = '<html><body><script>var cfg = {datasource:0123456789abcdef0123456789abcdef};</script></body></html>'
+API_ITEMS = [
+    {'Title': '四川春耕进展顺利', 'LinkUrl': 'http://sc.news.cn/a/1.htm', 'Intro': '摘要一'},
+    {'Title': '成都发布营商环境新举措', 'LinkUrl': 'http://sc.news.cn/a/2.htm', 'Intro': '摘要二'},
+]
+
+def _response(url, body, content_type):
+    r = requests.Response()
+    r.status_code = 200
+    r.url = url
+    r._content = body.encode('utf-8')
+    r.headers['Content-Type'] = content_type
+    return r
+
+def _fake_get(url, **kw):
+    if 'nodeart/list' in url:
+        pg = int(url.split('pgnum=')[1].split('&')[0])
+        lst = API_ITEMS if pg == 1 else []
+        return _response(url, json.dumps({'data': {'list': lst}}), 'application/json')
+    return _response(url, INDEX, 'text/html; charset=utf-8')
+
+def test_xinhua_api_items(monkeypatch):
+    monkeypatch.setattr(httpclient, 'get', _fake_get)
+    monkeypatch.setattr(covers, 'enrich', lambda *a, **kw: None)
+    items = crawler.collect_xinhua_items('', 2)
+    assert [it['原始URL'] for it in items] == ['http://sc.news.cn/a/1.htm', 'http://sc.news.cn/a/2.htm']
+    assert items[0]['标题'] == '四川春耕进展顺利'
+
+def test_xinhua_api_items_incremental(monkeypatch):
+    monkeypatch.setattr(httpclient, 'get', _fake_get)
+    monkeypatch.setattr(covers, 'enrich', lambda *a, **kw: None)
+    state = SourceState(1, '')
+    state.keys.add(state.key({'原始URL': 'http://sc.news.cn/a/1.htm'}))
+    items = crawler.collect_xinhua_items('', 2, state)
+    assert [it['原始URL'] for it in items] == ['http://sc.news.cn/a/2.htm']
+
+def _matches(db, q):
+    return [r['原始URL'] for r in search.search_records(q, 10)]
+
+def test_records_index_without_custom_functions(db):
+    with db.transaction() as conn:
+        rid = crawler.insert_record(conn, '营商环境', '成都发布营商环境新举措', '摘要', '', 'http://a.cn/1?utm_source=x', '')
+        other = crawler.insert_record(conn, '营商环境', '四川春耕进展顺利', '摘要', '', 'http://a.cn/2', '')
+        assert crawler.insert_record(conn, '营商环境', '成都发布营商环境新举措', '', '', 'http://a.cn/3', '') is None
+    assert _matches(db, '营商环境新举措') == ['http://a.cn/1?utm_source=x']
+    with db.transaction():
+        db.execute_update("update crawl_records set title = ?, url = ? where id = ?", ['春耕备耕物资充足', 'http://a.cn/2', rid])
+        crawler.refresh_records([rid])
+    row = db.query_one("select url_key, title_fp from crawl_records where id = ?", [rid])
+    # 新网址已属于另一条记录，键置空；标题指纹随标题更新
+    assert row['url_key'] is None
+    assert row['title_fp'] == crawler.title_fp('营商环境', '春耕备耕物资充足')
+    assert _matches(db, '营商环境新举措') == []
+    assert _matches(db, '春耕备耕') == ['http://a.cn/2']
+    # 没有注册自定义函数的连接也能写库
+    conn = sqlite3.connect(str(db.DATABASE))
+    conn.execute("update crawl_records set title = 'x', url = 'http://a.cn/9' where id = ?", [other])
+    conn.execute("delete from crawl_records where id = ?", [other])
+    conn.commit()
+    conn.close()
+    assert db.query_one("select count(*) as n from crawl_records_fts where rowid = ?", [other])['n'] == 0
+
+def test_covers_scheduled_after_commit(db, monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(covers, 'schedule', lambda urls: scheduled.append(list(urls)))
+    items = [{'标题': '四川春耕进展顺利', '原始URL': 'http://a.cn/1'}]
+    with db.transaction():
+        crawler.save_items_for_keyword('春耕', items)
+        assert scheduled == []
+    assert scheduled == [['http://a.cn/1']]
+    # 回滚的保存不回填
+    try:
+        with db.transaction():
+            crawler.save_items_for_keyword('春耕', [{'标题': '成都发布新举措', '原始URL': 'http://a.cn/2'}])
+            raise ValueError
+    except ValueError:
+        pass
+    assert scheduled == [['http://a.cn/1']]
+
+def test_filtered_count_follows_edits(db):
+    from project.app import warehouse
+    warehouse.invalidate_counts()
+    with db.transaction() as conn:
+        rid = crawler.insert_record(conn, '春耕', '四川春耕进展顺利', '', '', 'http://a.cn/1', '')
+        crawler.insert_record(conn, '春耕', '春耕备耕物资充足', '', '', 'http://a.cn/2', '')
+    assert warehouse.record_count('春耕') == 2
+    with db.transaction():
+        db.execute_update("update crawl_records set title = '营商环境', keyword = '营商' where id = ?", [rid])
+        crawler.refresh_records([rid])
+    assert warehouse.record_count('春耕') == 1
+    db.execute_update("delete from crawl_records")
+    warehouse.invalidate_counts()
+    assert warehouse.record_count('春耕') == 0
+
+def test_export_matches_unique_listing(db):
+    from project.app import warehouse
+    with db.transaction() as conn:
+        first = crawler.insert_record(conn, '春耕', '四川春耕进展顺利', '', '', 'http://a.cn/1', '')
+        copy = crawler.insert_record(conn, '春耕', '四川春耕进展顺利（转载）', '', '', 'http://b.cn/1', '')
+        crawler.insert_record(conn, '营商', '成都发布营商环境新举措', '', '', 'http://a.cn/2', '')
+    db.execute_update("update crawl_records set cluster_id = ? where id in (?, ?)", [first, first, copy])
+    listed = [r['id'] for r in warehouse.page_records('春耕', 50, unique=True)]
+    assert listed == [first]
+    for details in (False, True):
+        exported = [r['id'] for r in warehouse.export_rows('春耕', details, unique=True)]
+        assert exported == listed
+    assert len(list(warehouse.export_rows('', True, unique=True))) == 2
@@ -0,0 +1,76 @@
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+import requests
+from project.app import crawler, decoding, hostguard, httpcache, httpclient
+
+PAGE = ('<html><head><meta charset="utf-8"><title>测试</title></head><body><p>'
+        + '正文内容，' * 2000 + '</p></body></html>').encode('utf-8')
+
+class Handler(BaseHTTPRequestHandler):
+    # 收到的 (路径, Accept-Encoding)
+    seen = []
+
+    def do_GET(self):
+        accept = self.headers.get('Accept-Encoding') or ''
+        self.seen.append((self.path, accept))
+        if self.path.startswith('/zstd') and accept != 'identity':
+            # 客户端无法解压的编码
+            body, encoding = b'\x28\xb5\x2f\xfd' + PAGE[:100], 'zstd'
+        elif self.path.startswith('/zstd'):
+            body, encoding = PAGE, None
+        else:
+            body, encoding = gzip.compress(PAGE), 'gzip'
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.seen = []
+    srv = HTTPServer(('127.0.0.1', 0), Handler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield f'http://127.0.0.1:{srv.server_address[1]}/a.html'
+    srv.shutdown()
+    srv.server_close()
+
+@pytest.fixture(autouse=True)
+def no_proxy(monkeypatch):
+    # 不走环境变量中的代理
+    session = requests.Session()
+    session.trust_env = False
+    monkeypatch.setattr(httpclient, 'session_for', lambda url: session)
+    hostguard.reset()
+    yield
+    hostguard.reset()
+
+def test_stream_decodes_once(db, server):
+    r = httpcache.get(server, profile='page', stream=True)
+    assert r.content == PAGE
+    # 已读取的响应再次调用直接返回解压后的内容
+    assert decoding.read_body(r) == PAGE
+
+def test_stream_limit(db, server):
+    r = httpclient.get(server, profile='page', stream=True)
+    assert decoding.read_body(r, limit=1000) == PAGE[:1000]
+    assert r.content == PAGE[:1000]
+
+def test_unsupported_encoding_retries_identity(db, server):
+    url = server.replace('/a.html', '/zstd/a.html')
+    res = crawler.extract_detail(url)
+    assert res['code'] == 0, res
+    assert '正文内容' in res['content_text']
+    assert [a for _, a in Handler.seen] == [decoding.ACCEPT_ENCODING, 'identity']
+
+def test_accept_encoding_matches_decoders():
+    assert ('br' in decoding.ACCEPT_ENCODING) == (decoding._brotli() is not None)
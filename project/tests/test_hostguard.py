@@ -0,0 +1,64 @@
+import pytest
+import requests
+from project.app import hostguard, httpclient
+
+URL = 'http://probe.example.com/s'
+
+@pytest.fixture(autouse=True)
+def guard(monkeypatch):
+    # 阈值 2 次、无冷却，便于直接进入半开状态
+    monkeypatch.setattr(hostguard, '_limits', lambda: (1000.0, 1000, 2, 0.0))
+    hostguard.reset()
+    yield
+    hostguard.reset()
+
+def _state():
+    return hostguard.snapshot()[0]['state']
+
+def _probe_response():
+    hostguard.failure(URL)
+    hostguard.failure(URL)
+    assert _state() == 'open'
+    hostguard.acquire(URL)
+    assert _state() == 'half_open'
+    resp = requests.Response()
+    resp.url = URL
+    resp.guard_reported = False
+    return resp
+
+def test_parse_error_resolves_probe():
+    resp = _probe_response()
+    with pytest.raises(ValueError):
+        httpclient.parse_reported(resp, lambda r: int('x'))
+    assert _state() == 'open'
+    # 冷却结束后可以再次探测，解析出结果则关闭熔断
+    hostguard.acquire(URL)
+    resp.guard_reported = False
+    httpclient.parse_reported(resp, lambda r: [1])
+    assert _state() == 'closed'
+
+def test_unreported_probe_expires(monkeypatch):
+    _probe_response()
+    with pytest.raises(hostguard.CircuitOpen):
+        hostguard.acquire(URL)
+    monkeypatch.setattr(hostguard, 'PROBE_TIMEOUT', 0.0)
+    hostguard.acquire(URL)
+
+class RedirectSession:
+    # 模拟 news 主机被重定向到 www 主机
+    def get(self, url, **kw):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = 'http://www.example.com/landing'
+        resp._content = b''
+        return resp
+
+def test_redirected_probe_reports_requested_host(db, monkeypatch):
+    monkeypatch.setattr(httpclient, 'session_for', lambda url: RedirectSession())
+    hostguard.failure(URL)
+    hostguard.failure(URL)
+    resp = httpclient.get(URL, profile='search', report=False)
+    assert _state() == 'half_open'
+    httpclient.parse_reported(resp, lambda r: [1])
+    states = {h['host']: h['state'] for h in hostguard.snapshot()}
+    assert states == {'probe.example.com': 'closed'}
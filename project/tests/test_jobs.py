@@ -0,0 +1,54 @@
+import pytest
+from project.app import jobs, leader, scheduler
+
+class IdleWorker:
+    def wake(self):
+        pass
+
+@pytest.fixture
+def queue(db, monkeypatch):
+    # 只入队不执行
+    monkeypatch.setattr(jobs, 'start_worker', lambda: IdleWorker())
+    db.execute_update("insert into sources(id, keyword, enabled) values(1, '测试', 1)")
+    db.execute_update("insert into sources(id, keyword, enabled) values(2, '其他', 1)")
+    return db
+
+def test_submit_source_dedupes_active_job(queue):
+    first, created = jobs.submit_source(1)
+    assert created
+    again, created = jobs.submit_source(1)
+    assert not created and again['id'] == first['id']
+    other, created = jobs.submit_source(2)
+    assert created and other['id'] != first['id']
+    queue.execute_update("update crawl_jobs set status = 'done' where id = ?", [first['id']])
+    assert jobs.active_source_job(1) is None
+    _, created = jobs.submit_source(1)
+    assert created
+
+def test_scheduled_run_skips_source_with_queued_job(queue, monkeypatch):
+    calls = []
+    monkeypatch.setattr(scheduler, 'collect_for_source', lambda src, state=None: calls.append(src['id']) or [])
+    jobs.submit_source(1)
+    assert scheduler.run_source(queue.query_one("select * from sources where id = 1")) == 0
+    assert calls == []
+
+def test_manual_run_uses_scheduled_collection(queue, monkeypatch):
+    calls = []
+    monkeypatch.setattr(scheduler, 'collect_for_source', lambda src, state=None: calls.append(src['id']) or [])
+    result = jobs._run_source({'source_id': 1}, None)
+    assert calls == [1] and result == {'count': 0, 'fetched': 0}
+
+def test_source_lease_is_shared_across_runs(queue, monkeypatch):
+    # 另一进程持有该来源的租约时，定时采集跳过，手动任务等待超时后失败重试
+    calls = []
+    monkeypatch.setattr(scheduler, 'collect_for_source', lambda src, state=None: calls.append(src['id']) or [])
+    monkeypatch.setattr(jobs, 'SOURCE_WAIT', 0.2)
+    assert leader.try_acquire('source:1', 'other-process', 60)
+    assert scheduler.run_source(queue.query_one("select * from sources where id = 1")) == 0
+    with pytest.raises(RuntimeError):
+        jobs._run_source({'source_id': 1}, None)
+    assert calls == []
+    leader.release('source:1', 'other-process')
+    jobs._run_source({'source_id': 1}, None)
+    assert calls == [1]
+    assert leader.current('source:1') is None
@@ -0,0 +1,43 @@
+import pytest
+from project.app import crawler, covers, neardup
+
+def _item(i, title):
+    return {'标题': title, '概要': '四川省政务公开工作要点摘要', '封面': '', '原始URL': f'http://example.com/{i}', '来源': ''}
+
+def _legacy(db, n):
+    # 迁移前入库的历史记录：没有指纹
+    return [db.execute_update(
+        "insert into crawl_records(keyword, title, summary, url) values('k', ?, '', ?)", [f'历史记录标题{i}', f'http://old.example.com/{i}']
+    ) for i in range(n)]
+
+def _unhashed(db):
+    return {r['id'] for r in db.query_all("select id from crawl_records where simhash is null")}
+
+@pytest.fixture(autouse=True)
+def no_covers(monkeypatch):
+    monkeypatch.setattr(covers, 'schedule', lambda urls: None)
+
+def test_save_indexes_only_new_records_after_commit(db):
+    legacy = _legacy(db, 3)
+    with db.transaction():
+        assert crawler.save_items_for_keyword('k', [_item(1, '关于做好春耕工作的通知'), _item(2, '关于做好春耕工作的通知-新华网')]) == 2
+        # 提交前不计算
+        assert len(_unhashed(db)) == 5
+    # 历史记录留给后台补全任务
+    assert _unhashed(db) == set(legacy)
+    rows = db.query_all("select cluster_id from crawl_records where url like 'http://example.com/%'")
+    assert len({r['cluster_id'] for r in rows}) == 1
+    assert neardup.index_pending() == 3
+
+def test_rollback_discards_indexing(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            crawler.save_items_for_keyword('k', [_item(1, '标题一二三四五')])
+            raise RuntimeError
+    assert db.query_all("select id from crawl_records") == []
+    assert db.query_all("select * from dup_bands") == []
+
+def test_duplicate_items_not_counted(db):
+    assert crawler.save_items_for_keyword('k', [_item(1, '标题一二三四五')]) == 1
+    assert crawler.save_items_for_keyword('k', [_item(1, '标题一二三四五'), _item(2, '另一条标题内容')]) == 1
+    assert _unhashed(db) == set()
@@ -0,0 +1,20 @@
+from project.app import db as _db
+from project.app.normalize import url_key
+
+def test_url_key_strips_only_known_trackers():
+    assert url_key('https://a.cn/x?id=1&utm_source=wx&spm=a.b&fbclid=z') == 'https://a.cn/x?id=1'
+    # 通用参数名可能决定页面内容，保留
+    assert url_key('https://a.cn/list?from=2024&fr=1') != url_key('https://a.cn/list?from=2025&fr=1')
+    assert url_key('https://a.cn/x?timestamp=1&for=gov') == 'https://a.cn/x?for=gov&timestamp=1'
+
+def test_migration_recomputes_stale_keys(db):
+    rows = [('http://a.cn/p?from=1', 'http://a.cn/p'), ('http://a.cn/p?from=2', None), ('http://a.cn/q?fr=x', 'http://a.cn/q'),
+            ('http://a.cn/q?fr=x&utm_source=y', None)]
+    with db.transaction() as conn:
+        for i, (url, key) in enumerate(rows):
+            conn.execute("insert into crawl_records(keyword, title, url, url_key) values('k', ?, ?, ?)", [f't{i}', url, key])
+    sql = (_db.MIGRATIONS_DIR / '017_url_key_params.sql').read_text(encoding='utf-8')
+    with db.transaction() as conn:
+        conn.execute(sql)
+    keys = [r['url_key'] for r in db.query_all("select url_key from crawl_records order by id")]
+    assert keys == ['http://a.cn/p?from=1', None, 'http://a.cn/q?fr=x', None]
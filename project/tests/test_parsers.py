@@ -0,0 +1,54 @@
+from pathlib import Path
+import pytest
+from project.app import parsers
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'baidu'
+PAGES = sorted(p.name for p in FIXTURES.glob('*.html'))
+
+def load(name):
+    return (FIXTURES / name).read_text(encoding='utf-8')
+
+@pytest.mark.parametrize('name', PAGES)
+@pytest.mark.parametrize('func', [parsers.parse_items, parsers.parse_news_items])
+def test_backends_identical(name, func):
+    html = load(name)
+    assert func(html, 'bs4') == func(html, 'lxml')
+
+@pytest.mark.parametrize('using', parsers.BACKENDS)
+def test_web_layout(using):
+    items = parsers.parse_items(load('web.html'), using)
+    assert len(items) == 5
+    first = items[0]
+    assert first['标题'] == '四川省优化营商环境条例_四川省人民政府网站'
+    assert first['原始URL'] == 'http://www.baidu.com/link?url=kQ0Gk3Y2xR'
+    assert first['封面'].startswith('https://dss0.bdstatic.com/')
+    assert first['概要'] == '2021年9月29日第一条 为了持续优化营商环境，激发市场主体活力，根据国务院《优化营商环境条例》等，结合四川省实际，制定本条例。'
+    assert items[1]['来源'] == '成都日报'
+    assert 'bds.se.mon' not in items[1]['概要']
+    assert items[2]['封面'] == 'https://vdposter.bdstatic.com/f1.jpeg'
+    assert items[4]['原始URL'] == ''
+
+@pytest.mark.parametrize('using', parsers.BACKENDS)
+def test_news_layout(using):
+    items = parsers.parse_news_items(load('news_classic.html'), using)
+    assert [it['原始URL'] for it in items] == [
+        'http://www.scdaily.cn/nc/2024/0512/a1.html',
+        'http://www.xinhuanet.com/politics/2024-05/11/c_a2.htm',
+        'http://sc.news.cn/a3.htm',
+    ]
+    assert items[0]['来源'].startswith('四川日报')
+    assert items[2]['概要'] == '名单共涉及 21 个市（州）的 300 个村。'
+    assert items[2]['来源'] == '新华网四川频道'
+
+@pytest.mark.parametrize('using', parsers.BACKENDS)
+def test_h3_fallback(using):
+    items = parsers.parse_items(load('fallback.html'), using)
+    assert [it['标题'] for it in items] == ['四川省人民政府政务服务网', '四川政务公开目录', '无链接标题']
+    assert items[2]['原始URL'] == ''
+
+@pytest.mark.parametrize('using', parsers.BACKENDS)
+def test_current_news_markup(using):
+    # 新版资讯页的结果容器为 result-op，没有 div.result，走 h3 a 兜底
+    items = parsers.parse_news_items(load('news.html'), using)
+    assert len(items) == 5
+    assert items[3]['标题'] == '德阳&广汉联合发布政务公开标准目录'
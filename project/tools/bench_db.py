@@ -0,0 +1,80 @@
+import sys
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app import db
+
+# 旧实现：每次调用都新建连接、执行一条语句后关闭
+def legacy_query_one(sql, params=None):
+    conn = sqlite3.connect(str(db.DATABASE))
+    conn.row_factory = sqlite3.Row
+    try:
+        row = conn.execute(sql, params or []).fetchone()
+        return dict(row) if row else None
+    finally:
+        conn.close()
+
+def legacy_query_all(sql, params=None):
+    conn = sqlite3.connect(str(db.DATABASE))
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(r) for r in conn.execute(sql, params or []).fetchall()]
+    finally:
+        conn.close()
+
+def legacy_execute_update(sql, params=None):
+    conn = sqlite3.connect(str(db.DATABASE))
+    try:
+        cur = conn.execute(sql, params or [])
+        conn.commit()
+        return cur.lastrowid
+    finally:
+        conn.close()
+
+def prepare(path):
+    conn = sqlite3.connect(str(path))
+    conn.executescript("""
+        create table crawl_records (
+          id integer primary key autoincrement,
+          keyword text, title text, summary text, cover text, url text, source text,
+          created_at datetime default current_timestamp
+        );
+    """)
+    conn.executemany(
+        "insert into crawl_records(keyword, title, summary, cover, url, source) values(?, ?, ?, ?, ?, ?)",
+        [('政务', f'标题{i}', '概要' * 20, '', f'https://example.com/{i}', '百度') for i in range(2000)]
+    )
+    conn.commit()
+    conn.close()
+
+def measure(fn, n):
+    start = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - start)
+
+def main(n=2000):
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DATABASE = Path(tmp) / "bench.db"
+        prepare(db.DATABASE)
+        cases = [
+            ('query_one', legacy_query_one, db.query_one,
+             lambda f, i: f("select id, title from crawl_records where id = ?", [i % 2000 + 1])),
+            ('query_all', legacy_query_all, db.query_all,
+             lambda f, i: f("select id, title from crawl_records order by id desc limit 20")),
+            ('execute_update', legacy_execute_update, db.execute_update,
+             lambda f, i: f("update crawl_records set summary = ? where id = ?", [f's{i}', i % 2000 + 1])),
+        ]
+        print(f"{'helper':<16}{'legacy ops/s':>14}{'pooled ops/s':>14}{'speedup':>10}")
+        for name, legacy, pooled, call in cases:
+            # 旧实现在 rollback journal 下运行，新实现首次连接时切换为 WAL
+            old = measure(lambda i: call(legacy, i), n)
+            new = measure(lambda i: call(pooled, i), n)
+            print(f"{name:<16}{old:>14.0f}{new:>14.0f}{new / old:>9.1f}x")
+        db.close_connection()
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,104 @@
+import sys
+import re
+import time
+import gzip
+from pathlib import Path
+import requests
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app import decoding
+
+# 用法：python bench_decoding.py [页面大小MB]
+# 对比 deep_crawl 旧的逐个候选编码解码流程与 decoding 模块在大体积 GBK 页面上的耗时，并校验解码结果一致
+
+def legacy_decode(r):
+    raw = r.content
+    def pick_encoding():
+        try:
+            from requests.utils import get_encoding_from_headers
+            enc_h = get_encoding_from_headers(r.headers)
+        except Exception:
+            enc_h = None
+        if enc_h:
+            return enc_h
+        m1 = re.search(br'<meta[^>]*charset\s*=\s*[\"\']?([a-zA-Z0-9_-]+)', raw, re.IGNORECASE)
+        if m1:
+            return m1.group(1).decode('ascii', errors='ignore')
+        m2 = re.search(br'charset\s*=\s*([a-zA-Z0-9_-]+)', raw, re.IGNORECASE)
+        if m2:
+            return m2.group(1).decode('ascii', errors='ignore')
+        enc_req = r.encoding
+        if enc_req and enc_req.lower() != 'iso-8859-1':
+            return enc_req
+        return getattr(r, 'apparent_encoding', None) or 'utf-8'
+    enc = pick_encoding() or 'utf-8'
+    html = None
+    for candidate in [enc, 'utf-8', 'utf-8-sig', 'gb18030', 'gbk', 'gb2312', 'big5']:
+        try:
+            h = raw.decode(candidate, errors='replace')
+            low = h.lower()
+            if ('<html' in low) or ('</html>' in low) or ('<div' in low) or ('</div>' in low):
+                html = h
+                break
+            if not html:
+                html = h
+        except Exception:
+            continue
+    if html is None:
+        html = raw.decode('utf-8', errors='replace')
+    return re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]', '', html)
+
+def make_page(mb, meta=True):
+    para = '<p>四川省人民政府办公厅关于进一步优化政务服务提升行政效能的实施意见，推动“高效办成一件事”。\x0b</p>\n'
+    head = '<html><head>' + ('<meta http-equiv="Content-Type" content="text/html; charset=gb2312">' if meta else '') + '<title>政务公开</title></head><body><div id="content">'
+    body = para * int(mb * 1024 * 1024 / len(para.encode('gbk')))
+    return (head + body + '</div></body></html>').encode('gbk')
+
+def response(raw, content_type='text/html'):
+    r = requests.Response()
+    r.status_code = 200
+    if content_type:
+        r.headers['Content-Type'] = content_type
+    r._content = raw
+    r._content_consumed = True
+    r.encoding = requests.utils.get_encoding_from_headers(r.headers)
+    return r
+
+def timed(fn, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        out = fn()
+    return (time.perf_counter() - start) / rounds * 1000, out
+
+def main(mb=4.0):
+    cases = [
+        ('meta charset', make_page(mb, True), 'text/html'),
+        ('header charset', make_page(mb, False), 'text/html; charset=GBK'),
+        ('no charset', make_page(mb, False), 'text/html'),
+        ('no header', make_page(mb, False), None),
+    ]
+    print(f'page size ~{mb}MB GBK')
+    # 以 GB18030 解码结果为准，检查两种流程是否解出正确文本
+    print(f"{'case':<16}{'legacy ms':>11}{'new ms':>9}{'speedup':>9}  legacy-ok  new-ok")
+    for name, raw, ct in cases:
+        # 没有 Content-Type 时旧流程会对整页跑 apparent_encoding，只测一轮
+        rounds = 1 if name == 'no header' else 3
+        t_old, old = timed(lambda: legacy_decode(response(raw, ct)), rounds)
+        t_new, new = timed(lambda: decoding.text_of(response(raw, ct)), rounds)
+        truth = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F]', '', raw.decode('gb18030'))
+        print(f'{name:<16}{t_old:>11.1f}{t_new:>9.1f}{t_old / t_new:>8.1f}x  {str(old == truth):>9}  {str(new == truth):>6}')
+    raw = make_page(mb, True)
+    packed = gzip.compress(raw)
+    def stream_gunzip():
+        d = decoding.Decompressor('gzip')
+        out = bytearray()
+        for i in range(0, len(packed), decoding.CHUNK):
+            out += d.feed(packed[i:i + decoding.CHUNK])
+        return bytes(out + d.flush())
+    # 流式解压的意义在于可边读边截断，速度应与一次性解压持平
+    t_old, old = timed(lambda: gzip.decompress(packed), 3)
+    t_new, new = timed(stream_gunzip, 3)
+    print(f"{'gzip stream':<16}{t_old:>11.1f}{t_new:>9.1f}{t_old / t_new:>8.1f}x  {str(old == raw):>9}  {str(new == raw):>6}")
+
+if __name__ == '__main__':
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 4.0)
@@ -0,0 +1,141 @@
+import sys
+import time
+import random
+from pathlib import Path
+from bs4 import BeautifulSoup
+from lxml import html as lhtml
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app import extract
+
+# 用法：python bench_extract.py [保存的文章页 .html ...]
+# 未提供文件时使用按常见政务/新闻站模板生成的样本页（正文与标题已知），比较原候选 XPath 列表与
+# 密度抽取的正文准确率（字符 F1）、标题准确率与耗时；提供文件时只比较耗时
+
+SENTENCE = ('为深入贯彻落实党中央国务院决策部署 进一步优化营商环境 结合本地实际 现就有关事项通知如下 '
+            '各地各部门要高度重视 切实加强组织领导 明确责任分工 确保各项措施落到实处 '
+            '对工作中发现的问题要及时研究解决 重大情况及时报告 本通知自印发之日起施行').split()
+SITE = '四川省人民政府'
+
+# 原实现（规则未取到正文时）：依次尝试候选容器，文字不足 200 时整页 get_text；标题取 h1，没有时取 <title>
+OLD_CANDIDATES = ("//article", "//div[@id='content']", "//div[contains(@class,'content')]",
+                  "//div[contains(@class,'article')]", "//div[contains(@class,'news')]", "//div[contains(@class,'main')]")
+
+def old_extract(html):
+    doc = lhtml.fromstring(html)
+    text = ''
+    for xp in OLD_CANDIDATES:
+        nodes = doc.xpath(xp)
+        if not nodes:
+            continue
+        txt = '\n'.join((n.text_content() or '').strip() for n in nodes)
+        if len(txt) >= 200:
+            text = txt
+            break
+    if not text:
+        text = BeautifulSoup(html, 'html.parser').get_text(separator='\n', strip=True)
+    heading = doc.xpath('//h1') or doc.xpath('//title')
+    title = (heading[0].text_content() or '').strip() if heading else ''
+    return title, text
+
+def old_plain(html):
+    # 原实现（没有规则时）：BeautifulSoup 整页 get_text
+    soup = BeautifulSoup(html, 'html.parser')
+    tag = soup.find('h1') or soup.find('title')
+    return (tag.get_text(strip=True) if tag else ''), soup.get_text(separator='\n', strip=True)
+
+def new_extract(html):
+    res = extract.extract(extract.parse(html))
+    return res['title'], res['content_text']
+
+def paragraph(rnd):
+    return '，'.join(''.join(rnd.choice(SENTENCE) for _ in range(rnd.randint(1, 3))) for _ in range(rnd.randint(2, 4))) + '。'
+
+def links(rnd, n, cls):
+    items = ''.join(f'<li><a href="/list/{rnd.randrange(9999)}.html">{rnd.choice(SENTENCE)}</a></li>' for _ in range(n))
+    return f'<div class="{cls}"><ul>{items}</ul></div>'
+
+def page(i, rnd):
+    # 返回 (html, 标题, 正文段落)
+    title = f'关于{rnd.choice(SENTENCE)}的通知（第{i}号）'
+    paras = [paragraph(rnd) for _ in range(rnd.randint(3, 12))]
+    head = f'<html><head><meta charset="utf-8"><title>{title}_{SITE}</title><script>var a = "{"x" * 200}";</script></head>'
+    nav = f'<div class="header"><h1 class="logo">{SITE}</h1>{links(rnd, rnd.randint(10, 40), "nav-content")}</div>'
+    footer = f'<div class="footer">版权所有：{SITE} 主办单位：{SITE}办公厅 技术支持：大数据中心 {"地址电话 " * 20}</div>'
+    related = f'<h3>相关阅读</h3>{links(rnd, rnd.randint(4, 10), "related")}'
+    share = '<div class="share"><a href="#">微信</a><a href="#">微博</a><a href="#">QQ</a>【打印本页】【关闭窗口】</div>'
+    meta = f'<div class="info">来源：{SITE}办公厅 发布时间：2024-05-{i % 28 + 1:02d} 字号：大 中 小</div>'
+    body = ''.join(f'<p>{p}</p>' for p in paras)
+    kind = i % 5
+    if kind == 0:
+        # 政务站 TRS 模板：外层 div.main 包住整页
+        html = (f'{head}<body><div class="main">{nav}<div class="crumb">当前位置：<a href="/">首页</a> &gt; <a href="/tz">通知公告</a></div>'
+                f'<div class="article-box"><h2 class="title">{title}</h2>{meta}<div class="TRS_Editor">{body}</div>{share}</div>'
+                f'{related}</div>{footer}</body></html>')
+    elif kind == 1:
+        # 新闻站：正文在 div#detail，导航也带 content 类名
+        html = (f'{head}<body>{nav}<div class="wrap"><h1 id="title">{title}</h1>{meta}<div id="detail">{body}</div>'
+                f'{share}<div class="right-content">{related}</div></div>{footer}</body></html>')
+    elif kind == 2:
+        # 表格布局，<br> 分段
+        body = '<br/>'.join(f'&nbsp;&nbsp;{p}' for p in paras)
+        html = (f'{head}<body><table><tr><td>{nav}</td></tr><tr><td><table><tr><td class="bt">{title}</td></tr>'
+                f'<tr><td>{meta}</td></tr><tr><td class="zw"><font size="3">{body}</font></td></tr></table></td>'
+                f'<td width="200">{related}</td></tr></table>{footer}</body></html>')
+    elif kind == 3:
+        # HTML5 article，评论区也在 article 内
+        comments = '<div class="comment-list">' + ''.join(f'<div class="comment">网友{k}：{rnd.choice(SENTENCE)}</div>' for k in range(8)) + '</div>'
+        html = (f'{head}<body><nav>{links(rnd, 20, "menu")}</nav><article><header><h1>{title}</h1>{meta}</header>'
+                f'<section class="post-body">{body}</section>{share}{comments}</article><aside>{related}</aside>'
+                f'{footer}</body></html>')
+    else:
+        # 正文没有可识别的类名，分在两个并列 div 中
+        half = len(paras) // 2 or 1
+        html = (f'{head}<body>{nav}<div class="container"><div class="left"><h1>{title}</h1>{meta}'
+                f'<div class="a1">{"".join(f"<p>{p}</p>" for p in paras[:half])}</div>'
+                f'<div class="a2">{"".join(f"<p>{p}</p>" for p in paras[half:])}</div></div>'
+                f'<div class="sidebar">{related}</div></div>{footer}</body></html>')
+    return html, title, paras
+
+def corpus(n=200, seed=3):
+    rnd = random.Random(seed)
+    return [page(i, rnd) for i in range(n)]
+
+def f1(text, paras):
+    # 正文段落出现在抽取结果中即算召回；精确率为召回段落字数占抽取结果（去空白）字数的比例
+    flat = ''.join((text or '').split())
+    found = sum(len(p) for p in set(paras) if p in flat)
+    precision = min(1.0, found / len(flat)) if flat else 0.0
+    recall = found / sum(len(p) for p in set(paras))
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+def timeit(fn, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for html in pages:
+            fn(html)
+    return (time.perf_counter() - start) / (rounds * len(pages)) * 1000
+
+def main(paths):
+    rounds = 3
+    methods = (('candidates', old_extract), ('bs4 page', old_plain), ('density', new_extract))
+    if paths:
+        pages = [Path(p).read_text(encoding='utf-8', errors='replace') for p in paths]
+    else:
+        samples = corpus()
+        pages = [html for html, _, _ in samples]
+        print(f"{'method':<12}{'text F1':>10}{'title ok':>10}")
+        for name, fn in methods:
+            scores = []
+            titles = 0
+            for html, title, paras in samples:
+                t, text = fn(html)
+                scores.append(f1(text, paras))
+                titles += t == title
+            print(f'{name:<12}{sum(scores) / len(scores):>10.3f}{titles / len(samples):>10.1%}')
+    print(f'{len(pages)} pages')
+    for name, fn in methods:
+        print(f'{name:<12}{timeit(fn, pages, rounds):>8.2f} ms/page')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,75 @@
+import sys
+import random
+import tempfile
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app import db, neardup
+
+# 用法：python bench_neardup.py [记录数...]
+# 在临时库中写入合成标题（其中一部分是改写过的转载），比较分桶索引与逐条比较汉明距离的入库耗时和召回
+
+WORDS = ('关于 进一步 做好 加强 推进 全省 全市 春季 农业 生产 安全 防汛 工作 会议 通知 意见 方案 实施 '
+         '民营 经济 营商 环境 项目 建设 乡村 振兴 教育 医疗 养老 服务 政务 公开 数字 政府 改革 发展').split()
+SUFFIXES = ('-新华网', '_中国政府网', '|四川日报', '（转载）', '')
+
+def synthetic(n, seed=11):
+    # 约 20% 的记录是前面某条的转载：加站名后缀、改标点
+    rnd = random.Random(seed)
+    out = []
+    for i in range(n):
+        if out and rnd.random() < 0.2:
+            src = rnd.randrange(len(out))
+            title, summary, _ = out[src]
+            if rnd.random() < 0.5:
+                title = title.replace('，', ' ') + rnd.choice(SUFFIXES)
+            else:
+                title = title + rnd.choice(SUFFIXES)
+            out.append((title, summary, src))
+        else:
+            title = '，'.join(''.join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 5))) for _ in range(2)) + str(i)
+            summary = ''.join(rnd.choice(WORDS) for _ in range(12))
+            out.append((title, summary, None))
+    return out
+
+def run(n):
+    tmp = Path(tempfile.mkdtemp())
+    db.DATABASE = tmp / 'bench.db'
+    db.close_connection()
+    db.run_migrations()
+    rows = synthetic(n)
+    ids = []
+    with db.transaction():
+        for i, (title, summary, _) in enumerate(rows):
+            ids.append(db.execute_update(
+                "insert into crawl_records(keyword, title, summary, url) values('bench', ?, ?, ?)",
+                [title, summary, f'http://example.com/{i}']
+            ))
+    # 分桶索引
+    start = time.perf_counter()
+    while neardup.index_pending():
+        pass
+    indexed = time.perf_counter() - start
+    clusters = {r['id']: r['cluster_id'] for r in db.query_all("select id, cluster_id from crawl_records")}
+    copies = [(ids[i], ids[src]) for i, (_, _, src) in enumerate(rows) if src is not None]
+    found = sum(1 for a, b in copies if clusters[a] == clusters[b])
+    # 对照：每条新记录与此前全部记录逐一比较
+    hashes = [neardup.simhash(f"{neardup.strip_site(t)} {s}") for t, s, _ in rows]
+    start = time.perf_counter()
+    brute_found = 0
+    for i, h in enumerate(hashes):
+        if rows[i][2] is not None and any(neardup.hamming(h, hashes[j]) <= neardup.SIM_DISTANCE for j in range(i)):
+            brute_found += 1
+    brute = time.perf_counter() - start
+    print(f"{n:>7} 条  分桶索引 {indexed / n * 1000:6.2f} ms/条  逐条比较 {brute / n * 1000:7.2f} ms/条（不含写库）  "
+          f"转载 {len(copies)} 条，分桶召回 {found}，逐条召回 {brute_found}")
+    db.close_connection()
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [2000, 10000, 40000]
+    for n in sizes:
+        run(n)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import sys
+import time
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app.parsers import bs4_parse_items, bs4_parse_news_items, lxml_parse_items, lxml_parse_news_items
+
+# 用法：python bench_parsers.py [保存的百度结果页 .html ...]
+# 未提供文件时使用 tests/fixtures/baidu 下的结果页（与 tests/test_parsers.py 相同）；先逐项比对两个后端的输出，再比较耗时
+FIXTURES = Path(__file__).resolve().parents[1] / 'tests' / 'fixtures' / 'baidu'
+
+def fixture_pages():
+    return [p.read_text(encoding='utf-8') for p in sorted(FIXTURES.glob('*.html'))]
+
+def check(pages):
+    bad = 0
+    for i, page in enumerate(pages):
+        for name, old, new in (('parse_items', bs4_parse_items, lxml_parse_items),
+                               ('parse_news_items', bs4_parse_news_items, lxml_parse_news_items)):
+            a, b = old(page), new(page)
+            if a != b:
+                bad += 1
+                print(f'[diff] page {i} {name}')
+                for x, y in zip(a, b):
+                    if x != y:
+                        print('  bs4 :', x)
+                        print('  lxml:', y)
+                        break
+                else:
+                    print(f'  bs4 {len(a)} items, lxml {len(b)} items')
+    return bad
+
+def timeit(fn, pages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page in pages:
+            fn(page)
+    return (time.perf_counter() - start) / (rounds * len(pages)) * 1000
+
+def main(paths):
+    if paths:
+        pages = [Path(p).read_text(encoding='utf-8', errors='replace') for p in paths]
+    else:
+        pages = fixture_pages()
+    bad = check(pages)
+    print(f'equivalence: {len(pages)} pages, {bad} mismatches')
+    rounds = 200
+    print(f"{'parser':<18}{'bs4 ms/page':>13}{'lxml ms/page':>14}{'speedup':>10}")
+    for name, old, new in (('parse_items', bs4_parse_items, lxml_parse_items),
+                           ('parse_news_items', bs4_parse_news_items, lxml_parse_news_items)):
+        t_old = timeit(old, pages, rounds)
+        t_new = timeit(new, pages, rounds)
+        print(f'{name:<18}{t_old:>13.2f}{t_new:>14.2f}{t_old / t_new:>9.1f}x')
+    return 1 if bad else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app.db import query_all, query_one, execute_update, transaction, get_connection
+from project.app.contentstore import put_blob
+
+BATCH = 200
+
+def compact():
+    # 把历史上未压缩存储的详情转存到 content_blobs，并清空行内正文
+    moved = 0
+    last_id = 0
+    while True:
+        rows = query_all(
+            "select id, content_text, content_html from crawl_details "
+            "where id > ? and text_hash is null and html_hash is null order by id limit ?",
+            [last_id, BATCH]
+        )
+        if not rows:
+            break
+        with transaction():
+            for r in rows:
+                execute_update(
+                    "update crawl_details set text_hash = ?, html_hash = ?, content_text = '', content_html = '' where id = ?",
+                    [put_blob(r['content_text']), put_blob(r['content_html']), r['id']]
+                )
+        moved += len(rows)
+        last_id = rows[-1]['id']
+        print(f"Compacted {moved} detail rows...")
+    return moved
+
+if __name__ == "__main__":
+    total = compact()
+    blobs = query_one("select count(*) as cnt, coalesce(sum(size), 0) as raw, coalesce(sum(length(data)), 0) as stored from content_blobs")
+    print(f"Done: {total} rows, {blobs['cnt']} blobs, {blobs['raw']} bytes -> {blobs['stored']} bytes stored.")
+    if '--vacuum' in sys.argv:
+        conn = get_connection()
+        try:
+            conn.execute("vacuum")
+            conn.execute("pragma wal_checkpoint(truncate)")
+        finally:
+            conn.close()
+        print("Vacuum complete.")
@@ -0,0 +1,47 @@
+import sys
+import signal
+import logging
+import threading
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+from project.app import create_app, scheduler, leader, jobs
+
+# 独立采集进程：在 Web 进程之外运行定时采集。可同时启动多个实例，
+# 通过 SQLite 中的 scheduler 租约保证任一时刻只有一个实例在调度，其余实例热备。
+# 每个实例都运行任务执行器，消费 Web 端提交到 crawl_jobs 队列的采集任务。
+# 用法：python tools/crawl_worker.py
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    log = logging.getLogger('crawl_worker')
+    # 执行迁移并初始化默认数据，与 Web 进程一致
+    create_app()
+    stop = threading.Event()
+
+    def on_elected():
+        log.info('acquired %s lease, starting scheduler', scheduler.LEASE)
+        scheduler.start()
+
+    def on_demoted():
+        log.info('lost %s lease, stopping scheduler', scheduler.LEASE)
+        scheduler.stop(wait=False)
+
+    elector = leader.Elector(scheduler.LEASE, on_elected, on_demoted)
+    log.info('worker %s waiting for %s lease', elector.holder, scheduler.LEASE)
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    elector.start()
+    jobs.start_worker()
+    log.info('job worker %s started with %d threads', jobs.worker_status()['holder'], jobs.WORKERS)
+    while not stop.wait(1.0):
+        pass
+    log.info('shutting down')
+    # 停止续约并释放租约，备用实例可立即接手
+    elector.stop()
+    scheduler.stop(wait=True)
+    # 等待执行中的任务结束；被强制终止时由租约过期后重新入队
+    jobs.stop_worker(wait=True)
+
+if __name__ == '__main__':
+    main()
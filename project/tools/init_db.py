@@ -1,29 +1,20 @@
 from pathlib import Path
-import sqlite3
+import sys
+sys.path.append(str(Path(__file__).resolve().parents[2]))
 
-ROOT = Path(__file__).resolve().parents[1]
-db_path = ROOT / "app" / "data" / "app.db"
-migrations_dir = ROOT / "migrations"
+from project.app.db import DATABASE, MIGRATIONS_DIR, run_migrations
 
-db_path.parent.mkdir(parents=True, exist_ok=True)
+# 与应用启动共用同一个迁移执行器，已执行的版本记录在 schema_migrations 表
+print(f"Migrating {DATABASE} from {MIGRATIONS_DIR}...")
 
-conn = sqlite3.connect(str(db_path))
+try:
+    applied = run_migrations()
+except Exception as e:
+    print(f"Migration failed: {e}")
+    sys.exit(1)
 
-# Simple migration runner: just sort files and execute
-# In real app, we should track applied migrations in a table
-sql_files = sorted(migrations_dir.glob("*.sql"))
-
-print(f"Found {len(sql_files)} migration files.")
-
-for sql_file in sql_files:
-    print(f"Applying {sql_file.name}...")
-    with open(sql_file, "r", encoding="utf-8") as f:
-        sql = f.read()
-    try:
-        conn.executescript(sql)
-    except Exception as e:
-        print(f"Error applying {sql_file.name}: {e}")
-
-conn.commit()
-conn.close()
+for name in applied:
+    print(f"Applied {name}")
+if not applied:
+    print("Database is up to date.")
 print("Database initialization complete.")